@@ -0,0 +1,20 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Age axis tick spacing and labels, as computed on every axis repaint"""
+
+from bitnomon.age import AgeAxisItem
+
+def benchmarks():
+    ranges = ((0, 5), (0, 60), (0, 600), (0, 10000), (0, 525600))
+    def spacing():
+        for minVal, maxVal in ranges:
+            AgeAxisItem.tickSpacing(minVal, maxVal, 800)
+    yield 'age.tickSpacing x5', spacing
+    values = [i * 10. for i in range(10)]
+    yield 'age.tickStrings minutes', lambda: AgeAxisItem.tickStrings(
+        values, 1, 10.)
+    values = [i * 1440. for i in range(10)]
+    yield 'age.tickStrings days', lambda: AgeAxisItem.tickStrings(
+        values, 1, 1440.)
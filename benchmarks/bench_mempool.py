@@ -0,0 +1,42 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Memory pool scatter preparation at various pool sizes.
+
+The level of detail limits match the defaults in main.py."""
+
+from bitnomon import mempool
+
+import synthetic
+
+SIZES = (5000, 50000, 300000)
+LIMITS = mempool.DetailLimits(50000, 100000, 200000)
+VIEW_SIZE = (800, 300)
+
+def fullRange(store):
+    positions = store.positions
+    return ((float(positions[:, 0].min()), float(positions[:, 0].max())),
+            (float(positions[:, 1].min()), float(positions[:, 1].max())))
+
+def benchmarks():
+    now = synthetic.NOW
+    for size in SIZES:
+        pool = synthetic.memPool(size, now)
+        # A store already holding the pool, as at steady state
+        store = mempool.MemPoolStore()
+        store.sync(pool, now, 350000)
+        viewRange = fullRange(store)
+        result = mempool.prepareMemPool(store, pool, now, 350000, [],
+                                        viewRange, VIEW_SIZE, LIMITS)
+        def fresh(pool=pool, viewRange=viewRange):
+            mempool.prepareMemPool(mempool.MemPoolStore(), pool, now, 350000,
+                                   [], viewRange, VIEW_SIZE, LIMITS)
+        yield 'mempool.prepare fresh %d' % size, fresh
+        yield 'mempool.prepare steady %d' % size, (
+            lambda store=store, pool=pool, viewRange=viewRange:
+            mempool.prepareMemPool(store, pool, now, 350000, [],
+                                   viewRange, VIEW_SIZE, LIMITS))
+        yield 'mempool.review %d' % size, (
+            lambda result=result, viewRange=viewRange:
+            mempool.reviewMemPool(result, viewRange, VIEW_SIZE, LIMITS))
@@ -0,0 +1,24 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Decoding of JSON-RPC replies, for payloads like those polled each cycle"""
+
+import json
+
+from bitnomon.qbitcoinrpc import decodeResult
+
+import synthetic
+
+def reply(result):
+    return json.dumps({'result': result, 'error': None, 'id': 1},
+                      default=float)
+
+def benchmarks():
+    nettotals = reply({'totalbytesrecv': 123456789, 'totalbytessent': 98765432,
+                       'timemillis': 1440000000000})
+    yield 'rpc.decode getnettotals', lambda: decodeResult(nettotals)
+    for size in (5000, 50000):
+        text = reply(synthetic.memPool(size))
+        yield ('rpc.decode getrawmempool %d' % size,
+               lambda text=text: decodeResult(text))
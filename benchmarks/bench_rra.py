@@ -0,0 +1,19 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""In-memory RRA updates and differences, as done on every traffic sample"""
+
+from bitnomon.rrdmodel import RRA
+
+def benchmarks():
+    rra = RRA(301)
+    for i in range(len(rra)):
+        rra.update(i * 1000)
+    counter = [len(rra) * 1000]
+    def update():
+        counter[0] += 1000
+        rra.update(counter[0])
+    yield 'rra.update', update
+    yield 'rra.differences 300', lambda: list(rra.differences(0))
+    yield 'rra.list 300', lambda: list(rra)
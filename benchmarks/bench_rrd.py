@@ -0,0 +1,62 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""RRD file access, on a database filled with a year of traffic.
+
+The filled database is cached in the benchmarks directory, as filling it takes
+a while."""
+
+import os
+import shutil
+import tempfile
+
+import rrdtool
+
+from bitnomon import rrdmodel
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'cache')
+YEAR = 365 * 86400
+END = 1.44e9
+
+def filledModel():
+    "Return an RRDModel for a database with a year of minute samples."
+    dataDir = os.path.join(CACHE_DIR, 'rrd-year')
+    if not os.path.exists(dataDir):
+        # Fill a temporary directory so an interrupted run isn't cached
+        tmpDir = dataDir + '.tmp'
+        if os.path.exists(tmpDir):
+            shutil.rmtree(tmpDir)
+        os.makedirs(tmpDir)
+        model = rrdmodel.RRDModel(tmpDir)
+        end = int(END)
+        total = 0
+        batch = []
+        for t in range(end - YEAR, end + 1, model.step):
+            total += 30000 * model.step
+            batch.append('%d:%d:%d' % (t, total, total // 2))
+            # One call per sample would take far too long
+            if len(batch) == 1000:
+                rrdtool.update(model.rrd_file, *batch)
+                batch = []
+        if batch:
+            rrdtool.update(model.rrd_file, *batch)
+        os.rename(tmpDir, dataDir)
+    return rrdmodel.RRDModel(dataDir)
+
+def benchmarks():
+    model = filledModel()
+    yield 'rrd.fetch_all year', model.fetch_all
+    yield 'rrd.fetch 6h', lambda: list(model.fetch(-6*3600, int(END), 60))
+
+    updateDir = tempfile.mkdtemp()
+    try:
+        updating = rrdmodel.RRDModel(updateDir)
+        clock = [END]
+        def update():
+            clock[0] += 60
+            updating.update(clock[0] * 1000, (clock[0], clock[0]))
+        yield 'rrd.update', update
+    finally:
+        shutil.rmtree(updateDir)
@@ -0,0 +1,29 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Traffic plot and label preparation (the plotNetTotals job)"""
+
+from bitnomon import traffic
+
+import synthetic
+
+def rrdRows(now, interval=60, count=2000):
+    "Rows like RRDModel.fetch_all, at a single resolution for simplicity."
+    start = int(now) - count * interval
+    return [(start + i * interval, (30000., 15000.)) for i in range(count)]
+
+def benchmarks():
+    now = synthetic.NOW
+    times, recv, sent = synthetic.counterSamples(301, 2., now)
+    rows = rrdRows(now)
+    fetchAll = lambda: rows
+    timesArray = traffic.counterArray(times)
+    recvArray = traffic.counterArray(recv)
+    sentArray = traffic.counterArray(sent)
+    yield 'traffic.prepareNetTotals', lambda: traffic.prepareNetTotals(
+        fetchAll, now, times, recv, sent, 2.)
+    yield 'traffic.plotData', lambda: traffic.plotData(
+        rows, now, timesArray, recvArray, sentArray)
+    yield 'traffic.speedValues', lambda: traffic.speedValues(
+        'lRecv', recvArray, timesArray, 1.)
@@ -0,0 +1,47 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Synthetic node data for benchmarks, shaped like real RPC results"""
+
+import decimal
+import hashlib
+import random
+
+NOW = 1.44e9
+
+def memPool(count, now=NOW, seed=0):
+    """Return a dict like the result of "getrawmempool true" with count
+    transactions that arrived within the hour before now."""
+    rand = random.Random(seed)
+    pool = {}
+    for i in range(count):
+        size = rand.randint(190, 2000)
+        txid = hashlib.sha256(str(i).encode()).hexdigest()
+        pool[txid] = {
+            'size': size,
+            'fee': decimal.Decimal(rand.choice((0, 1, 1, 2, 5, 10)) *
+                                   (size // 1000 + 1)) / 100000,
+            'time': int(now - rand.uniform(0, 3600)),
+            'height': 350000,
+            'startingpriority': rand.uniform(0, 1e8),
+            'currentpriority': rand.uniform(0, 1e8),
+            'depends': [],
+        }
+    return pool
+
+def counterSamples(count, interval=2., now=NOW, seed=0):
+    """Return (times, recv, sent) lists of high-resolution traffic samples
+    ending at now, as kept in the main window's RRAs."""
+    rand = random.Random(seed)
+    times = []
+    recv = []
+    sent = []
+    r = s = 0
+    for i in range(count):
+        times.append(now - (count - 1 - i) * interval)
+        r += rand.randint(10000, 100000)
+        s += rand.randint(10000, 100000)
+        recv.append(r)
+        sent.append(s)
+    return times, recv, sent
@@ -9,6 +9,8 @@ from . import qtwrapper #pylint: disable=unused-import
 import pyqtgraph
 from math import ceil, log
 
+from .cache import LRUCache
+
 def ageOfTime(now, time):
     """Convert a time in seconds to an age in the standard format,
     based on the current time."""
@@ -29,6 +31,26 @@ def genericTickSpacing(idealUnitsPerTick):
     else:
         return (powerOfTen/5, powerOfTen/10)
 
+def formatAge(v, precision):
+    """Format an age as [[days:]hours:]minutes, with minutes to the given
+    number of decimal places."""
+    if v < 0:
+        return '-' + formatAge(-v, precision)
+    hours, minutes = divmod(v, 60.)
+    days, hours = divmod(int(hours), 24)
+    if days == 0:
+        if hours == 0:
+            return '%.*f' % (precision, minutes)
+        else:
+            return '%d:%02.*f' % (hours, precision, minutes)
+    else:
+        return '%d:%02d:%02.*f' % (days, hours, precision, minutes)
+
+# Axes are repainted with the same ticks over and over while scrolling or as
+# new samples arrive, so spacing decisions and labels are remembered.
+spacingCache = LRUCache(256) #pylint: disable=invalid-name
+labelCache = LRUCache(1024) #pylint: disable=invalid-name
+
 class AgeAxisItem(pyqtgraph.AxisItem):
     #pylint: disable=too-many-ancestors, too-many-public-methods
 
@@ -38,6 +60,17 @@ class AgeAxisItem(pyqtgraph.AxisItem):
 
     @staticmethod
     def tickSpacing(minVal, maxVal, size):
+        # Rounded so that panning, which keeps the span but may not preserve
+        # it exactly in floating point, hits the cache
+        key = (round(maxVal - minVal, 9), size)
+        spacing = spacingCache.get(key)
+        if spacing is None:
+            spacing = spacingCache[key] = AgeAxisItem.computeTickSpacing(
+                minVal, maxVal, size)
+        return spacing
+
+    @staticmethod
+    def computeTickSpacing(minVal, maxVal, size):
         idealPxSpacing = size/20+50
         unitsPerPx = (maxVal - minVal)/size
         idealUnitsPerTick = unitsPerPx*idealPxSpacing
@@ -59,18 +92,9 @@ class AgeAxisItem(pyqtgraph.AxisItem):
     @staticmethod
     def tickStrings(values, scale, spacing):
         minutePrecision = max(0, int(ceil(-log(spacing, 10))))
-        def formatValue(v):
-            if v < 0:
-                return '-' + formatValue(-v)
-            #minutes = v/60.
-            hours, minutes = divmod(v, 60.)
-            days, hours = divmod(int(hours), 24)
-            if days == 0:
-                if hours == 0:
-                    return '%.*f' % (minutePrecision, minutes)
-                else:
-                    return '%d:%02.*f' % (hours, minutePrecision, minutes)
-            else:
-                return '%d:%02d:%02.*f' % (days, hours,
-                                           minutePrecision, minutes)
-        return [formatValue(v) for v in values]
+        labels = [labelCache.get((v, minutePrecision)) for v in values]
+        missing = [i for i, label in enumerate(labels) if label is None]
+        for i in missing:
+            labels[i] = labelCache[(values[i], minutePrecision)] = formatAge(
+                values[i], minutePrecision)
+        return labels
@@ -0,0 +1,287 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Index of recent blocks, kept on disk.
+
+The node's API gives each block's header time, which is set by its miner and
+can be off by an hour or more, but not when the block arrived. Bitnomon
+records that itself for blocks it sees become the tip, and keeps it along
+with the height, hash and header time in a file of fixed-size records, so it
+survives restarts. Blocks replaced in a reorganization are kept, marked as
+orphaned."""
+
+import binascii
+import errno
+import os
+
+import numpy
+
+# One record per block; hashes are stored as raw bytes
+RECORD = numpy.dtype([
+    ('height', '<u4'),
+    ('hash', 'u1', (32,)),
+    ('time', '<u4'),  # header time
+    ('seen', '<f8'),  # when first seen as the tip, or NaN if not known
+    ('main', 'u1'),   # 1 if in the best chain, 0 if orphaned
+])
+
+def hexHash(record):
+    return binascii.hexlify(record['hash'].tobytes()).decode('ascii')
+
+class BlockIndex(object):
+
+    """Recent blocks by height and hash, optionally backed by a file.
+
+    Records are appended to the file as blocks are added, and rewritten in
+    place when orphaned, so an update costs a write of the changed records.
+    Once the file holds twice the given length of blocks, it is rewritten
+    with just the last length worth of heights.
+
+    An index opened read-only, as by an instance viewing a collector's data,
+    reads the file once and can be checked for changes with isStale.
+
+    Attributes:
+        path       file name, or None to keep the index in memory only
+        readOnly   whether the file is only read
+        length     number of heights kept when compacting
+        records    array of RECORD, in file order
+        byHash     dict of hash (hex string) to row
+        byHeight   dict of height to row of the block in the best chain
+        tipHeight  greatest height in the best chain, or None if empty
+    """
+
+    def __init__(self, path=None, length=4032, readOnly=False):
+        self.path = path
+        self.readOnly = readOnly
+        self.length = length
+        self.records = numpy.zeros(0, RECORD)
+        self.file = None
+        self.stamp = None
+        if path is not None:
+            self.load()
+        self.reindex()
+
+    def fileStamp(self):
+        "Identity, size and modification time of the file, or None if absent."
+        try:
+            stat = os.stat(self.path)
+        except EnvironmentError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+    def load(self):
+        if self.readOnly:
+            self.stamp = self.fileStamp()
+            if self.stamp is None:
+                return
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        else:
+            if not os.path.exists(self.path):
+                open(self.path, 'wb').close()
+            self.file = open(self.path, 'rb+')
+            data = self.file.read()
+        # Drop any partial record, left by an interrupted write or still
+        # being written by another instance
+        size = len(data) - len(data) % RECORD.itemsize
+        self.records = numpy.frombuffer(data[:size], RECORD).copy()
+        if self.file is not None:
+            self.file.truncate(size)
+
+    def isStale(self):
+        "Whether a read-only index's file has changed since it was read."
+        return self.readOnly and self.fileStamp() != self.stamp
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def reindex(self):
+        self.byHash = {}
+        self.byHeight = {}
+        for row, record in enumerate(self.records):
+            self.byHash[hexHash(record)] = row
+            if record['main']:
+                self.byHeight[int(record['height'])] = row
+        self.tipHeight = max(self.byHeight) if self.byHeight else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, blockHash):
+        return blockHash in self.byHash
+
+    def hashAt(self, height):
+        "Hash of the block at a height in the best chain, or None."
+        row = self.byHeight.get(height)
+        return None if row is None else hexHash(self.records[row])
+
+    def tipHash(self):
+        return None if self.tipHeight is None else self.hashAt(self.tipHeight)
+
+    def write(self, rows):
+        "Write the records of the given rows in place."
+        if self.file is None:
+            return
+        for row in rows:
+            self.file.seek(row * RECORD.itemsize)
+            self.file.write(self.records[row:row+1].tobytes())
+        self.file.flush()
+
+    def append(self, records):
+        start = len(self.records)
+        self.records = numpy.concatenate((self.records, records))
+        for row in range(start, len(self.records)):
+            self.byHash[hexHash(self.records[row])] = row
+        if self.file is not None:
+            self.file.seek(start * RECORD.itemsize)
+            self.file.write(records.tobytes())
+            self.file.flush()
+
+    def orphan(self, height):
+        "Mark the best chain block at a height as orphaned, returning its row."
+        row = self.byHeight.pop(height)
+        self.records['main'][row] = 0
+        return row
+
+    def setMain(self, row):
+        """Make the block in a row the best chain one at its height, returning
+        the rows changed."""
+        height = int(self.records['height'][row])
+        changed = [row]
+        other = self.byHeight.get(height)
+        if other == row:
+            return []
+        if other is not None:
+            changed.append(self.orphan(height))
+        self.records['main'][row] = 1
+        self.byHeight[height] = row
+        return changed
+
+    def checkHashes(self, heightHashes):
+        """Compare (height, hash) pairs of the best chain, as from
+        getblockhash, with the index. Blocks no longer in the best chain are
+        orphaned, and known blocks that are back in it restored. Returns
+        (list of hashes not in the index, whether a block was orphaned just
+        above one that wasn't checked, so the fork may be deeper)."""
+        missing = []
+        changed = []
+        orphaned = []
+        checked = set()
+        for height, blockHash in heightHashes:
+            checked.add(height)
+            row = self.byHash.get(blockHash)
+            if row is not None:
+                changed.extend(self.setMain(row))
+                continue
+            if height in self.byHeight:
+                changed.append(self.orphan(height))
+                orphaned.append(height)
+            missing.append(blockHash)
+        self.write(changed)
+        self.tipHeight = max(self.byHeight) if self.byHeight else None
+        deeper = bool(orphaned) and min(orphaned) - 1 in self.byHeight and \
+            min(orphaned) - 1 not in checked
+        return missing, deeper
+
+    def add(self, headers, seen=None):
+        """Add blocks to the best chain from getblockheader results, orphaning
+        any others at their heights. The tip (the highest of them, if above
+        the current tip) is recorded as first seen at the given time, if
+        any."""
+        if not headers:
+            return
+        tipHeight = max(header['height'] for header in headers)
+        if self.tipHeight is not None and tipHeight <= self.tipHeight:
+            seen = None
+        changed = []
+        new = []
+        for header in headers:
+            row = self.byHash.get(header['hash'])
+            if row is not None:
+                changed.extend(self.setMain(row))
+                continue
+            if header['height'] in self.byHeight:
+                changed.append(self.orphan(header['height']))
+            record = numpy.zeros(1, RECORD)
+            record['height'] = header['height']
+            record['hash'] = numpy.frombuffer(
+                binascii.unhexlify(header['hash']), numpy.uint8)
+            record['time'] = header['time']
+            record['seen'] = (seen if seen is not None and
+                              header['height'] == tipHeight else numpy.nan)
+            record['main'] = 1
+            new.append(record)
+        self.write(changed)
+        if new:
+            start = len(self.records)
+            self.append(numpy.concatenate(new))
+            for row in range(start, len(self.records)):
+                self.byHeight[int(self.records['height'][row])] = row
+        self.tipHeight = max(self.byHeight)
+        if len(self.byHash) > 2 * self.length:
+            self.compact()
+
+    def truncate(self, height):
+        "Orphan blocks above a height, when the best chain got shorter."
+        rows = [self.orphan(h) for h in list(self.byHeight) if h > height]
+        self.write(rows)
+        self.tipHeight = max(self.byHeight) if self.byHeight else None
+
+    def compact(self):
+        "Drop blocks more than length below the tip, rewriting the file."
+        keep = self.records['height'] > self.tipHeight - self.length
+        self.records = self.records[keep]
+        if self.file is not None:
+            self.file.close()
+            temp = self.path + '.new'
+            with open(temp, 'wb') as f:
+                f.write(self.records.tobytes())
+            if os.name == 'nt':
+                # No atomic replace on Windows with Python 2
+                os.remove(self.path)
+            os.rename(temp, self.path)
+            self.file = open(self.path, 'rb+')
+        self.reindex()
+
+    def syncHeights(self, tipHeight, backfill, depth):
+        """Heights whose best chain hashes are needed to bring the index up
+        to a new tip: those of the last backfill blocks not in the index,
+        plus the top depth heights of the index, to detect reorganizations.
+        """
+        start = max(tipHeight - backfill + 1, 0)
+        heights = set(h for h in range(start, tipHeight + 1)
+                      if h not in self.byHeight)
+        if self.tipHeight is not None:
+            top = min(self.tipHeight, tipHeight)
+            heights.update(range(max(top - depth + 1, start), top + 1))
+        return sorted(heights)
+
+    def recent(self, count):
+        "Records of the last count blocks in the best chain, oldest first."
+        heights = sorted(self.byHeight)[-count:]
+        return self.records[[self.byHeight[h] for h in heights]]
+
+    def orphans(self):
+        "Records of orphaned blocks, oldest first."
+        records = self.records[self.records['main'] == 0]
+        return records[numpy.argsort(records['height'], kind='mergesort')]
+
+def arrivalTimes(records):
+    """Best estimates of when the blocks of an array of RECORD arrived: the
+    time first seen if known, or else the header time."""
+    return numpy.where(numpy.isnan(records['seen']), records['time'],
+                       records['seen'])
+
+def intervalStats(records):
+    """Return (mean, median, longest) seconds between consecutive best chain
+    blocks in an array of RECORD sorted by height, by header time, or None
+    if there are fewer than two."""
+    if len(records) < 2:
+        return None
+    intervals = numpy.diff(records['time'].astype(float))
+    return (intervals.mean(), numpy.median(intervals), intervals.max())
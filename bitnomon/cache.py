@@ -0,0 +1,45 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Small bounded caches"""
+
+import collections
+
+class LRUCache(object):
+
+    """Dictionary-like cache holding up to a fixed number of items, discarding
+    the least recently used when full."""
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError('LRUCache size must be at least 1')
+        self.size = size
+        self.items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __getitem__(self, key):
+        value = self.items.pop(key)
+        self.items[key] = value
+        return value
+
+    def get(self, key, default=None):
+        "Return the value for key, marking it as recently used, or default."
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self.items.pop(key, None)
+        self.items[key] = value
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
@@ -0,0 +1,63 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Source of the current time for the program.
+
+Code that stamps samples or computes ages calls clock.now() rather than
+time.time(), so that a test harness can substitute a virtual clock (see
+VirtualClock, SteppedClock and tools/soak.py) and run days of operation in
+minutes. Timing of the program's own work (see timing.py) uses the real time
+regardless."""
+
+import time
+
+def now():
+    "Current time in seconds since the epoch, from the installed source."
+    return source()
+
+def install(newSource):
+    """Make now() use a function returning the time in seconds, such as a
+    VirtualClock, or time.time to restore the real time."""
+    global source #pylint: disable=global-statement,invalid-name
+    source = newSource
+
+class VirtualClock(object):
+    #pylint: disable=too-few-public-methods
+
+    """Clock running at a multiple of real time, from a start time.
+
+    Attributes:
+        start    virtual time when the clock was created
+        speed    virtual seconds per real second
+    """
+
+    def __init__(self, start=None, speed=1., realTime=time.time):
+        self.realTime = realTime
+        self.realStart = realTime()
+        self.start = self.realStart if start is None else start
+        self.speed = speed
+
+    def __call__(self):
+        return self.start + (self.realTime() - self.realStart) * self.speed
+
+class SteppedClock(object):
+
+    """Clock that only moves when advanced, e.g. by one poll interval per
+    completed poll, so a test runs as fast as the program can keep up.
+
+    Attributes:
+        start    virtual time when the clock was created
+        time     current virtual time
+    """
+
+    def __init__(self, start=None):
+        self.start = self.time = time.time() if start is None else start
+
+    def advance(self, seconds):
+        self.time += seconds
+
+    def __call__(self):
+        return self.time
+
+source = time.time #pylint: disable=invalid-name
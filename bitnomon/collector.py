@@ -0,0 +1,207 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Sharing of polled node data between Bitnomon instances.
+
+One instance (the collector) polls the node and publishes each RPC reply over
+a local socket; any others monitoring the same node connect as viewers and
+receive the same replies instead of polling for themselves. This keeps the
+load on the node constant no matter how many windows are open.
+
+The wire format is a sequence of frames, each being a 4-byte big-endian length
+followed by the UTF-8 method name, a newline, and the raw JSON-RPC response
+text as received from the node."""
+
+import collections
+import getpass
+import hashlib
+import struct
+import sys
+
+from .qtwrapper import QtCore, QtNetwork
+from . import qbitcoinrpc
+
+QLocalServer = QtNetwork.QLocalServer
+QLocalSocket = QtNetwork.QLocalSocket
+
+frameHeader = struct.Struct('!I')
+
+def serverName(host, port):
+    """Return the local socket name for sharing data from the node at the given
+    RPC host and port. The name is per-user, since viewers share the
+    collector's data directory."""
+    node = hashlib.sha1(('%s:%d' % (host, port)).encode('utf8')).hexdigest()
+    return 'bitnomon-%s-%s' % (getpass.getuser(), node[:12])
+
+def encodeFrame(method, text):
+    "Encode a method name and JSON-RPC response text as a frame."
+    body = method.encode('utf8') + b'\n' + text.encode('utf8')
+    return frameHeader.pack(len(body)) + body
+
+class FrameDecoder(object):
+    #pylint: disable=too-few-public-methods
+
+    """Incremental decoder for a stream of frames.
+
+    Feed it bytes as they arrive; it returns the (method, text) pairs of any
+    frames completed so far and buffers the remainder. Chunks of a frame are
+    only joined once it's complete, so a large frame arriving in many chunks
+    costs time linear in its size."""
+
+    def __init__(self):
+        # Chunks of the header or body being received, and their total size
+        self.chunks = []
+        self.size = 0
+        # Body length of the frame being received, or None while reading its
+        # header
+        self.length = None
+
+    def feed(self, data):
+        "Add data to the buffer and return a list of complete frames."
+        frames = []
+        pos = 0
+        while pos < len(data):
+            need = (frameHeader.size if self.length is None else
+                    self.length) - self.size
+            chunk = data[pos:pos + need]
+            pos += len(chunk)
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            if len(chunk) < need:
+                break
+            part = b''.join(self.chunks)
+            self.chunks = []
+            self.size = 0
+            if self.length is None:
+                self.length, = frameHeader.unpack(part)
+                if self.length == 0:
+                    # Carries nothing; skipped rather than read as a reply
+                    self.length = None
+                continue
+            method, text = part.split(b'\n', 1)
+            frames.append((method.decode('utf8'), text.decode('utf8')))
+            self.length = None
+        return frames
+
+class SampleServer(QtCore.QObject):
+
+    """Publishes RPC replies to connected viewers.
+
+    A short history of replies is kept so that a newly connected viewer can
+    start out with the same state as the collector: by default just the latest
+    reply per method, or more where configured in historyLengths (e.g. enough
+    traffic samples to fill the high-resolution plot)."""
+
+    # Frames for a viewer that isn't keeping up are dropped past this many
+    # buffered bytes, rather than growing without bound.
+    maxPendingBytes = 64*1024*1024
+
+    def __init__(self, historyLengths=None, parent=None):
+        super(SampleServer, self).__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._acceptConnections)
+        self.historyLengths = historyLengths or {}
+        self.history = collections.OrderedDict()
+        self.viewers = []
+
+    def listen(self, name):
+        """Start listening on the given local socket name. Returns False if it's
+        already in use (another collector is running)."""
+        return self.server.listen(name)
+
+    def isListening(self):
+        return self.server.isListening()
+
+    def close(self):
+        "Stop listening and disconnect all viewers."
+        self.server.close()
+        for sock in self.viewers:
+            sock.disconnectFromServer()
+        self.viewers = []
+
+    def publish(self, method, text):
+        "Send an RPC reply to all viewers and add it to the history."
+        frame = encodeFrame(method, text)
+        history = self.history.get(method)
+        if history is None:
+            history = collections.deque(
+                maxlen=self.historyLengths.get(method, 1))
+            self.history[method] = history
+        history.append(frame)
+        for sock in self.viewers:
+            if sock.bytesToWrite() < self.maxPendingBytes:
+                sock.write(frame)
+
+    @QtCore.Slot()
+    def _acceptConnections(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection()
+            sock.disconnected.connect(self._removeViewers)
+            for history in self.history.values():
+                for frame in history:
+                    sock.write(frame)
+            self.viewers.append(sock)
+
+    @QtCore.Slot()
+    def _removeViewers(self):
+        connected = QLocalSocket.ConnectedState
+        for sock in self.viewers:
+            if sock.state() != connected:
+                sock.deleteLater()
+        self.viewers = [s for s in self.viewers if s.state() == connected]
+
+class SampleClient(QtCore.QObject):
+
+    """Receives RPC replies from a collector.
+
+    Signals:
+        connected -- the collector accepted the connection
+        failed(bool) -- no collector is running; the argument is True if a
+                        stale socket was left behind by one that has exited
+        disconnected -- the collector went away
+        replyReceived(str, object) -- method name and decoded result
+    """
+
+    connected = QtCore.Signal()
+    failed = QtCore.Signal(bool)
+    disconnected = QtCore.Signal()
+    replyReceived = QtCore.Signal(str, object)
+
+    def __init__(self, parent=None):
+        super(SampleClient, self).__init__(parent)
+        self.socket = QLocalSocket(self)
+        self.socket.connected.connect(self.connected)
+        self.socket.disconnected.connect(self.disconnected)
+        self.socket.error.connect(self._error)
+        self.socket.readyRead.connect(self._read)
+        self.decoder = FrameDecoder()
+
+    def connectToServer(self, name):
+        self.decoder = FrameDecoder()
+        self.socket.connectToServer(name)
+
+    def isConnected(self):
+        return self.socket.state() == QLocalSocket.ConnectedState
+
+    def close(self):
+        self.socket.abort()
+
+    @QtCore.Slot(QLocalSocket.LocalSocketError)
+    def _error(self, err):
+        if err == QLocalSocket.ServerNotFoundError:
+            self.failed.emit(False)
+        elif err == QLocalSocket.ConnectionRefusedError:
+            self.failed.emit(True)
+        # Other errors are followed by "disconnected" if we were connected
+
+    @QtCore.Slot()
+    def _read(self):
+        data = bytes(self.socket.readAll())
+        for method, text in self.decoder.feed(data):
+            try:
+                result = qbitcoinrpc.decodeResult(text)
+            except qbitcoinrpc.JSONRPCError as e:
+                sys.stderr.write('Shared %s reply: %s\n' % (method, e))
+                continue
+            self.replyReceived.emit(method, result)
@@ -25,28 +25,38 @@ class ByteCountFormatter(object):
         self.unit_bits = False
         self.prefix_si = True
 
-    def __call__(self, count):
-
-        """Formats a byte count using the configured settings."""
-
+    def unitFor(self, count):
+        """Return (multiplier, unit) for showing counts up to the given one in
+        a single unit using the configured settings, as in the output of
+        __call__: a byte count times multiplier is the number of units, where
+        unit is the prefixed unit symbol, such as "kB"."""
         if self.unit_bits:
-            count *= 8
+            multiplier = 8.
             unit = 'b'
         else:
+            multiplier = 1.
             unit = 'B'
-
         if self.prefix_si:
             factor = 1000.
             prefixes = self.SI_prefixes
         else:
             factor = 1024.
             prefixes = self.binary_prefixes
-
-        if abs(count) < factor:
-            return u'%d %c' % (count, unit)
-        size = float(count)
+        size = abs(count) * multiplier
         prefix_index = 0
-        while abs(size) >= factor and prefix_index < len(prefixes):
+        while size >= factor and prefix_index < len(prefixes):
             size /= factor
+            multiplier /= factor
             prefix_index += 1
-        return u'%.2f %s%c' % (size, prefixes[prefix_index-1], unit)
+        if prefix_index == 0:
+            return multiplier, unit
+        return multiplier, prefixes[prefix_index-1] + unit
+
+    def __call__(self, count):
+
+        """Formats a byte count using the configured settings."""
+
+        multiplier, unit = self.unitFor(count)
+        if len(unit) == 1:
+            return u'%d %s' % (count * multiplier, unit)
+        return u'%.2f %s' % (count * multiplier, unit)
@@ -0,0 +1,63 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""View model for text labels.
+
+Handlers store plain values by label name as data arrives. The values are
+formatted and shown in one batch when the labels are next drawn, and only
+labels whose text actually changed are set, as each setText lays out the text
+and repaints the label even if it's the same."""
+
+class LabelModel(object):
+
+    """Values of named labels, with the text last shown for each.
+
+    Attributes:
+        formatters   dict of label name to function formatting a value as
+                     text (str if not given)
+        values       dict of label name to latest value
+        texts        dict of label name to text last shown
+        pending      set of names of labels set since the last flush
+    """
+
+    def __init__(self):
+        self.formatters = {}
+        self.values = {}
+        self.texts = {}
+        self.pending = set()
+
+    def define(self, names, formatter):
+        "Set the formatter for the named labels."
+        for name in names:
+            self.formatters[name] = formatter
+
+    def set(self, name, value):
+        self.values[name] = value
+        self.pending.add(name)
+
+    def update(self, values):
+        "Set labels from a dict of name to value."
+        self.values.update(values)
+        self.pending.update(values)
+
+    def reformat(self):
+        "Format all values again at the next flush, e.g. for new units."
+        self.pending.update(self.values)
+
+    def changes(self):
+        """Format the values set since the last call, returning a dict of name
+        to text for the labels whose text changed."""
+        changed = {}
+        for name in self.pending:
+            text = self.formatters.get(name, str)(self.values[name])
+            if self.texts.get(name) != text:
+                self.texts[name] = text
+                changed[name] = text
+        self.pending.clear()
+        return changed
+
+    def flush(self, setText):
+        "Call setText(name, text) for each changed label."
+        for name, text in self.changes().items():
+            setText(name, text)
@@ -8,11 +8,8 @@
 
 import sys
 import os
-import time
-import math
 import traceback
 import signal
-from itertools import islice
 
 # This must come before pyqtgraph so it doesn't try to guess the binding
 from .qtwrapper import (
@@ -30,12 +27,26 @@ from . import (
     ui_main,
     about,
     bitcoinconf,
+    blocks,
+    cache,
+    clock,
+    collector,
+    labels,
     perfprobe,
     qbitcoinrpc,
     rrdmodel,
     formatting,
+    mempool,
+    nodeprobe,
+    peers,
+    pipeline,
+    profiling,
+    render,
+    timing,
+    traffic,
 )
-from .age import ageOfTime, AgeAxisItem
+from .age import AgeAxisItem
+from .rate import ByteRateAxisItem
 from .qsettings import QSettingsGroup, qSettingsProperty
 
 if sys.version_info[0] > 2:
@@ -52,7 +63,44 @@ TESTNET = False
 DATA_DIR = ''
 BITCOIN_DATA_DIR = None
 BITCOIN_CONF = 'bitcoin.conf'
-MEMPOOL_LIMIT = 5000
+# Maximum number of individual mempool transactions to plot; beyond this a
+# representative sample is shown.
+MEMPOOL_LIMIT = 50000
+# Visible transaction counts above which the mempool is drawn as aggregated
+# markers, or as a density image
+MEMPOOL_AGGREGATE_THRESHOLD = 100000
+MEMPOOL_DENSITY_THRESHOLD = 200000
+# Approximate memory limit for mempool transaction data in bytes, and which
+# transactions to drop beyond it (see mempool.MemPoolStore)
+MEMPOOL_MEMORY_BUDGET = 64*1024*1024
+MEMPOOL_EVICTION = 'oldest'
+# Distance in pixels within which the cursor picks a mempool transaction
+MEMPOOL_HIT_RADIUS = 8
+# Seconds between polls and length of high-resolution traffic history in
+# seconds, if given on the command line (otherwise from QSettings)
+POLL_INTERVAL = None
+HISTORY_LENGTH = None
+MIN_POLL_INTERVAL = 0.1
+# Longer intervals would let the long-term databases' heartbeats lapse, making
+# their values unknown; half the shortest allows for a late or missed sample.
+MAX_POLL_INTERVAL = min(model.heartbeat for model in (
+    rrdmodel.RRDModel, rrdmodel.MemPoolRRD, rrdmodel.NodeRRD)) / 2.
+# Default length of a profiler capture in seconds
+PROFILE_SECONDS = 30
+# Seconds over which to average per-peer traffic rates
+PEER_RATE_SPAN = 60
+# Number of recent blocks whose headers are fetched if missing from the block
+# index, and shown in the block interval statistics
+BLOCK_BACKFILL = 144
+# Number of top blocks of the index checked for reorganization on a new tip,
+# doubled while the fork turns out to be deeper
+BLOCK_REORG_DEPTH = 6
+# Number of block arrival lines on the memory pool plot
+BLOCK_LINES = 24
+# Share polled data with other instances monitoring the same node
+SHARE = True
+# Run as a collector only, without showing the window
+COLLECTOR_ONLY = False
 
 def printException():
     "Print a stack trace, or just the exception, depending on debug setting"
@@ -87,6 +135,8 @@ class MainWindowSettings(QSettingsGroup):
     statusBar = qSettingsProperty('statusBar', False, valueType=bool)
     formatBits = qSettingsProperty('formatBits', False, valueType=bool)
     formatSI = qSettingsProperty('formatSI', True, valueType=bool)
+    pollInterval = qSettingsProperty('pollInterval', 2., valueType=float)
+    historyLength = qSettingsProperty('historyLength', 600., valueType=float)
 
     netPlotXAuto = qSettingsProperty('netPlotXAuto', False, valueType=bool)
     netPlotYAuto = qSettingsProperty('netPlotYAuto', True, valueType=bool)
@@ -104,19 +154,24 @@ class MainWindowSettings(QSettingsGroup):
 # API requests are chained sequentially (doesn't seem to work reliably if
 # QNetworkAccessManager parallelizes them).
 commandChain = []
+# Reply handlers by method name, for replies shared by a collector
+replyHandlers = {}
 def chainRequest(method, *args):
     """Decorator to register an API request in the chain. Parameters are the
     API method name and optional arguments. The decorated function is the slot
     that handles the reply."""
     #pylint: disable=missing-docstring
     def decorator(responseHandler):
+        responseHandler = timing.timed('handle ' + method)(responseHandler)
         def handlerWrapper(self, data):
+            self.publishReply(method)
             try:
                 responseHandler(self, data)
             except:
                 printException()
             self.nextChainedRequest()
         commandChain.append((method, args, handlerWrapper))
+        replyHandlers[method] = responseHandler
         return handlerWrapper
     return decorator
 
@@ -126,6 +181,9 @@ class MainWindow(QtGui.QMainWindow):
 
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
+        # Plots and labels are redrawn through this, so a hidden window
+        # doesn't spend time drawing
+        self.renderScheduler = render.RenderScheduler(self.isExposed, 33, self)
         self.ui = ui_main.Ui_MainWindow()
         self.ui.setupUi(self)
         self.ui.label_logo.hide()
@@ -135,10 +193,24 @@ class MainWindow(QtGui.QMainWindow):
         self.byteFormatter = formatting.ByteCountFormatter()
         self.isFullScreen = False
         self.missedSamples = 0
+        self._setupSampling()
         self._setupMenus()
         self._setupStatusBar()
         self._setupPlots()
+        self._setupTxDetails()
+        self._setupBlocks()
+        self._setupPeers()
+        self._setupNode()
+        self._setupLabels()
         self.resetZoom()
+        self.pipeline = pipeline.Pipeline(self)
+        self.pipeline.ready.connect(self.applyResult)
+        self.renderScheduler.add('netTotals', self.plotNetTotals)
+        self.renderScheduler.add('memPool', self.renderMemPool)
+        self.renderScheduler.add('peers', self.renderPeers)
+        self.renderScheduler.add('node', self.plotNode)
+        self.renderScheduler.add('labels', self.renderLabels)
+        QtGui.qApp.aboutToQuit.connect(self.pipeline.stop)
         try:
             self.readSettings()
         except:
@@ -147,18 +219,125 @@ class MainWindow(QtGui.QMainWindow):
             printException()
 
         self.rpc = None
+        # Whether this instance is polling the node itself, as opposed to
+        # viewing data shared by a collector
+        self.collecting = False
+        self.sampleServer = collector.SampleServer(
+            {'getnettotals': len(self.trafRecv)}, self)
+        self.sampleClient = collector.SampleClient(self)
+        self.sampleClient.connected.connect(self.startViewing)
+        self.sampleClient.failed.connect(self.startCollecting)
+        self.sampleClient.disconnected.connect(self.viewerDisconnected)
+        self.sampleClient.replyReceived.connect(self.handleSharedReply)
+        self.sampleServerName = None
         self.busy = False
         self.chainIndex = 0
         self.replies = []
         self.tempReply = None
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.update)
-        self.timer.setInterval(2000)
+        self.timer.setInterval(int(self.pollInterval*1000))
         QtCore.QTimer.singleShot(0, self.loadBitcoinConf)
 
         if DEBUG:
             self.perfProbe = perfprobe.PerfProbe(self)
             self.perfProbe.updated.connect(self.updateStatusRSS)
+            self._setupPerfPanel()
+
+    def _setupPerfPanel(self):
+        "Set up the debug panel of phase timings (see timing.py)."
+        #pylint: disable=attribute-defined-outside-init
+        self.perfDock = QtGui.QDockWidget(self.tr('Performance'), self)
+        self.perfDock.setObjectName('perfDock')
+        panel = QtGui.QWidget(self.perfDock)
+        layout = QtGui.QVBoxLayout(panel)
+        self.perfTable = QtGui.QTableWidget(0, 7, panel)
+        self.perfTable.setHorizontalHeaderLabels([
+            self.tr('Phase'), self.tr('Count'), self.tr('Mean (ms)'),
+            self.tr('50% (ms)'), self.tr('90% (ms)'), self.tr('99% (ms)'),
+            self.tr('Total (s)')])
+        self.perfTable.verticalHeader().hide()
+        self.perfTable.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.perfTable)
+        buttons = QtGui.QHBoxLayout()
+        for label, slot in ((self.tr('Export CSV...'), self.exportPhasesCSV),
+                            (self.tr('Export JSON...'), self.exportPhasesJSON),
+                            (self.tr('Reset'), timing.phases.clear)):
+            button = QtGui.QPushButton(label, panel)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.perfDock.setWidget(panel)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.perfDock)
+        self.ui.menu_View.insertAction(self.ui.action_NetUnits,
+                                       self.perfDock.toggleViewAction())
+        self.perfProbe.updated.connect(self.updatePerfPanel)
+        # Time painting of the plots, by wrapping the Python-level paintEvent
+        # that pyqtgraph's GraphicsView overrides
+        for name, view in (('paint traffic', self.ui.networkPlotView),
+                           ('paint mempool', self.ui.memPoolPlotView)):
+            view.paintEvent = timing.timed(name)(view.paintEvent)
+
+    @QtCore.Slot()
+    def updatePerfPanel(self):
+        if not self.perfDock.isVisible():
+            return
+        table = self.perfTable
+        rows = timing.phases.stats()
+        table.setRowCount(len(rows))
+        ms = lambda seconds: '%.2f' % (seconds*1000)
+        for row, (name, stats) in enumerate(rows):
+            texts = (name, str(stats['count']), ms(stats['mean']),
+                     ms(stats['p50']), ms(stats['p90']), ms(stats['p99']),
+                     '%.2f' % stats['total'])
+            for column, text in enumerate(texts):
+                item = table.item(row, column)
+                if item is None:
+                    item = QtGui.QTableWidgetItem()
+                    table.setItem(row, column, item)
+                item.setText(text)
+
+    def exportPhases(self, extension, write):
+        path = QtGui.QFileDialog.getSaveFileName(
+            self, self.tr('Export Timings'),
+            os.path.join(DATA_DIR, 'timings.' + extension))
+        # PyQt4 API 2 returns the path; PySide returns (path, filter)
+        if isinstance(path, tuple):
+            path = path[0]
+        if not path:
+            return
+        try:
+            with open(path, 'w') as f:
+                write(f)
+        except EnvironmentError as e:
+            QMessageBox.critical(self, self.tr('Export Timings'), str(e))
+
+    @QtCore.Slot()
+    def exportPhasesCSV(self):
+        self.exportPhases('csv', timing.phases.writeCSV)
+
+    @QtCore.Slot()
+    def exportPhasesJSON(self):
+        self.exportPhases('json', timing.phases.writeJSON)
+
+    def _setupSampling(self):
+        #pylint: disable=attribute-defined-outside-init
+        with MainWindowSettings() as s:
+            pollInterval = s.pollInterval or 2.
+            historyLength = s.historyLength or 600.
+            # Written back so they can be found and edited
+            s.pollInterval = pollInterval
+            s.historyLength = historyLength
+        if POLL_INTERVAL is not None:
+            pollInterval = POLL_INTERVAL
+        if HISTORY_LENGTH is not None:
+            historyLength = HISTORY_LENGTH
+        if pollInterval > MAX_POLL_INTERVAL:
+            sys.stderr.write('Warning: poll interval limited to %g seconds\n'
+                             % MAX_POLL_INTERVAL)
+        self.pollInterval = max(MIN_POLL_INTERVAL,
+                                min(MAX_POLL_INTERVAL, pollInterval))
+        self.historyLength = max(2*self.pollInterval, historyLength)
 
     def _setupMenus(self):
         #pylint: disable=attribute-defined-outside-init
@@ -187,6 +366,14 @@ class MainWindow(QtGui.QMainWindow):
         ui.action_About.setIcon(icon)
         ui.action_About.triggered.connect(self.about)
 
+        ui.action_Profile = QtGui.QAction(self.tr('Capture &Profile...'), self)
+        ui.action_Profile.triggered.connect(self.profileAction)
+        ui.menu_Help.insertAction(ui.action_About, ui.action_Profile)
+        self.profiler = profiling.ProfileCapture(DATA_DIR)
+        self.profileTimer = QtCore.QTimer(self)
+        self.profileTimer.setSingleShot(True)
+        self.profileTimer.timeout.connect(self.stopProfile)
+
         icon = QIcon(':/trolltech/qmessagebox/images/qtlogo-64.png')
         ui.action_AboutQt.setIcon(icon)
         ui.action_AboutQt.triggered.connect(QtGui.qApp.aboutQt)
@@ -221,29 +408,30 @@ class MainWindow(QtGui.QMainWindow):
     def _setupPlots(self):
         #pylint: disable=attribute-defined-outside-init
 
-        # Keep 10 minutes of high resolution traffic counter data.
-        poll_interval = 2 # seconds
-        traf_samples = int(600./poll_interval)
+        # Keep the configured length of high resolution traffic counter data,
+        # with the sample times for computing rates (plus one sample, so
+        # averages over the whole length have a full span).
+        traf_samples = int(round(self.historyLength/self.pollInterval)) + 1
         traf_intervals = traf_samples - 1
+        self.trafTimes = rrdmodel.RRA(traf_samples)
         self.trafSent = rrdmodel.RRA(traf_samples)
         self.trafRecv = rrdmodel.RRA(traf_samples)
-        # Plot traffic and mempool on a consistent scale
-        self.trafPlotDomain = tuple(
-            poll_interval*ageOfTime(traf_intervals, s)
-            for s in xrange(1, traf_intervals+1)
-        )
 
         # Keep a long-term database of traffic data using RRDtool.
         self.trafRRD = rrdmodel.RRDModel(DATA_DIR)
+        # And of memory pool size and fee rates
+        self.memPoolRRD = rrdmodel.MemPoolRRD(DATA_DIR)
 
-        # Keep the last ~4 hours of block arrival times, as seen by Bitnomon,
-        # since the bitcoin API doesn't provide this.
+        # Block count from the latest getmininginfo (arrival times are kept
+        # in the block index; see _setupBlocks)
         self.lastBlockCount = None
-        self.blockRecvTimes = rrdmodel.RRA(24)
 
+        # Rates are shown in the units chosen from the menu
+        self.trafficAxis = ByteRateAxisItem(self.byteFormatter, 'left')
+        self.trafficAxis.setLabel(self.tr('Traffic'))
         self.networkPlot = pyqtgraph.PlotItem(
             name='traffic',
-            left=(self.tr('Traffic'), 'B/s')
+            axisItems={'left': self.trafficAxis},
         )
         self.networkPlot.showGrid(y=True)
         self.networkPlot.hideAxis('bottom')
@@ -273,7 +461,167 @@ class MainWindow(QtGui.QMainWindow):
             [], symbol='t', size=10, brush=(255, 255, 255, 50),
             pen=None, pxMode=True)
         self.memPoolPlot.addItem(self.memPoolScatterPlot)
+        self.memPoolHighlightPen = pyqtgraph.mkPen((255, 0, 0, 100))
+        # Ring around the transaction under the cursor
+        self.memPoolHoverPlot = pyqtgraph.ScatterPlotItem(
+            [], symbol='o', size=18, brush=None,
+            pen=pyqtgraph.mkPen((255, 255, 0), width=2), pxMode=True)
+        self.memPoolPlot.addItem(self.memPoolHoverPlot, ignoreBounds=True)
+        # Density image for when there are too many transactions to plot
+        # individually: white, with opacity increasing with log(count).
+        self.memPoolDensity = pyqtgraph.ImageItem()
+        lut = numpy.empty((256, 4), dtype=numpy.ubyte)
+        lut[:, :3] = 255
+        lut[:, 3] = numpy.arange(256)
+        self.memPoolDensity.setLookupTable(lut)
+        self.memPoolDensity.hide()
+        # It covers the view range, so it mustn't affect auto-ranging
+        self.memPoolPlot.addItem(self.memPoolDensity, ignoreBounds=True)
+        # Block lines are created once and moved on each update
+        self.blockLines = []
+        for _ in xrange(BLOCK_LINES):
+            line = pyqtgraph.InfiniteLine(angle=90, movable=False)
+            line.hide()
+            self.memPoolPlot.addItem(line)
+            self.blockLines.append(line)
+        # Transaction data is kept between samples and updated incrementally
+        # by the pipeline worker.
+        self.memPoolStore = mempool.MemPoolStore(
+            MEMPOOL_MEMORY_BUDGET, MEMPOOL_EVICTION)
+        self.memPoolLimits = mempool.DetailLimits(
+            MEMPOOL_LIMIT, MEMPOOL_AGGREGATE_THRESHOLD,
+            MEMPOOL_DENSITY_THRESHOLD)
+        self.memPoolResult = None
+        self.memPoolPlot.sigRangeChanged.connect(self.memPoolRangeChanged)
         self.ui.memPoolPlotView.setCentralWidget(self.memPoolPlot)
+        scene = self.memPoolPlot.scene()
+        scene.sigMouseMoved.connect(self.memPoolMouseMoved)
+        scene.sigMouseClicked.connect(self.memPoolMouseClicked)
+
+    def _setupTxDetails(self):
+        #pylint: disable=attribute-defined-outside-init
+        self.txDetailsDock = QtGui.QDockWidget(self.tr('Transaction'), self)
+        self.txDetailsDock.setObjectName('txDetailsDock')
+        self.txDetailsView = QtGui.QTextBrowser(self.txDetailsDock)
+        self.txDetailsDock.setWidget(self.txDetailsView)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.txDetailsDock)
+        self.txDetailsDock.hide()
+        # The transaction shown, and (getmempoolentry, getrawtransaction)
+        # results of recently shown ones by ID
+        self.txDetails = None
+        self.txDetailsCache = cache.LRUCache(64)
+        self.txDetailsReply = None
+
+    def _setupBlocks(self):
+        #pylint: disable=attribute-defined-outside-init
+        # Recent blocks and when they arrived, kept in a file for the node's
+        # chain which only the collector writes; viewers read it (see
+        # updateBestBlock). Until either starts, it is only in memory.
+        self.blockIndex = blocks.BlockIndex()
+        self.blockIndexFile = None
+        # Whether the index has been synced since it was opened, so new tips
+        # are seen as they arrive rather than after a restart
+        self.blockIndexLive = False
+        # Arrival times of the blocks shown as lines, oldest first
+        self.blockTimes = []
+        # getblockheader results by hash
+        self.blockHeaders = cache.LRUCache(BLOCK_BACKFILL)
+        self.blockSyncReply = None
+        # Best block hash whose sync failed, not retried until it changes
+        self.blockSyncFailed = None
+
+    def _setupPeers(self):
+        #pylint: disable=attribute-defined-outside-init
+        self.peersDock = QtGui.QDockWidget(self.tr('Peers'), self)
+        self.peersDock.setObjectName('peersDock')
+        self.peersTable = QtGui.QTableWidget(0, 7, self.peersDock)
+        self.peersTable.setHorizontalHeaderLabels([
+            self.tr('Address'), self.tr('Direction'), self.tr('Receiving'),
+            self.tr('Sending'), self.tr('Ping'), self.tr('Synced'),
+            self.tr('Client')])
+        self.peersTable.verticalHeader().hide()
+        self.peersTable.setEditTriggers(
+            QtGui.QAbstractItemView.NoEditTriggers)
+        self.peersDock.setWidget(self.peersTable)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.peersDock)
+        self.peersDock.hide()
+        self.peersDock.visibilityChanged.connect(self.peersVisibilityChanged)
+        self.ui.menu_View.insertAction(self.ui.action_NetUnits,
+                                       self.peersDock.toggleViewAction())
+        # Same number of samples as the traffic history
+        self.peerHistory = peers.PeerHistory(len(self.trafTimes))
+
+    def _setupNode(self):
+        #pylint: disable=attribute-defined-outside-init
+        # Resource usage of a local node process, found once the config is
+        # loaded, sampled with traffic and kept in the same way
+        self.nodeProbe = None
+        self.nodeSample = None
+        self.nodeRRD = rrdmodel.NodeRRD(DATA_DIR)
+        self.nodeTimes = rrdmodel.RRA(len(self.trafTimes))
+        self.nodeCPU = rrdmodel.RRA(len(self.trafTimes))
+        self.nodeRead = rrdmodel.RRA(len(self.trafTimes))
+        self.nodeWrite = rrdmodel.RRA(len(self.trafTimes))
+        # Storage rates are always shown in bytes
+        self.nodeFormatter = formatting.ByteCountFormatter()
+
+        self.nodeDock = QtGui.QDockWidget(self.tr('Node'), self)
+        self.nodeDock.setObjectName('nodeDock')
+        panel = QtGui.QWidget(self.nodeDock)
+        layout = QtGui.QVBoxLayout(panel)
+        self.nodePlotView = pyqtgraph.PlotWidget(
+            panel, name='node', left=(self.tr('Node CPU'), '%'),
+            bottom=(self.tr('Age'), self.tr('d:h:m')),
+            axisItems={'bottom': AgeAxisItem('bottom')})
+        nodePlot = self.nodePlotView.getPlotItem()
+        nodePlot.setXLink('traffic')
+        nodePlot.showGrid(x=True, y=True)
+        nodePlot.invertX()
+        self.nodeCPUPlot = pyqtgraph.PlotDataItem(
+            pen=(0, 128, 255), fillLevel=0, brush=(0, 128, 255, 100))
+        nodePlot.addItem(self.nodeCPUPlot)
+        layout.addWidget(self.nodePlotView)
+        labelRow = QtGui.QHBoxLayout()
+        self.nodeLabels = {}
+        for name, caption in zip(nodeprobe.NODE_LABELS, (
+                self.tr('CPU:'), self.tr('Memory:'), self.tr('Read:'),
+                self.tr('Written:'), self.tr('Threads:'),
+                self.tr('Open files:'))):
+            labelRow.addWidget(QtGui.QLabel(caption, panel))
+            label = self.nodeLabels[name] = QtGui.QLabel('-', panel)
+            labelRow.addWidget(label)
+            labelRow.addStretch()
+        layout.addLayout(labelRow)
+        self.nodeDock.setWidget(panel)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.nodeDock)
+        self.nodeDock.hide()
+        self.nodeDock.visibilityChanged.connect(self.nodeVisibilityChanged)
+        self.ui.menu_View.insertAction(self.ui.action_NetUnits,
+                                       self.nodeDock.toggleViewAction())
+
+    def _setupLabels(self):
+        #pylint: disable=attribute-defined-outside-init
+        # Labels updated from samples are set through a model, so each is
+        # formatted once per frame and only redrawn if its text changed
+        ui = self.ui
+        speedNames = [prefix + suffix for prefix in ('lRecv', 'lSent')
+                      for suffix, _ in traffic.SPEED_SPANS]
+        totalNames = ['lRecvTotal', 'lSentTotal']
+        self.labels = labels.LabelModel()
+        self.labels.define(['lDifficulty'], lambda d: u'%.3g' % d)
+        self.labels.define(speedNames, lambda rate: traffic.formatSpeed(
+            self.byteFormatter, rate))
+        self.labels.define(totalNames, self.byteFormatter)
+        self.labelWidgets = dict(
+            (name, getattr(ui, name)) for name in
+            ['lConns', 'lBlocks', 'lDifficulty', 'lPooledTx'] + speedNames +
+            totalNames)
+        for name, label in self.nodeLabels.items():
+            self.labelWidgets['node ' + name] = label
+
+    def renderLabels(self):
+        self.labels.flush(
+            lambda name, text: self.labelWidgets[name].setText(text))
 
     def readSettings(self):
         ui = self.ui
@@ -391,71 +739,335 @@ recommended to set a wallet encryption passphrase and keep backups."""))
         else:
             self.setWindowTitle(self.origWindowTitle)
         self.rpc = qbitcoinrpc.RPCManager(conf)
+        self.blockIndexFile = os.path.join(
+            DATA_DIR, 'blocks-testnet.dat' if conf.get('testnet', '0') == '1'
+            else 'blocks.dat')
+        self.openBlockIndex(None)
+        if self.nodeProbe is not None:
+            self.nodeProbe.close()
+        self.nodeProbe = nodeprobe.NodeProbe(
+            nodeprobe.pidFilePath(BITCOIN_DATA_DIR, conf))
+        self.connectToNode()
+
+    def connectToNode(self):
+        """Start monitoring the configured node: as a viewer of data shared by
+        a collector if one is running, or else by polling it directly."""
+        self.timer.stop()
+        self.sampleServer.close()
+        self.sampleClient.close()
+        self.collecting = False
+        if SHARE:
+            self.sampleServerName = collector.serverName(
+                self.rpc.url.host(), self.rpc.url.port())
+            self.sampleClient.connectToServer(self.sampleServerName)
+        else:
+            self.startCollecting()
+
+    @QtCore.Slot(bool)
+    def startCollecting(self, stale=False):
+        "Poll the node directly, publishing replies if sharing is enabled."
+        if SHARE:
+            if stale:
+                # Left behind by a collector that didn't exit cleanly
+                QtNetwork.QLocalServer.removeServer(self.sampleServerName)
+            if not self.sampleServer.listen(self.sampleServerName):
+                # Another instance became the collector first; view its data
+                # once it's ready.
+                QtCore.QTimer.singleShot(1000, self.connectToNode)
+                return
+        self.collecting = True
+        if self.blockIndex.file is None:
+            self.openBlockIndex(self.blockIndexFile)
         if not self.timer.isActive():
             self.timer.start()
             QtCore.QTimer.singleShot(0, self.update)
 
+    @QtCore.Slot()
+    def startViewing(self):
+        self.statusNetwork.setText(self.tr('Viewing shared data'))
+        self.openBlockIndex(self.blockIndexFile, readOnly=True)
+
+    @QtCore.Slot()
+    def viewerDisconnected(self):
+        # The collector went away; try to take over from it.
+        if not self.collecting:
+            self.statusNetwork.setText(self.tr('Collector disconnected'))
+            QtCore.QTimer.singleShot(0, self.connectToNode)
+
+    @QtCore.Slot(str, object)
+    def handleSharedReply(self, method, result):
+        handler = replyHandlers.get(method)
+        if handler is None:
+            return
+        try:
+            handler(self, result)
+        except:
+            printException()
+
+    def publishReply(self, method):
+        "Publish the text of the latest chained reply to any viewers."
+        if self.sampleServer.isListening():
+            try:
+                self.sampleServer.publish(method, self.replies[-1].text)
+            except:
+                printException()
+
     def closeEvent(self, _):
         self.writeSettings()
+        self.sampleServer.close()
+        self.blockIndex.close()
 
     def about(self):
         about.AboutDialog(self).show()
 
+    @QtCore.Slot()
+    def profileAction(self):
+        if self.profiler.running:
+            self.stopProfile()
+            return
+        seconds, ok = QtGui.QInputDialog.getInt(
+            self, self.tr('Capture Profile'),
+            self.tr('Profile for how many seconds?'), PROFILE_SECONDS, 1, 3600)
+        if ok:
+            self.startProfile(seconds)
+
+    def toggleProfile(self):
+        "Start a capture of the default length, or stop the running one."
+        if self.profiler.running:
+            self.stopProfile()
+        else:
+            self.startProfile(PROFILE_SECONDS)
+
+    def startProfile(self, seconds):
+        if self.profiler.running:
+            return
+        self.profiler.start()
+        self.profileTimer.start(seconds*1000)
+        self.ui.action_Profile.setText(self.tr('Stop &Profile'))
+        sys.stderr.write('Profiling for %d seconds\n' % seconds)
+
+    @QtCore.Slot()
+    def stopProfile(self):
+        self.profileTimer.stop()
+        self.ui.action_Profile.setText(self.tr('Capture &Profile...'))
+        try:
+            base = self.profiler.stop()
+        except EnvironmentError as e:
+            sys.stderr.write('Error writing profile: %s\n' % e)
+            return
+        if base is not None:
+            sys.stderr.write('Profile written to %s.pstats and .collapsed\n'
+                             % base)
+
     def netUnitBitSI(self):
-        self.byteFormatter.unit_bits = True
-        self.byteFormatter.prefix_si = True
+        self.setNetUnits(True, True)
     def netUnitByteSI(self):
-        self.byteFormatter.unit_bits = False
-        self.byteFormatter.prefix_si = True
+        self.setNetUnits(False, True)
     def netUnitByteBinary(self):
-        self.byteFormatter.unit_bits = False
-        self.byteFormatter.prefix_si = False
+        self.setNetUnits(False, False)
+
+    def setNetUnits(self, bits, si):
+        self.byteFormatter.unit_bits = bits
+        self.byteFormatter.prefix_si = si
+        self.trafficAxis.updateUnits()
+        self.labels.reformat()
+        self.renderScheduler.markDirty('labels')
 
     def plotNetTotals(self):
-        # Find boundary between RRD averages and full-resolution data
-        oldestFullResAge = 0
-        for oldestFullResIndex in xrange(len(self.trafPlotDomain)):
-            if self.trafRecv[oldestFullResIndex] is not None:
-                oldestFullResAge = self.trafPlotDomain[oldestFullResIndex]
-                break
-
-        # Load the RRD averages
-        ages = []
-        recv = []
-        sent = []
-        removeNone = lambda v: 0 if v is None else v
-        now = int(time.time())
-        for (t, values) in self.trafRRD.fetch_all():
-            age = ageOfTime(now, t)
-            if age > oldestFullResAge:
-                ages.append(age)
-                recv.append(removeNone(values[0]))
-                sent.append(removeNone(values[1]))
-            else:
-                break
-
-        # Interpolate with next average to avoid jumpy lines at the boundary
-        if len(ages) > 0:
-            prevAge = ages[-1]
-            if age != prevAge:
-                #pylint: disable=undefined-loop-variable
-                ages.append(oldestFullResAge)
-                blend = (oldestFullResAge - age) / (prevAge - age)
-                interpolate = lambda a, b: a*(1.0-blend) + b*blend
-                recv.append(interpolate(removeNone(values[0]), recv[-1]))
-                sent.append(interpolate(removeNone(values[1]), sent[-1]))
-                oldestFullResIndex += 1
-
-        # Add the full-resolution data (dividing counter differences by the
-        # polling interval to get speeds)
-        ages.extend(self.trafPlotDomain[oldestFullResIndex:])
-        sliceScale = lambda i: numpy.array(tuple(i)[oldestFullResIndex:]) / 2
-        recv.extend(sliceScale(self.trafRecv.differences(0)))
-        sent.extend(sliceScale(self.trafSent.differences(0)))
-
-        # Plot it all
-        self.trafRecvPlot.setData(ages, recv)
-        self.trafSentPlot.setData(ages, sent)
+        "Submit the traffic plot and speeds for preparation."
+        # The RRAs are snapshotted since they're updated in this thread.
+        self.pipeline.submit(
+            'netTotals', traffic.prepareNetTotals,
+            self.trafRRD.fetch_all, clock.now(), list(self.trafTimes),
+            list(self.trafRecv), list(self.trafSent), self.pollInterval)
+
+    @QtCore.Slot(str, object)
+    def applyResult(self, kind, result):
+        with timing.phases.phase('apply ' + kind):
+            self._applyResult(kind, result)
+
+    def _applyResult(self, kind, result):
+        if kind == 'netTotals':
+            self.applyNetTotals(result)
+        elif kind == 'memPoolSample':
+            self.applyMemPoolSample(result)
+        elif kind == 'memPoolView':
+            self.applyMemPool(result)
+        elif kind == 'txHover':
+            self.applyTxHover(result)
+        elif kind == 'txClick':
+            self.showTxDetails(result)
+        elif kind == 'node':
+            self.applyNode(result)
+
+    def applyNetTotals(self, result):
+        self.labels.update(result.speeds)
+        self.renderScheduler.markDirty('labels')
+        self.trafRecvPlot.setData(result.ages, result.recv)
+        self.trafSentPlot.setData(result.ages, result.sent)
+
+    def memPoolView(self):
+        "Return the mempool plot's view range and size in pixels."
+        viewBox = self.memPoolPlot.getViewBox()
+        return viewBox.viewRange(), (viewBox.width(), viewBox.height())
+
+    @QtCore.Slot()
+    def memPoolRangeChanged(self):
+        # Redraw the last sample for the new range if what's shown depends on
+        # it, i.e. unless all points in the range were already drawn.
+        result = self.memPoolResult
+        if result is not None:
+            if result.view is not None and result.view.covers(
+                    self.memPoolView()[0]):
+                return
+            self.renderScheduler.markDirty('memPool')
+
+    def renderMemPool(self):
+        "Submit the latest sample for drawing in the current view."
+        if self.memPoolResult is not None:
+            viewRange, viewSize = self.memPoolView()
+            self.pipeline.submit(
+                'memPoolView', mempool.reviewMemPool, self.memPoolResult,
+                viewRange, viewSize, self.memPoolLimits)
+
+    def memPoolHitTest(self, scenePos, kind):
+        """Submit a search for the transaction nearest a scene position in the
+        mempool plot. Returns False if the position is outside it."""
+        viewBox = self.memPoolPlot.getViewBox()
+        if (self.memPoolResult is None or
+                not viewBox.sceneBoundingRect().contains(scenePos)):
+            return False
+        point = viewBox.mapSceneToView(scenePos)
+        (xMin, xMax), (yMin, yMax) = viewBox.viewRange()
+        radius = ((xMax - xMin) * MEMPOOL_HIT_RADIUS / max(1, viewBox.width()),
+                  (yMax - yMin) * MEMPOOL_HIT_RADIUS / max(1, viewBox.height()))
+        self.pipeline.submit(
+            kind, mempool.hitTest, self.memPoolResult.store,
+            (point.x(), point.y()), radius)
+        return True
+
+    @QtCore.Slot(object)
+    def memPoolMouseMoved(self, scenePos):
+        if not self.memPoolHitTest(scenePos, 'txHover'):
+            self.applyTxHover(None)
+
+    @QtCore.Slot(object)
+    def memPoolMouseClicked(self, event):
+        if event.button() == QtCore.Qt.LeftButton:
+            self.memPoolHitTest(event.scenePos(), 'txClick')
+
+    def applyTxHover(self, details):
+        if details is None:
+            self.memPoolHoverPlot.setData([])
+            QtGui.QToolTip.hideText()
+        else:
+            self.memPoolHoverPlot.setData([details['age']],
+                                          [details['feeRate']])
+            QtGui.QToolTip.showText(
+                QtGui.QCursor.pos(),
+                u'%s\n%.8f BTC/kB' % (details['txid'], details['feeRate']))
+
+    def showTxDetails(self, details):
+        "Show a transaction in the details panel, fetching more if needed."
+        if details is None:
+            return
+        self.txDetails = details
+        cached = self.txDetailsCache.get(details['txid'])
+        if cached is None:
+            self.renderTxDetails()
+            if self.rpc is not None:
+                self.fetchTxDetails(details['txid'])
+        else:
+            self.renderTxDetails(*cached)
+        self.txDetailsDock.show()
+
+    def renderTxDetails(self, entry=None, raw=None):
+        rows = mempool.txDetailRows(self.txDetails, entry, raw)
+        self.txDetailsView.setHtml(u'<table>%s</table>' % u''.join(
+            u'<tr><th align="left">%s</th><td>%s</td></tr>' % (
+                self.tr(label), text) for label, text in rows))
+
+    def fetchTxDetails(self, txid):
+        """Request the pool entry and then the decoded transaction. The pool
+        entry isn't available from older nodes, so failure to get it isn't
+        fatal."""
+        def entryReceived(entry):
+            reply = self.rpc.request('getrawtransaction', txid, 1)
+            reply.finished.connect(lambda raw: rawReceived(entry, raw))
+            reply.error.connect(self.txDetailsError)
+            self.txDetailsReply = reply
+        def rawReceived(entry, raw):
+            self.txDetailsCache[txid] = (entry, raw)
+            self.txDetailsReply = None
+            if self.txDetails is not None and self.txDetails['txid'] == txid:
+                self.renderTxDetails(entry, raw)
+        reply = self.rpc.request('getmempoolentry', txid)
+        reply.finished.connect(entryReceived)
+        reply.error.connect(lambda *_: entryReceived(None))
+        self.txDetailsReply = reply
+
+    @QtCore.Slot(QtNetwork.QNetworkReply.NetworkError, str)
+    def txDetailsError(self, _, err_str):
+        # Most likely the transaction left the pool since it was plotted
+        self.txDetailsReply = None
+        self.txDetailsView.append(
+            self.tr('Could not fetch details: %s') % err_str)
+
+    def applyMemPoolSample(self, result):
+        # Log new samples for the long term (only if we're the collector, as
+        # for traffic)
+        if self.collecting:
+            self.memPoolRRD.update(None, result.summary.values())
+        if result.view is None:
+            # Not drawn while hidden
+            self.memPoolResult = result
+            self.renderScheduler.markDirty('memPool')
+        else:
+            self.applyMemPool(result)
+
+    def applyMemPool(self, result):
+        self.memPoolResult = result
+        view = result.view
+        pens = numpy.empty(len(view.highlight), dtype=object)
+        pens[view.highlight] = self.memPoolHighlightPen
+        self.memPoolScatterPlot.setData(
+            pos=view.positions, pen=pens,
+            size=(10 if view.sizes is None else view.sizes))
+        if view.image is None:
+            self.memPoolDensity.hide()
+        else:
+            self.memPoolDensity.setImage(
+                numpy.log1p(view.image), autoLevels=False,
+                levels=(0, max(1, numpy.log1p(view.image.max()))))
+            self.memPoolDensity.setRect(QtCore.QRectF(*view.rect))
+            self.memPoolDensity.show()
+        # Move the block lines, hiding any left over
+        for line, blockAge in zip(self.blockLines, result.blockAges):
+            line.setValue(blockAge)
+            line.show()
+        for line in self.blockLines[len(result.blockAges):]:
+            line.hide()
+
+    def isExposed(self):
+        """Whether the window is shown and not minimized. Qt 4 doesn't tell
+        whether other windows cover it or it's on another virtual desktop, so
+        it's still drawn then."""
+        return self.isVisible() and not self.isMinimized()
+
+    def changeEvent(self, event):
+        super(MainWindow, self).changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange:
+            # Possibly restored from being minimized
+            self.renderScheduler.schedule()
+
+    def showEvent(self, event):
+        super(MainWindow, self).showEvent(event)
+        self.renderScheduler.schedule()
+
+    def paintEvent(self, event):
+        super(MainWindow, self).paintEvent(event)
+        # Possibly just mapped, after the show or state change event
+        self.renderScheduler.schedule()
 
     @QtCore.Slot(QtGui.QResizeEvent)
     def resizeEvent(self, _):
@@ -490,7 +1102,7 @@ recommended to set a wallet encryption passphrase and keep backups."""))
 
     @QtCore.Slot()
     def resetZoom(self):
-        self.networkPlot.setXRange(0, 10, padding=.02)
+        self.networkPlot.setXRange(0, self.historyLength/60., padding=.02)
         self.networkPlot.enableAutoRange(y=True)
         self.memPoolPlot.enableAutoRange(y=True)
 
@@ -502,9 +1114,10 @@ recommended to set a wallet encryption passphrase and keep backups."""))
             buttons=(QMessageBox.Yes | QMessageBox.No))
         if ret == QMessageBox.Yes:
             self.trafRRD.create()
+            self.trafTimes.clear()
             self.trafRecv.clear()
             self.trafSent.clear()
-            self.plotNetTotals()
+            self.renderScheduler.markDirty('netTotals')
 
     @QtCore.Slot()
     def shutdown(self):
@@ -550,88 +1163,228 @@ recommended to set a wallet encryption passphrase and keep backups."""))
 
     @chainRequest('getnetworkinfo')
     def updateInfo(self, info):
-        self.ui.lConns.setText(str(info['connections']))
+        self.labels.set('lConns', info['connections'])
+        self.renderScheduler.markDirty('labels')
 
     @chainRequest('getmininginfo')
     def updateMiningInfo(self, info):
-        blocks = info['blocks']
-        self.ui.lBlocks.setText(str(blocks))
-        if self.lastBlockCount is None:
-            self.lastBlockCount = blocks
+        self.lastBlockCount = info['blocks']
+        self.labels.set('lBlocks', self.lastBlockCount)
+        self.labels.set('lDifficulty', info['difficulty'])
+        self.labels.set('lPooledTx', info['pooledtx'])
+        self.renderScheduler.markDirty('labels')
+
+    @chainRequest('getbestblockhash')
+    def updateBestBlock(self, bestHash):
+        if bestHash == self.blockIndex.tipHash():
+            return
+        if not self.collecting:
+            # Only the collector syncs the index, so as not to add to the
+            # load on the node; viewers read its file once it has caught up.
+            if self.blockIndex.isStale():
+                self.openBlockIndex(self.blockIndexFile, readOnly=True)
+        elif (bestHash != self.blockSyncFailed and
+              self.blockSyncReply is None):
+            self.syncBlocks(bestHash)
+
+    def openBlockIndex(self, path, readOnly=False):
+        """Replace the block index, with one kept in a file if a path is
+        given."""
+        self.blockIndex.close()
+        self.blockIndex = blocks.BlockIndex(path, readOnly=readOnly)
+        self.blockIndexLive = False
+        self.blockSyncReply = None
+        self.blockSyncFailed = None
+        self.blockHeaders.clear()
+        self.updateBlockTimes()
+
+    def syncBlocks(self, bestHash, depth=BLOCK_REORG_DEPTH):
+        """Bring the block index up to a new best block: get its header for
+        the height, then the best chain hashes at the heights the index lacks
+        or should recheck, then the headers of blocks new to it, with one
+        batch request each."""
+        index = self.blockIndex
+        seen = clock.now() if self.blockIndexLive else None
+        def send(reply, slot):
+            reply.finished.connect(slot)
+            reply.error.connect(
+                lambda _, err_str: self.blockSyncError(bestHash, err_str))
+            self.blockSyncReply = reply
+        def tipReceived(tip):
+            if index is not self.blockIndex:
+                return
+            self.blockHeaders[bestHash] = tip
+            index.truncate(tip['height'])
+            heights = index.syncHeights(tip['height'], BLOCK_BACKFILL, depth)
+            send(self.rpc.batch([('getblockhash', (h,)) for h in heights]),
+                 lambda hashes: hashesReceived(heights, hashes))
+        def hashesReceived(heights, hashes):
+            if index is not self.blockIndex:
+                return
+            missing, deeper = index.checkHashes(zip(heights, hashes))
+            if deeper and depth < BLOCK_BACKFILL:
+                self.syncBlocks(bestHash, depth * 2)
+                return
+            cached = [self.blockHeaders.get(h) for h in missing]
+            fetch = [h for h, header in zip(missing, cached) if header is None]
+            cached = [header for header in cached if header is not None]
+            if fetch:
+                send(self.rpc.batch([('getblockheader', (h,)) for h in fetch]),
+                     lambda headers: headersReceived(cached, headers))
+            else:
+                headersReceived(cached, [])
+        def headersReceived(cached, headers):
+            if index is not self.blockIndex:
+                return
+            for header in headers:
+                self.blockHeaders[header['hash']] = header
+            index.add(cached + headers, seen)
+            self.blockSyncReply = None
+            self.blockIndexLive = True
+            self.updateBlockTimes()
+        header = self.blockHeaders.get(bestHash)
+        if header is None:
+            send(self.rpc.request('getblockheader', bestHash), tipReceived)
         else:
-            if blocks > self.lastBlockCount:
-                #pylint: disable=attribute-defined-outside-init
-                self.lastBlockCount = blocks
-                self.blockRecvTimes.update(time.time())
-        self.ui.lDifficulty.setText(u'%.3g' % info['difficulty'])
-        self.ui.lPooledTx.setText(str(info['pooledtx']))
+            tipReceived(header)
+
+    def blockSyncError(self, bestHash, err_str):
+        # Possibly an older node without getblockheader, so don't keep trying
+        self.blockSyncReply = None
+        self.blockSyncFailed = bestHash
+        if DEBUG:
+            sys.stderr.write('Block index sync error: {}\n'.format(err_str))
+
+    def updateBlockTimes(self):
+        """Take the block line times from the index, and show the interval
+        statistics as the block count's tooltip."""
+        recent = self.blockIndex.recent(BLOCK_BACKFILL)
+        self.blockTimes = list(blocks.arrivalTimes(recent[-BLOCK_LINES:]))
+        lines = []
+        tipHash = self.blockIndex.tipHash()
+        if tipHash is not None:
+            lines.append(self.tr('Best block: %s') % tipHash)
+        stats = blocks.intervalStats(recent)
+        if stats is not None:
+            lines.append(self.tr(
+                'Interval over the last %d blocks: mean %.1f min, median '
+                '%.1f min, longest %.1f min') % (
+                    len(recent) - 1, stats[0] / 60, stats[1] / 60,
+                    stats[2] / 60))
+        orphans = len(self.blockIndex.orphans())
+        if orphans:
+            lines.append(self.tr('Orphaned blocks seen: %d') % orphans)
+        self.ui.lBlocks.setToolTip(u'\n'.join(lines))
 
     @chainRequest('getnettotals')
     def updateNetTotals(self, totals):
-        ui = self.ui
-
-        def format_speed(byte_count, seconds):
-            if byte_count is None:
-                return '-'
-            else:
-                return self.byteFormatter(byte_count/float(seconds)) + '/s'
-
-        # Update in-memory RRAs for high-resolution traffic data and averages
+        # Update in-memory RRAs for high-resolution traffic data
+        # (the node's sample time makes rates accurate even when polling is
+        # late or samples are missed)
         recv = totals['totalbytesrecv']
-        ui.lRecvTotal.setText(self.byteFormatter(recv))
-        self.trafRecv.update(recv)
-        ui.lRecv10s.setText(
-            format_speed(self.trafRecv.difference(-1, -6), 10))
-        ui.lRecv1m.setText(
-            format_speed(self.trafRecv.difference(-1, -31), 60))
-        ui.lRecv10m.setText(
-            format_speed(self.trafRecv.difference(-1, -300), 598))
-
         sent = totals['totalbytessent']
-        ui.lSentTotal.setText(self.byteFormatter(sent))
-        self.trafSent.update(sent)
-        ui.lSent10s.setText(
-            format_speed(self.trafSent.difference(-1, -6), 10))
-        ui.lSent1m.setText(
-            format_speed(self.trafSent.difference(-1, -31), 60))
-        ui.lSent10m.setText(
-            format_speed(self.trafSent.difference(-1, -300), 598))
-
-        # Update RRDtool database for long-term traffic data
         sampleTime = totals['timemillis']
-        self.trafRRD.update(sampleTime, (recv, sent))
-        # Postpone updating the plot until updateMemPool so they can redraw at
-        # the same time
+        self.trafTimes.update(sampleTime / 1000.)
+        self.trafRecv.update(recv)
+        self.trafSent.update(sent)
+
+        # Update RRDtool database for long-term traffic data (only if we're
+        # the collector, as viewers share its data directory)
+        if self.collecting:
+            self.trafRRD.update(sampleTime, (recv, sent))
+        self.sampleNode(sampleTime)
+
+        # Labels and plot are prepared in the background when next drawn
+        self.renderScheduler.markDirty('netTotals')
+
+    def sampleNode(self, sampleTime):
+        "Sample the node's resource usage along with its traffic."
+        if self.nodeProbe is None:
+            return
+        sample = self.nodeSample = self.nodeProbe.sample()
+        if sample is None:
+            # Not running locally (or at all)
+            return
+        self.nodeTimes.update(sampleTime / 1000.)
+        self.nodeCPU.update(sample.values()[0])
+        self.nodeRead.update(sample.readBytes)
+        self.nodeWrite.update(sample.writeBytes)
+        if self.collecting:
+            self.nodeRRD.update(sampleTime, sample.values())
+        self.renderScheduler.markDirty('node')
+
+    @QtCore.Slot(bool)
+    def nodeVisibilityChanged(self, visible):
+        # The panel isn't drawn while hidden
+        if visible:
+            self.renderScheduler.markDirty('node')
+
+    def plotNode(self):
+        "Submit the node panel for preparation, if shown."
+        if not self.nodeDock.isVisible():
+            return
+        self.pipeline.submit(
+            'node', nodeprobe.prepareNode,
+            self.nodeRRD.fetch_all, clock.now(), self.nodeSample,
+            list(self.nodeTimes), list(self.nodeCPU), list(self.nodeRead),
+            list(self.nodeWrite), self.pollInterval, self.nodeFormatter)
+
+    def applyNode(self, result):
+        self.labels.update(dict(('node ' + name, text)
+                                for name, text in result.labels.items()))
+        self.renderScheduler.markDirty('labels')
+        self.nodeCPUPlot.setData(result.ages, result.cpu)
 
     @chainRequest('getrawmempool', True)
     def updateMemPool(self, pool):
-        try:
-            self.plotNetTotals()
-        except:
-            printException()
-        now = time.time()
-        # Limit the number of plot points for performance
-        transactions = islice(pool.values(), MEMPOOL_LIMIT)
-        num_tx = min(len(pool), MEMPOOL_LIMIT)
-        minFreePriority = bitcoinconf.COIN * 144 // 250
-        redPen = pyqtgraph.mkPen((255, 0, 0, 100))
-        pens = [None]*num_tx
-        positions = numpy.empty((num_tx, 2))
-        for i, tx in enumerate(transactions):
-            fee = float(tx['fee']) / math.ceil(float(tx['size'])/1000.)
-            positions[i] = (ageOfTime(now, float(tx['time'])), fee)
-            if int(tx['currentpriority']) >= minFreePriority:
-                pens[i] = redPen
-
-        # Clear previous block lines
-        self.memPoolPlot.clear()
-        self.memPoolScatterPlot.setData(pos=positions, pen=pens)
-        # Re-add the scatter plot after clearing
-        self.memPoolPlot.addItem(self.memPoolScatterPlot)
-        # Draw block lines
-        for blockTime in self.blockRecvTimes:
-            if blockTime is not None:
-                self.memPoolPlot.addLine(x=ageOfTime(now, blockTime))
+        # The store is kept up to date even while hidden, but only drawn while
+        # exposed.
+        if self.isExposed():
+            viewRange, viewSize = self.memPoolView()
+        else:
+            viewRange = viewSize = None
+        self.pipeline.submit(
+            'memPoolSample', mempool.prepareMemPool, self.memPoolStore,
+            pool, clock.now(), self.lastBlockCount, self.blockTimes,
+            viewRange, viewSize, self.memPoolLimits)
+
+    @chainRequest('getpeerinfo')
+    def updatePeers(self, peerInfo):
+        self.peerHistory.update(peerInfo, clock.now())
+        self.renderScheduler.markDirty('peers')
+
+    @QtCore.Slot(bool)
+    def peersVisibilityChanged(self, visible):
+        # The table isn't filled while hidden
+        if visible:
+            self.renderScheduler.markDirty('peers')
+
+    def renderPeers(self):
+        "Fill the peers table, if shown, busiest first."
+        if not self.peersDock.isVisible():
+            return
+        table = self.peersTable
+        rate = lambda r: '-' if r is None else self.byteFormatter(r) + '/s'
+        rows = self.peerHistory.table(PEER_RATE_SPAN)
+        table.setRowCount(len(rows))
+        for row, peer in enumerate(rows):
+            ping = peer.get('pingtime')
+            synced = peer.get('synced_blocks', -1)
+            texts = (
+                peer.get('addr', ''),
+                self.tr('In') if peer.get('inbound') else self.tr('Out'),
+                rate(peer['recvrate']),
+                rate(peer['sendrate']),
+                '-' if ping is None else '%d ms' % (float(ping)*1000),
+                '-' if synced < 0 else str(synced),
+                peer.get('subver', ''),
+            )
+            for column, text in enumerate(texts):
+                item = table.item(row, column)
+                if item is None:
+                    item = QtGui.QTableWidgetItem()
+                    table.setItem(row, column, item)
+                item.setText(text)
 
     @QtCore.Slot(QtNetwork.QNetworkReply.NetworkError, str)
     def netError(self, _, err_str):
@@ -640,10 +1393,7 @@ recommended to set a wallet encryption passphrase and keep backups."""))
         if DEBUG:
             sys.stderr.write(err_str + '\n')
         self.statusNetwork.setText(err_str)
-        try:
-            self.plotNetTotals()
-        except:
-            printException()
+        self.renderScheduler.markDirty('netTotals')
 
     @QtCore.Slot()
     def updateStatusMissedSamples(self):
@@ -663,11 +1413,12 @@ def main(argv=sys.argv[:]):
     global qApp
     argv[0] = 'bitnomon' # Set WM_CLASS on X11
     qApp = QtGui.QApplication(argv)
-    signal.signal(signal.SIGINT, lambda *args: qApp.closeAllWindows())
 
     # Parse arguments
     # TODO: use a proper arg parser; provide help
-    global DEBUG, TESTNET, BITCOIN_DATA_DIR, BITCOIN_CONF
+    global DEBUG, TESTNET, BITCOIN_DATA_DIR, BITCOIN_CONF, SHARE
+    global COLLECTOR_ONLY, MEMPOOL_MEMORY_BUDGET, MEMPOOL_EVICTION
+    global POLL_INTERVAL, HISTORY_LENGTH
     for arg in argv[1:]:
         parts = arg.split('=', 1)
         if parts[0] == '-datadir':
@@ -684,6 +1435,36 @@ def main(argv=sys.argv[:]):
             TESTNET = True
         elif arg == '-d' or arg == '-debug':
             DEBUG = True
+            timing.phases.enabled = True
+        elif arg == '-noshare':
+            SHARE = False
+        elif arg == '-collector':
+            COLLECTOR_ONLY = True
+        elif parts[0] == '-mempoolmem':
+            try:
+                MEMPOOL_MEMORY_BUDGET = int(parts[1])*1024*1024
+            except (IndexError, ValueError):
+                sys.stderr.write('Warning: -mempoolmem needs "=<MiB>"\n')
+        elif parts[0] == '-pollinterval':
+            try:
+                POLL_INTERVAL = float(parts[1])
+            except (IndexError, ValueError):
+                sys.stderr.write('Warning: -pollinterval needs "=<seconds>" '
+                                 '(%g to %g)\n' % (MIN_POLL_INTERVAL,
+                                                    MAX_POLL_INTERVAL))
+        elif parts[0] == '-history':
+            try:
+                HISTORY_LENGTH = float(parts[1])
+            except (IndexError, ValueError):
+                sys.stderr.write('Warning: -history needs "=<seconds>"\n')
+        elif parts[0] == '-mempooleviction':
+            if len(parts) == 2 and parts[1] in (
+                    mempool.MemPoolStore.EVICT_OLDEST,
+                    mempool.MemPoolStore.EVICT_LOWEST_FEE):
+                MEMPOOL_EVICTION = parts[1]
+            else:
+                sys.stderr.write(
+                    'Warning: -mempooleviction needs "=oldest" or "=lowfee"\n')
         else:
             sys.stderr.write('Warning: unknown argument ' + arg + '\n')
 
@@ -701,7 +1482,19 @@ def main(argv=sys.argv[:]):
 
     try:
         mainWin = MainWindow()
-        mainWin.show()
+        def interrupt(*_):
+            # Closing the window directly runs closeEvent even when it's
+            # hidden, as for a collector (closeAllWindows skips hidden
+            # windows), and then there may be no visible window whose
+            # closing would end the event loop.
+            mainWin.close()
+            qApp.quit()
+        signal.signal(signal.SIGINT, interrupt)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1,
+                          lambda *args: mainWin.toggleProfile())
+        if not COLLECTOR_ONLY:
+            mainWin.show()
         return QtGui.qApp.exec_()
     except:
         # PyQt4 segfaults if there's an uncaught exception after
@@ -0,0 +1,615 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Preparation of memory pool data for display"""
+
+from itertools import islice
+import zlib
+
+import numpy
+
+from .age import ageOfTime
+from .bitcoinconf import COIN
+from .spatial import GridIndex
+
+# Priority above which a transaction may be relayed and mined without fee
+MIN_FREE_PRIORITY = COIN * 144 // 250
+
+class MemPoolStore(object):
+
+    """Compact in-memory store of the transactions in the pool.
+
+    Transactions are kept in parallel array columns rather than as the dicts
+    decoded from JSON, with a transaction ID to row index. Rows of removed
+    transactions go on a free list for reuse, and the columns grow by doubling
+    as needed. The store is updated incrementally by sync: only transactions
+    new since the previous sample are read from the RPC result, and ages are
+    derived from arrival times, so existing rows just shift with the clock.
+
+    If a memory budget is given, transactions beyond what fits are evicted:
+    either the oldest or those with the lowest fee rate. Evicted transactions
+    are not re-added while they remain in the pool.
+
+    Column attributes (indexed by row; only rows in "live" are valid):
+        fee          fee in BTC
+        size         size in bytes
+        time         arrival time in seconds
+        priority     priority as of the latest block count
+        feeRate      fee per started kB
+        sampleKey    pseudo-random number derived from the transaction ID,
+                     for stable sampling
+
+    Other attributes:
+        live         array of valid rows, in row order
+        byTime       array of valid rows, in order of arrival time
+        index        dict of transaction ID to row
+        now          time of the latest sync
+        grid         GridIndex of rows by (time, feeRate) for hit-testing, or
+                     None until first needed
+    """
+
+    columns = ('fee', 'size', 'time', 'priority', 'feeRate', 'sampleKey')
+    # Approximate memory per row for the index (transaction ID string, dict
+    # entry and row list reference), for applying the budget
+    indexBytesPerRow = 200
+
+    EVICT_OLDEST = 'oldest'
+    EVICT_LOWEST_FEE = 'lowfee'
+
+    def __init__(self, budget=None, eviction=EVICT_OLDEST, capacity=1024):
+        """budget -- approximate memory limit in bytes, or None
+        eviction -- EVICT_OLDEST or EVICT_LOWEST_FEE
+        capacity -- initial number of rows to allocate"""
+        if eviction not in (self.EVICT_OLDEST, self.EVICT_LOWEST_FEE):
+            raise ValueError('Unknown eviction policy: %s' % eviction)
+        self.budget = budget
+        self.eviction = eviction
+        for name in self.columns:
+            setattr(self, name, numpy.zeros(0))
+        self.valid = numpy.zeros(0, dtype=bool)
+        self.rowTxids = []
+        self.index = {}
+        self.free = []
+        self.evicted = set()
+        self.live = numpy.zeros(0, dtype=int)
+        self.byTime = numpy.zeros(0, dtype=int)
+        self.sortedTimes = numpy.zeros(0)
+        self.now = 0
+        self.blocks = None # block count as of the latest priorities
+        self.grid = None
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, txid):
+        return txid in self.index
+
+    @classmethod
+    def rowBytes(cls):
+        "Approximate memory used per transaction."
+        return 8*len(cls.columns) + 1 + cls.indexBytesPerRow
+
+    @property
+    def capacity(self):
+        return len(self.valid)
+
+    @property
+    def maxRows(self):
+        "Number of transactions that fit in the budget, or None"
+        if self.budget is None:
+            return None
+        return self.budget // self.rowBytes()
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name in self.columns:
+            column = numpy.zeros(capacity)
+            column[:old] = getattr(self, name)
+            setattr(self, name, column)
+        valid = numpy.zeros(capacity, dtype=bool)
+        valid[:old] = self.valid
+        self.valid = valid
+        self.rowTxids.extend([None]*(capacity - old))
+        # Allocation pops from the end, so reverse to fill low rows first
+        self.free.extend(reversed(range(old, capacity)))
+
+    def _allocate(self, count):
+        if len(self.free) < count:
+            self._grow(max(2*self.capacity, self.capacity + count))
+        rows = self.free[len(self.free)-count:]
+        del self.free[len(self.free)-count:]
+        return numpy.array(rows, dtype=int)
+
+    def add(self, txids, transactions):
+        """Add transactions given a list of IDs and a corresponding list of
+        dicts as returned by "getrawmempool true". Returns their rows.
+
+        The time index is only brought up to date by sync."""
+        fee, size, time, priority = memPoolColumns(transactions)
+        rows = self._allocate(len(txids))
+        self.fee[rows] = fee
+        self.size[rows] = size
+        self.time[rows] = time
+        self.priority[rows] = priority
+        self.feeRate[rows] = feePerKB(fee, size)
+        self.sampleKey[rows] = numpy.fromiter(
+            (zlib.crc32(txid.encode('ascii')) & 0xffffffff for txid in txids),
+            float, len(txids))
+        self.valid[rows] = True
+        for row, txid in zip(rows, txids):
+            self.rowTxids[row] = txid
+            self.index[txid] = row
+        if self.grid is not None:
+            self.grid.insert(rows.tolist(), self.time[rows], self.feeRate[rows])
+        return rows
+
+    def remove(self, txids):
+        "Remove transactions by ID, freeing their rows."
+        rows = [self.index.pop(txid) for txid in txids]
+        self.valid[rows] = False
+        for row in rows:
+            self.rowTxids[row] = None
+        self.free.extend(rows)
+        if self.grid is not None:
+            self.grid.remove(rows)
+
+    def evict(self):
+        "Remove transactions as needed to fit the budget."
+        maxRows = self.maxRows
+        if maxRows is None or len(self) <= maxRows:
+            return
+        excess = len(self) - maxRows
+        live = numpy.flatnonzero(self.valid)
+        if self.eviction == self.EVICT_OLDEST:
+            key = self.time[live]
+        else:
+            key = self.feeRate[live]
+        victims = live[numpy.argpartition(key, excess-1)[:excess]]
+        txids = [self.rowTxids[row] for row in victims]
+        self.evicted.update(txids)
+        self.remove(txids)
+
+    def sync(self, pool, now, blocks=None):
+        """Update from the result of "getrawmempool true" at the given time.
+        Priorities change only with the block count, so they are re-read for
+        existing transactions only if it is given and has changed."""
+        self.remove([txid for txid in self.index if txid not in pool])
+        # Filter the time index before freed rows can be reused
+        byTime = self.byTime[self.valid[self.byTime]]
+        self.evicted = set(txid for txid in self.evicted if txid in pool)
+        newTxids = [txid for txid in pool
+                    if txid not in self.index and txid not in self.evicted]
+        newRows = self.add(newTxids, [pool[txid] for txid in newTxids])
+        if blocks is not None and blocks != self.blocks:
+            self.blocks = blocks
+            txids = list(self.index)
+            rows = [self.index[txid] for txid in txids]
+            self.priority[rows] = txColumn([pool[txid] for txid in txids],
+                                           'currentpriority')
+        self.evict()
+        self.live = numpy.flatnonzero(self.valid)
+        self.now = now
+
+        # Merge the new rows into the time index, which is cheaper than
+        # sorting the whole thing again
+        byTime = byTime[self.valid[byTime]]
+        newRows = newRows[self.valid[newRows]]
+        newRows = newRows[numpy.argsort(self.time[newRows], kind='mergesort')]
+        self.byTime = numpy.insert(
+            byTime,
+            numpy.searchsorted(self.time[byTime], self.time[newRows],
+                               side='right'),
+            newRows)
+        self.sortedTimes = self.time[self.byTime]
+
+    def rowsInRange(self, viewRange):
+        """Return the rows with positions inside the view range, using the time
+        index to find the age range without scanning the whole store."""
+        (xMin, xMax), (yMin, yMax) = viewRange
+        # Older means earlier
+        start = numpy.searchsorted(self.sortedTimes, self.now - xMax*60.,
+                                   side='left')
+        end = numpy.searchsorted(self.sortedTimes, self.now - xMin*60.,
+                                 side='right')
+        rows = self.byTime[start:end]
+        fees = self.feeRate[rows]
+        return rows[(fees >= yMin) & (fees <= yMax)]
+
+    def nearest(self, position, radius):
+        """Find the transaction nearest to an (age, fee) position, within an
+        (age, fee) radius (measured as for GridIndex.nearest). Returns its row
+        or None.
+
+        The grid index is built on first use with cells the size of the
+        radius, kept up to date as transactions are added and removed, and
+        rebuilt only when the radius changes by more than a factor of two (as
+        when zooming the plot)."""
+        age, fee = position
+        radiusTime = radius[0]*60.
+        radiusFee = radius[1]
+        if radiusTime <= 0 or radiusFee <= 0:
+            return None
+        if self.grid is None or not self.grid.fitsScale(radiusTime, radiusFee):
+            self.grid = GridIndex(radiusTime, radiusFee)
+            rows = numpy.flatnonzero(self.valid)
+            self.grid.insert(rows.tolist(), self.time[rows], self.feeRate[rows])
+        return self.grid.nearest(
+            self.now - age*60., fee, radiusTime, radiusFee,
+            lambda rows: (self.time[rows], self.feeRate[rows]))
+
+    def details(self, row):
+        """Return a dict of what the store knows about the transaction in a
+        row: txid, age, fee, size, time, priority, feeRate, highlight."""
+        return {
+            'txid': self.rowTxids[row],
+            'age': float(self.ages(row)),
+            'fee': float(self.fee[row]),
+            'size': int(self.size[row]),
+            'time': float(self.time[row]),
+            'priority': float(self.priority[row]),
+            'feeRate': float(self.feeRate[row]),
+            'highlight': bool(self.highlightOf(row)),
+        }
+
+    def txids(self, rows):
+        "Return the transaction IDs for an iterable of rows."
+        return [self.rowTxids[row] for row in rows]
+
+    def ages(self, rows=None):
+        "Ages of the given rows (default all live rows) as of the latest sync"
+        if rows is None:
+            rows = self.live
+        return ageOfTime(self.now, self.time[rows])
+
+    def positionsOf(self, rows):
+        "(n, 2) array of (age, fee) positions of the given rows"
+        return numpy.column_stack((self.ages(rows), self.feeRate[rows]))
+
+    def highlightOf(self, rows):
+        "Boolean array, True for the given rows that have high priority"
+        return self.priority[rows] >= MIN_FREE_PRIORITY
+
+    @property
+    def positions(self):
+        "(n, 2) array of (age, fee) positions of the live rows"
+        return self.positionsOf(self.live)
+
+    @property
+    def highlight(self):
+        "Boolean array, True for live rows with high priority"
+        return self.highlightOf(self.live)
+
+class MemPoolView(object):
+    #pylint: disable=too-few-public-methods
+
+    """What to draw for the current view of the memory pool: either a scatter
+    plot of individual transactions or aggregated markers, or an image of
+    their density.
+
+    Attributes:
+        positions    (n, 2) array of scatter plot positions
+        highlight    boolean array, True for high priority transactions
+        sizes        array of marker sizes for aggregated markers, or None
+        image        2D array of transaction counts per pixel block, indexed
+                     by (age, fee), or None in scatter mode
+        rect         (x, y, width, height) of the image in plot coordinates
+        coverRange   view range outside of which this view is incomplete, or
+                     None if it depends on the exact range
+    """
+
+    def __init__(self, positions, highlight, sizes=None, image=None,
+                 rect=None, coverRange=None):
+        self.positions = positions
+        self.highlight = highlight
+        self.sizes = sizes
+        self.image = image
+        self.rect = rect
+        self.coverRange = coverRange
+
+    def covers(self, viewRange):
+        "Whether this view is still complete for the given range."
+        if self.coverRange is None:
+            return False
+        (xMin, xMax), (yMin, yMax) = viewRange
+        (cxMin, cxMax), (cyMin, cyMax) = self.coverRange
+        return (xMin >= cxMin and xMax <= cxMax and
+                yMin >= cyMin and yMax <= cyMax)
+
+class DetailLimits(object):
+    #pylint: disable=too-few-public-methods
+
+    """Level of detail settings for drawing the memory pool, by number of
+    visible transactions.
+
+    Attributes:
+        points       number of individual points above which a representative
+                     sample is drawn instead
+        aggregate    count above which nearby transactions are merged into
+                     aggregated markers
+        density      count above which a density image is drawn instead
+        margin       fraction of the view range to include on each side when
+                     drawing individual points, so panning doesn't require
+                     redrawing right away
+    """
+
+    def __init__(self, points, aggregate, density, margin=0.25):
+        self.points = points
+        self.aggregate = aggregate
+        self.density = density
+        self.margin = margin
+
+class MemPoolResult(object):
+    #pylint: disable=too-few-public-methods
+
+    """Memory pool data ready for display.
+
+    Attributes:
+        store        MemPoolStore for the whole pool
+        view         MemPoolView for the visible range, or None if not drawn
+        blockAges    ages of block arrival lines
+        count        total number of transactions in the pool
+        summary      FeeSummary of a new sample, or None if re-rendered
+    """
+
+    def __init__(self, store, view, blockAges, count, summary=None):
+        self.store = store
+        self.view = view
+        self.blockAges = blockAges
+        self.count = count
+        self.summary = summary
+
+class FeeSummary(object):
+    #pylint: disable=too-few-public-methods
+
+    """Statistics of one memory pool sample, for logging over the long term.
+
+    Attributes:
+        count        number of transactions
+        bytes        total size of the stored transactions
+        percentiles  tuple of fee rates at FEE_PERCENTILES, or Nones if empty
+    """
+
+    def __init__(self, count, totalBytes, percentiles):
+        self.count = count
+        self.bytes = totalBytes
+        self.percentiles = percentiles
+
+    def values(self):
+        "Values in the order of the rrdmodel.MemPoolRRD data sources"
+        return (self.count, self.bytes) + tuple(self.percentiles)
+
+# Fee rate percentiles to summarize (see FeeSummary)
+FEE_PERCENTILES = (10, 50, 90)
+
+def txColumn(transactions, key):
+    "Extract one field from a sized iterable of transaction dicts as an array."
+    return numpy.fromiter((float(tx[key]) for tx in transactions), float,
+                          len(transactions))
+
+def memPoolColumns(transactions, count=None):
+    """Extract columns from an iterable of transaction dicts as returned by
+    "getrawmempool true", reading at most count of them if given.
+
+    Returns (fee, size, time, priority) arrays."""
+    transactions = list(islice(transactions, count))
+    return tuple(txColumn(transactions, key)
+                 for key in ('fee', 'size', 'time', 'currentpriority'))
+
+def feePerKB(fee, size):
+    "Fee per started kilobyte, as used by the reference client's fee policy."
+    return fee / numpy.ceil(size/1000.)
+
+def percentiles(values, percents):
+    """Nearest-rank percentiles of an array, found with a single partial sort
+    (numpy.partition) rather than sorting the whole array. Returns a list of
+    floats, or of Nones if the array is empty."""
+    count = len(values)
+    if count == 0:
+        return [None]*len(percents)
+    ranks = [min(count-1, max(0, -(-p*count // 100) - 1)) for p in percents]
+    partitioned = numpy.partition(values, ranks)
+    return [float(partitioned[rank]) for rank in ranks]
+
+def feeSummary(store, count=None):
+    """Summarize the transactions in a MemPoolStore as a FeeSummary. count is
+    the number of transactions in the pool, if more than fit in the store;
+    the size and fee rates are of the stored ones only."""
+    live = store.live
+    if count is None:
+        count = len(live)
+    return FeeSummary(count, float(store.size[live].sum()),
+                      tuple(percentiles(store.feeRate[live], FEE_PERCENTILES)))
+
+def densityImage(positions, viewRange, viewSize, blockSize=4):
+    """Bin positions into a 2D histogram covering the view range.
+
+    viewRange -- ((xMin, xMax), (yMin, yMax)) in plot coordinates
+    viewSize -- (width, height) of the view in pixels
+    blockSize -- width and height of image pixels in screen pixels
+
+    Returns (image, rect) as for MemPoolView."""
+    (xMin, xMax), (yMin, yMax) = viewRange
+    shape = tuple(max(1, int(size) // blockSize) for size in viewSize)
+    image, _, _ = numpy.histogram2d(
+        positions[:, 0], positions[:, 1], bins=shape,
+        range=((xMin, xMax), (yMin, yMax)))
+    return image, (xMin, yMin, xMax - xMin, yMax - yMin)
+
+def expandRange(viewRange, margin):
+    "Expand a view range by a fraction of its size on each side."
+    return tuple((lo - (hi-lo)*margin, hi + (hi-lo)*margin)
+                 for lo, hi in viewRange)
+
+def aggregate(positions, highlight, viewRange, viewSize, cellSize=10):
+    """Merge positions falling in the same screen cell into one marker.
+
+    viewSize -- (width, height) of the view in pixels
+    cellSize -- width and height of cells in pixels
+
+    Returns (positions, highlight, sizes) for the markers, placed at the mean
+    position of their transactions, highlighted if any of them are, and sized
+    by the log of their count."""
+    (xMin, xMax), (yMin, yMax) = viewRange
+    columns = max(1, int(viewSize[0]) // cellSize)
+    rows = max(1, int(viewSize[1]) // cellSize)
+    cell = lambda v, lo, hi, n: numpy.clip(
+        ((v - lo) * (n / (hi - lo))).astype(int), 0, n-1)
+    cells = (cell(positions[:, 0], xMin, xMax, columns)*rows +
+             cell(positions[:, 1], yMin, yMax, rows))
+    _, inverse, counts = numpy.unique(cells, return_inverse=True,
+                                      return_counts=True)
+    mean = lambda v: numpy.bincount(inverse, v) / counts
+    markers = numpy.column_stack((mean(positions[:, 0]),
+                                  mean(positions[:, 1])))
+    markerHighlight = numpy.bincount(inverse, highlight) > 0
+    sizes = numpy.minimum(6 + 2*numpy.log2(counts), 30)
+    return markers, markerHighlight, sizes
+
+def strata(positions):
+    """Assign each (age, fee) position to a stratum for sampling: age in
+    powers of two minutes, and fee in quarter decades. The bucket edges are
+    fixed so that transactions stay in the same stratum between samples (other
+    than the slow movement of ageing). Returns an array of stratum numbers."""
+    ages = numpy.maximum(positions[:, 0], 0)
+    fees = positions[:, 1]
+    ageBucket = numpy.floor(numpy.log2(ages + 1)).astype(int)
+    with numpy.errstate(divide='ignore'):
+        feeBucket = numpy.floor(4*numpy.log10(fees))
+    # Zero fees (and anything below 1e-20 BTC/kB) share the lowest bucket
+    feeBucket = numpy.maximum(numpy.nan_to_num(feeBucket), -80).astype(int)
+    return ageBucket*1000 + (feeBucket - feeBucket.min())
+
+def sampleRows(positions, highlight, keys, limit, outlierFraction=0.001):
+    """Choose a representative subset of at most limit transactions.
+
+    Highlighted transactions and outliers (the highest fees and oldest ages,
+    outlierFraction of each) are always included, up to half the limit. The
+    rest is a stratified sample (see strata), with each stratum's share
+    proportional to its size and at least one. Within each group, the
+    transactions with the lowest sampling keys are chosen, so the same ones
+    are picked from one poll to the next and points don't flicker.
+
+    Returns a sorted array of indices into the given arrays."""
+    count = len(positions)
+    if count <= limit:
+        return numpy.arange(count)
+
+    def lowestKeys(indices, n):
+        if len(indices) <= n:
+            return indices
+        return indices[numpy.argpartition(keys[indices], n-1)[:n]]
+
+    outliers = max(1, int(count*outlierFraction))
+    must = highlight.copy()
+    for column in (positions[:, 0], positions[:, 1]):
+        must[numpy.argpartition(column, count-outliers)[count-outliers:]] = True
+    chosen = lowestKeys(numpy.flatnonzero(must), limit // 2)
+
+    rest = numpy.ones(count, dtype=bool)
+    rest[chosen] = False
+    rest = numpy.flatnonzero(rest)
+    budget = limit - len(chosen)
+    stratum = strata(positions[rest])
+    _, inverse, sizes = numpy.unique(stratum, return_inverse=True,
+                                     return_counts=True)
+    quota = numpy.maximum(1, sizes*budget // len(rest))
+    # Rank each transaction within its stratum by key
+    order = numpy.lexsort((keys[rest], inverse))
+    starts = numpy.concatenate(([0], numpy.cumsum(sizes)[:-1]))
+    rank = numpy.empty(len(rest), dtype=int)
+    rank[order] = numpy.arange(len(rest)) - starts[inverse[order]]
+    sampled = rest[rank < quota[inverse]]
+    # The minimum of one per stratum can overshoot the budget slightly
+    sampled = lowestKeys(sampled, budget)
+    return numpy.sort(numpy.concatenate((chosen, sampled)))
+
+def renderMemPool(store, viewRange, viewSize, limits):
+    """Decide how to draw the memory pool in the given view, according to the
+    number of visible transactions and the DetailLimits (see there). Only the
+    transactions within the view range (plus margin) are considered at all.
+    Returns a MemPoolView."""
+    visible = store.rowsInRange(viewRange)
+    if len(visible) > limits.density:
+        image, rect = densityImage(store.positionsOf(visible), viewRange,
+                                   viewSize)
+        return MemPoolView(numpy.empty((0, 2)), numpy.empty(0, dtype=bool),
+                           image=image, rect=rect)
+    if len(visible) > limits.aggregate:
+        positions, highlight, sizes = aggregate(
+            store.positionsOf(visible), store.highlightOf(visible), viewRange,
+            viewSize)
+        return MemPoolView(positions, highlight, sizes)
+
+    coverRange = expandRange(viewRange, limits.margin)
+    rows = store.rowsInRange(coverRange)
+    if len(rows) > limits.points:
+        rows = visible
+        coverRange = viewRange
+    if len(rows) > limits.points:
+        rows = rows[sampleRows(store.positionsOf(rows), store.highlightOf(rows),
+                               store.sampleKey[rows], limits.points)]
+        coverRange = None
+    return MemPoolView(store.positionsOf(rows), store.highlightOf(rows),
+                       coverRange=coverRange)
+
+def prepareMemPool(store, pool, now, blocks, blockTimes, viewRange, viewSize,
+                   limits):
+    """Update a MemPoolStore from the result of "getrawmempool true" and the
+    block count, and compute plot data for the given view (see
+    renderMemPool) and its FeeSummary. The view range may be None to skip
+    drawing. Returns a MemPoolResult."""
+    store.sync(pool, now, blocks)
+    if viewRange is None:
+        view = None
+    else:
+        view = renderMemPool(store, viewRange, viewSize, limits)
+    blockAges = [ageOfTime(now, t) for t in blockTimes if t is not None]
+    return MemPoolResult(store, view, blockAges, len(store),
+                         feeSummary(store, len(pool)))
+
+def hitTest(store, position, radius):
+    """Find the transaction nearest to an (age, fee) position within an (age,
+    fee) radius (see MemPoolStore.nearest). Returns its details dict (see
+    MemPoolStore.details) or None."""
+    row = store.nearest(position, radius)
+    if row is None:
+        return None
+    return store.details(row)
+
+def txDetailRows(details, entry=None, raw=None):
+    """List (label, text) rows describing a transaction, from its details dict
+    (see MemPoolStore.details) and optionally the results of "getmempoolentry"
+    and "getrawtransaction <txid> 1" for it."""
+    rows = [
+        ('ID', details['txid']),
+        ('Age', '%.1f min' % details['age']),
+        ('Size', '%d bytes' % details['size']),
+        ('Fee', '%.8f BTC' % details['fee']),
+        ('Fee rate', '%.8f BTC/kB' % details['feeRate']),
+        ('Priority', '%.6g%s' % (details['priority'],
+                                 ' (high)' if details['highlight'] else '')),
+    ]
+    if entry is not None:
+        if 'depends' in entry:
+            rows.append(('Unconfirmed inputs from', str(len(entry['depends']))))
+        for key, label in (('ancestorcount', 'Ancestors'),
+                           ('descendantcount', 'Descendants')):
+            if key in entry:
+                # Counts include the transaction itself
+                rows.append((label, str(entry[key] - 1)))
+    if raw is not None:
+        rows.append(('Inputs', str(len(raw['vin']))))
+        rows.append(('Outputs', str(len(raw['vout']))))
+        rows.append(('Output total', '%.8f BTC' % sum(
+            float(out['value']) for out in raw['vout'])))
+        rows.append(('Version', str(raw['version'])))
+        rows.append(('Lock time', str(raw['locktime'])))
+    return rows
+
+def reviewMemPool(result, viewRange, viewSize, limits):
+    """Re-render a previous MemPoolResult for a new view range. Returns a new
+    MemPoolResult sharing the same store."""
+    view = renderMemPool(result.store, viewRange, viewSize, limits)
+    return MemPoolResult(result.store, view, result.blockAges, result.count)
@@ -0,0 +1,204 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Resource usage of the monitored node process, read from /proc.
+
+This only works on Linux, and only for a node on the local system, found
+through the PID file it writes in its data directory. Elsewhere the probe just
+finds nothing."""
+
+import errno
+import os
+
+import numpy
+
+from . import bitcoinconf, traffic
+
+def pidFilePath(datadir, conf):
+    """Path of the node's PID file, given the data directory Bitnomon was told
+    to use (None for the default) and the loaded Conf."""
+    datadir = conf.get('datadir') or datadir or bitcoinconf.default_datadir()
+    if conf.get('testnet', '0') == '1':
+        datadir = os.path.join(datadir, 'testnet3')
+    # An absolute "pid" option replaces the data directory
+    return os.path.join(datadir, conf.get('pid', 'bitcoind.pid'))
+
+def parseStat(text, clockTickInterval, pageSize):
+    """Parse the contents of /proc/<pid>/stat, returning (CPU seconds, RSS
+    bytes, thread count)."""
+    # The command name is in parentheses and may contain spaces
+    fields = text[text.rindex(b')')+2:].split()
+    # Numbered from the state, the third field in proc(5)
+    utime, stime = int(fields[11]), int(fields[12])
+    threads = int(fields[17])
+    rss = int(fields[21])
+    return (utime + stime) * clockTickInterval, rss * pageSize, threads
+
+def parseIO(text):
+    "Parse the contents of /proc/<pid>/io, returning (read, written) bytes."
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(b':')
+        values[key] = value
+    return int(values[b'read_bytes']), int(values[b'write_bytes'])
+
+class NodeSample(object):
+    #pylint: disable=too-few-public-methods
+
+    """Resource usage of the node at one time.
+
+    Attributes:
+        cpu          total CPU time used in seconds
+        rss          resident set size in bytes
+        threads      number of threads
+        readBytes    total bytes read from storage, or None if not permitted
+        writeBytes   total bytes written to storage, or None if not permitted
+        fds          number of open file descriptors, or None if not permitted
+    """
+
+    def __init__(self, cpu, rss, threads, readBytes=None, writeBytes=None,
+                 fds=None):
+        self.cpu = cpu
+        self.rss = rss
+        self.threads = threads
+        self.readBytes = readBytes
+        self.writeBytes = writeBytes
+        self.fds = fds
+
+    def values(self):
+        "Values in the order of the NodeRRD data sources"
+        # The CPU counter is in milliseconds, as RRDtool counters are integers
+        return (int(self.cpu * 1000), self.rss, self.readBytes,
+                self.writeBytes, self.threads, self.fds)
+
+class NodeProbe(object):
+
+    """Sampler of the node's resource usage.
+
+    The PID file is read when not attached to a process, and the /proc files
+    are then kept open between samples, so a sample costs a seek and read of
+    each. Reading fails once the process exits, which detaches the probe so
+    it looks for a new PID next time.
+    """
+
+    pageSize = os.sysconf(os.sysconf_names['SC_PAGESIZE'])
+    clockTickInterval = 1. / os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+
+    def __init__(self, pidFile, procDir='/proc'):
+        self.pidFile = pidFile
+        self.procDir = procDir
+        self.pid = None
+        self.statFile = None
+        self.ioFile = None
+
+    def attach(self):
+        "Open the /proc files of the process in the PID file."
+        with open(self.pidFile) as f:
+            pid = int(f.read().strip())
+        self.statFile = open(os.path.join(self.procDir, str(pid), 'stat'),
+                             'rb')
+        try:
+            self.ioFile = open(os.path.join(self.procDir, str(pid), 'io'),
+                               'rb')
+        except EnvironmentError as e:
+            # Only readable for our own processes
+            if e.errno != errno.EACCES:
+                raise
+        self.pid = pid
+
+    def close(self):
+        for f in (self.statFile, self.ioFile):
+            if f is not None:
+                f.close()
+        self.pid = self.statFile = self.ioFile = None
+
+    @staticmethod
+    def read(f):
+        f.seek(0)
+        return f.read()
+
+    def countFds(self):
+        try:
+            return len(os.listdir(os.path.join(self.procDir, str(self.pid),
+                                               'fd')))
+        except EnvironmentError as e:
+            if e.errno != errno.EACCES:
+                raise
+            return None
+
+    def sample(self):
+        "Return a NodeSample, or None if the node isn't running locally."
+        try:
+            if self.pid is None:
+                self.attach()
+            cpu, rss, threads = parseStat(self.read(self.statFile),
+                                          self.clockTickInterval,
+                                          self.pageSize)
+            readBytes = writeBytes = None
+            if self.ioFile is not None:
+                readBytes, writeBytes = parseIO(self.read(self.ioFile))
+            return NodeSample(cpu, rss, threads, readBytes, writeBytes,
+                              self.countFds())
+        except (EnvironmentError, ValueError):
+            self.close()
+            return None
+
+class NodeResult(object):
+    #pylint: disable=too-few-public-methods
+
+    """Node resource usage ready for display.
+
+    Attributes:
+        ages       plot x values
+        cpu        plot y values, CPU usage in percent
+        labels     dict of label name (see NODE_LABELS) to text
+    """
+
+    def __init__(self, ages, cpu, labels):
+        self.ages = ages
+        self.cpu = cpu
+        self.labels = labels
+
+# Names of the labels in the node panel, in display order
+NODE_LABELS = ('cpu', 'rss', 'read', 'write', 'threads', 'fds')
+
+# Averaging span for the CPU and storage rate labels
+RATE_SPAN = 60
+
+def nodeLabels(formatter, sample, times, cpu, read, write, tolerance):
+    """Return a dict of label texts for the latest NodeSample (or None) and
+    rates from the high-resolution arrays."""
+    labels = dict((name, '-') for name in NODE_LABELS)
+    cpuRate = traffic.spanRate(cpu, times, RATE_SPAN, tolerance)
+    if not numpy.isnan(cpuRate):
+        labels['cpu'] = '%.1f%%' % (cpuRate / 10.)
+    labels['read'] = traffic.formatSpeed(
+        formatter, traffic.spanRate(read, times, RATE_SPAN, tolerance))
+    labels['write'] = traffic.formatSpeed(
+        formatter, traffic.spanRate(write, times, RATE_SPAN, tolerance))
+    if sample is not None:
+        labels['rss'] = formatter(sample.rss)
+        labels['threads'] = str(sample.threads)
+        if sample.fds is not None:
+            labels['fds'] = str(sample.fds)
+    return labels
+
+def prepareNode(fetchAll, now, sample, times, cpu, read, write, pollInterval,
+                formatter):
+    """Prepare the node CPU plot and labels from the latest NodeSample (or
+    None), snapshots of the high-resolution sample times, CPU counters in
+    milliseconds and storage byte counters (iterables of values or None,
+    oldest first), and a function returning the NodeRRD averages. The plot is
+    assembled as for traffic (see traffic.plotData). Returns a NodeResult."""
+    times = traffic.counterArray(times)
+    cpu = traffic.counterArray(cpu)
+    read = traffic.counterArray(read)
+    write = traffic.counterArray(write)
+    labels = nodeLabels(formatter, sample, times, cpu, read, write,
+                        pollInterval / 2.)
+    rows = [(t, (values[0], None)) for t, values in fetchAll()]
+    ages, cpuRate, _ = traffic.plotData(
+        rows, now, times, cpu, numpy.full(len(cpu), numpy.nan))
+    # Milliseconds per second to percent
+    return NodeResult(ages, cpuRate / 10., labels)
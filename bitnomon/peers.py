@@ -0,0 +1,148 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Per-peer traffic history"""
+
+import numpy
+
+class PeerHistory(object):
+
+    """Recent samples of "getpeerinfo" for each connected peer.
+
+    Each sampled quantity is a 2D array with a row per peer slot and a column
+    per sample, used as a ring buffer: all peers are sampled at once, so a
+    sample is written to one column for all of them with a single array
+    assignment. Peers are mapped to rows by their node-assigned ID; rows of
+    disconnected peers are cleared and go on a free list for reuse, and the
+    arrays grow by doubling as needed.
+
+    Series attributes (arrays indexed by [row, column]; NaN if undefined):
+        bytesrecv, bytessent    traffic counters
+        pingtime                latest ping round trip in seconds
+        synced                  height of the last block synced with the peer
+
+    Other attributes:
+        times        array of sample times by column
+        latest       column of the latest sample
+        index        dict of peer ID to row
+        info         dict of peer ID to its latest "getpeerinfo" dict
+    """
+
+    series = ('bytesrecv', 'bytessent', 'pingtime', 'synced')
+    # Keys of the series in "getpeerinfo" (synced_blocks was added in Bitcoin
+    # Core 0.10; older versions leave it undefined)
+    keys = ('bytesrecv', 'bytessent', 'pingtime', 'synced_blocks')
+
+    def __init__(self, length, capacity=16):
+        """length -- number of samples to keep
+        capacity -- initial number of peer rows to allocate"""
+        if length < 2:
+            raise ValueError('PeerHistory must keep at least two samples')
+        self.length = length
+        for name in self.series:
+            setattr(self, name, numpy.zeros((0, length)))
+        self.times = numpy.full(length, numpy.nan)
+        self.latest = length - 1
+        self.index = {}
+        self.info = {}
+        self.free = []
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def capacity(self):
+        return len(self.bytesrecv)
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name in self.series:
+            array = numpy.full((capacity, self.length), numpy.nan)
+            array[:old] = getattr(self, name)
+            setattr(self, name, array)
+        self.free.extend(reversed(range(old, capacity)))
+
+    def clear(self):
+        "Forget all samples and peers."
+        self.__init__(self.length, self.capacity)
+
+    def update(self, peers, now):
+        """Add a sample from the result of "getpeerinfo" at the given time in
+        seconds."""
+        byId = dict((peer['id'], peer) for peer in peers)
+        gone = [peerId for peerId in self.index if peerId not in byId]
+        if gone:
+            rows = [self.index.pop(peerId) for peerId in gone]
+            for peerId in gone:
+                del self.info[peerId]
+            for name in self.series:
+                getattr(self, name)[rows] = numpy.nan
+            self.free.extend(rows)
+        new = [peerId for peerId in byId if peerId not in self.index]
+        if len(self.free) < len(new):
+            self._grow(max(2*self.capacity, self.capacity + len(new)))
+        for peerId in new:
+            self.index[peerId] = self.free.pop()
+        self.info = byId
+
+        self.latest = (self.latest + 1) % self.length
+        self.times[self.latest] = now
+        # Rows and values in the same order (one per ID, the last if
+        # repeated)
+        latest = list(byId.items())
+        rows = numpy.fromiter((self.index[peerId] for peerId, _ in latest),
+                              int, len(latest))
+        for name, key in zip(self.series, self.keys):
+            column = getattr(self, name)
+            column[:, self.latest] = numpy.nan
+            column[rows, self.latest] = numpy.fromiter(
+                (float(peer.get(key, numpy.nan)) for _, peer in latest), float,
+                len(latest))
+
+    def ordered(self, array):
+        "Return a copy of a series with columns in order, oldest first."
+        return numpy.roll(array, -(self.latest + 1), axis=-1)
+
+    def rates(self, span):
+        """Average receive and send rates in bytes per second of each row over
+        about the latest span of seconds, or the time each peer has been
+        sampled if less. Returns (recv, sent) arrays, NaN for unused rows and
+        peers with only one sample."""
+        times = self.ordered(self.times)
+        recvHistory = self.ordered(self.bytesrecv)
+        sentHistory = self.ordered(self.bytessent)
+        # Earliest column within the span, then the earliest defined one for
+        # each row from there
+        start = numpy.searchsorted(
+            numpy.nan_to_num(times), times[-1] - span, side='left')
+        start = min(start, self.length - 2)
+        defined = ~numpy.isnan(recvHistory[:, start:])
+        first = start + numpy.argmax(defined, axis=1)
+        rows = numpy.arange(self.capacity)
+        elapsed = times[-1] - times[first]
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            recv = (recvHistory[:, -1] - recvHistory[rows, first]) / elapsed
+            sent = (sentHistory[:, -1] - sentHistory[rows, first]) / elapsed
+        recv[elapsed <= 0] = numpy.nan
+        sent[elapsed <= 0] = numpy.nan
+        return recv, sent
+
+    def table(self, span):
+        """Summarize the connected peers for display, ordered by total traffic
+        rate over the span (see rates), highest first. Returns a list of dicts
+        of their latest "getpeerinfo" fields plus 'recvrate' and 'sendrate'
+        (None if not yet known)."""
+        recv, sent = self.rates(span)
+        rows = []
+        for peerId, row in self.index.items():
+            peer = dict(self.info[peerId])
+            peer['recvrate'] = (None if numpy.isnan(recv[row])
+                                else float(recv[row]))
+            peer['sendrate'] = (None if numpy.isnan(sent[row])
+                                else float(sent[row]))
+            rows.append(peer)
+        rows.sort(key=lambda peer: -((peer['recvrate'] or 0) +
+                                     (peer['sendrate'] or 0)))
+        return rows
@@ -0,0 +1,86 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Background preparation of data for display.
+
+Turning RPC results into plot arrays and label text can take long enough on a
+large memory pool to make the GUI unresponsive, so it's done by a worker
+object in its own thread. The GUI thread submits jobs and only has to apply the
+finished results to its widgets.
+
+Jobs are identified by kind (e.g. 'mempool') and a sequence number. Only the
+latest job of each kind matters: the worker skips jobs that have been
+superseded while waiting in its queue, and results that arrive after a newer
+job was submitted are dropped."""
+
+import itertools
+import sys
+import traceback
+
+from .qtwrapper import QtCore
+from . import timing
+
+class PipelineWorker(QtCore.QObject):
+
+    "Runs preparation jobs; lives in the pipeline thread."
+
+    finished = QtCore.Signal(str, int, object)
+
+    def __init__(self, pipeline):
+        super(PipelineWorker, self).__init__()
+        self.pipeline = pipeline
+
+    @QtCore.Slot(str, int, object)
+    def run(self, kind, seq, job):
+        if seq < self.pipeline.latest.get(kind, seq):
+            return
+        func, args = job
+        try:
+            with timing.phases.phase('prepare ' + kind):
+                result = func(*args)
+        except:
+            #pylint: disable=bare-except
+            traceback.print_exc()
+            return
+        self.finished.emit(kind, seq, result)
+
+class Pipeline(QtCore.QObject):
+
+    """Submits preparation jobs to a worker thread.
+
+    Signals:
+        ready(str, object) -- kind and result of the latest job of that kind
+    """
+
+    ready = QtCore.Signal(str, object)
+    _submit = QtCore.Signal(str, int, object)
+
+    def __init__(self, parent=None):
+        super(Pipeline, self).__init__(parent)
+        self.latest = {}
+        self.seq = itertools.count()
+        self.thread = QtCore.QThread(self)
+        self.worker = PipelineWorker(self)
+        self.worker.moveToThread(self.thread)
+        self._submit.connect(self.worker.run)
+        self.worker.finished.connect(self._finished)
+        self.thread.start()
+
+    def submit(self, kind, func, *args):
+        """Run func(*args) in the worker thread, superseding any pending job of
+        the same kind. Arguments must not be modified after submitting."""
+        seq = next(self.seq)
+        self.latest[kind] = seq
+        self._submit.emit(kind, seq, (func, args))
+
+    def stop(self):
+        "Stop the worker thread, waiting for any running job to finish."
+        self.thread.quit()
+        if not self.thread.wait(5000):
+            sys.stderr.write('Pipeline thread did not stop\n')
+
+    @QtCore.Slot(str, int, object)
+    def _finished(self, kind, seq, result):
+        if seq == self.latest.get(kind):
+            self.ready.emit(kind, result)
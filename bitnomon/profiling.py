@@ -0,0 +1,116 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Profiler capture in the running program.
+
+A capture runs two profilers at once: cProfile in the thread that starts it
+(the GUI thread), for exact call counts and times, and a sampling profiler
+that periodically records the stacks of all threads, for a cheap overall
+picture including the pipeline worker. The samples are written in the
+"collapsed stack" format read by flame graph tools such as flamegraph.pl."""
+
+import collections
+import cProfile
+import os
+import sys
+import threading
+import time
+
+def frameName(frame):
+    "Name of a function in a stack frame, as used in collapsed stacks"
+    code = frame.f_code
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+def collapseStack(frame, root):
+    """Return a collapsed stack string for a frame and its callers: function
+    names from the root (e.g. thread name) to the innermost, separated by
+    semicolons."""
+    names = []
+    while frame is not None:
+        names.append(frameName(frame).replace(';', ':'))
+        frame = frame.f_back
+    names.append(root)
+    names.reverse()
+    return ';'.join(names)
+
+def writeCollapsed(counts, f):
+    "Write a Counter of collapsed stacks to a file, busiest first."
+    for stack, count in counts.most_common():
+        f.write('%s %d\n' % (stack, count))
+
+class StackSampler(threading.Thread):
+
+    """Thread sampling the stacks of all other threads at an interval in
+    seconds. Samples are counted by collapsed stack in the "counts" Counter."""
+
+    def __init__(self, interval=0.005):
+        super(StackSampler, self).__init__(name='StackSampler')
+        self.daemon = True
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.stopping = threading.Event()
+
+    def run(self):
+        #pylint: disable=protected-access
+        while not self.stopping.wait(self.interval):
+            names = dict((thread.ident, thread.name)
+                         for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                name = names.get(ident, 'thread-%d' % ident)
+                self.counts[collapseStack(frame, name)] += 1
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+class ProfileCapture(object):
+
+    """A profiler capture writing its results to a directory.
+
+    Attributes:
+        directory    where to write results
+        running      whether a capture is in progress
+    """
+
+    def __init__(self, directory, interval=0.005):
+        self.directory = directory
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        "Start profiling the calling thread and sampling all threads."
+        if self.running:
+            return
+        self.sampler = StackSampler(self.interval)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """Stop profiling and write the results: cProfile statistics to
+        profile-<time>.pstats (readable with the pstats module) and sampled
+        stacks to profile-<time>.collapsed. Returns the path without
+        extension, or None if not running."""
+        if not self.running:
+            return None
+        self.profile.disable()
+        self.sampler.stop()
+        base = os.path.join(self.directory,
+                            time.strftime('profile-%Y%m%d-%H%M%S'))
+        try:
+            self.profile.dump_stats(base + '.pstats')
+            with open(base + '.collapsed', 'w') as f:
+                writeCollapsed(self.sampler.counts, f)
+        finally:
+            self.profile = None
+            self.sampler = None
+        return base
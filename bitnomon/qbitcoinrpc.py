@@ -32,7 +32,7 @@ import base64
 import json
 
 from .qtwrapper import QtCore, QtNetwork
-from . import __version__
+from . import __version__, timing
 
 class JSONRPCError(Exception):
     "Error returned in JSON-RPC response"
@@ -43,6 +43,24 @@ class JSONRPCError(Exception):
     def __str__(self):
         return 'code: {}, message: {}'.format(*self.args)
 
+def decodeResult(reply_text):
+    """Deserialize the text of a JSON-RPC response, returning its result or
+    raising JSONRPCError. Floating point numbers are parsed as Decimal."""
+    reply_obj = json.loads(reply_text, parse_float=decimal.Decimal)
+    if reply_obj['error'] is not None:
+        raise JSONRPCError(reply_obj['error'])
+    return reply_obj['result']
+
+def decodeBatch(reply_text):
+    """Deserialize the text of a JSON-RPC batch response, returning the
+    results in order of request ID, or raising JSONRPCError if any failed."""
+    replies = json.loads(reply_text, parse_float=decimal.Decimal)
+    replies.sort(key=lambda reply_obj: reply_obj['id'])
+    for reply_obj in replies:
+        if reply_obj['error'] is not None:
+            raise JSONRPCError(reply_obj['error'])
+    return [reply_obj['result'] for reply_obj in replies]
+
 class RPCReply(QtCore.QObject):
     #pylint: disable=too-few-public-methods
 
@@ -63,8 +81,11 @@ class RPCReply(QtCore.QObject):
     finished = QtCore.Signal(object)
     error = QtCore.Signal(QtNetwork.QNetworkReply.NetworkError, str)
 
-    def __init__(self, networkReply):
+    def __init__(self, networkReply, method=None, decode=decodeResult):
         super(RPCReply, self).__init__()
+        self.method = method
+        self.decode = decode
+        self.text = None
         self.networkReply = networkReply
         self.networkReply.setParent(None)
         self.networkReply.finished.connect(self._read_reply)
@@ -80,11 +101,17 @@ class RPCReply(QtCore.QObject):
     def _read_reply(self):
         'Internal slot for handling network reply; emits "finished"'
         self.rtt = QtCore.QDateTime.currentMSecsSinceEpoch() - self._starttime
-        reply_text = bytes(self.networkReply.readAll()).decode('utf8')
-        reply_obj = json.loads(reply_text, parse_float=decimal.Decimal)
-        if reply_obj['error'] is not None:
-            raise JSONRPCError(reply_obj['error'])
-        self.finished.emit(reply_obj['result'])
+        # The raw text is kept so it can be passed on to other Bitnomon
+        # instances without re-encoding (see collector.py)
+        self.text = bytes(self.networkReply.readAll()).decode('utf8')
+        try:
+            with timing.phases.phase('rpc decode'):
+                result = self.decode(self.text)
+        except JSONRPCError as e:
+            # Only for batches, as single errors come with an HTTP error
+            self.error.emit(QtNetwork.QNetworkReply.ProtocolFailure, str(e))
+            return
+        self.finished.emit(result)
 
 class RPCManager(QtCore.QObject):
 
@@ -118,20 +145,36 @@ class RPCManager(QtCore.QObject):
         self.manager = QtNetwork.QNetworkAccessManager()
         self.rpc_id = 0
 
-    def request(self, method, *args):
-        """Invoke a method over the network, optionally with keyword arguments.
-        Returns immediately with an RPCReply."""
-        self.rpc_id += 1
+    def newRequest(self):
         request = QtNetwork.QNetworkRequest(self.url)
         request.setRawHeader('User-Agent', self.useragent)
         request.setRawHeader('Authorization', self.auth)
         request.setRawHeader('Content-Type', 'application/json')
         request.setAttribute(
             QtNetwork.QNetworkRequest.HttpPipeliningAllowedAttribute, True)
-        data = json.dumps({
+        return request
+
+    def requestObject(self, method, args):
+        self.rpc_id += 1
+        return {
             'version': '1.1',
             'method': method,
             'params': args,
             'id': self.rpc_id
-            })
-        return RPCReply(self.manager.post(request, data))
+            }
+
+    def request(self, method, *args):
+        """Invoke a method over the network, optionally with keyword arguments.
+        Returns immediately with an RPCReply."""
+        data = json.dumps(self.requestObject(method, args))
+        return RPCReply(self.manager.post(self.newRequest(), data), method)
+
+    def batch(self, calls):
+        """Invoke several methods in one round trip, given a non-empty list of
+        (method, args) tuples. Returns immediately with an RPCReply, whose
+        result is the list of their results. It fails if any of them
+        does."""
+        data = json.dumps([self.requestObject(method, tuple(args))
+                           for method, args in calls])
+        return RPCReply(self.manager.post(self.newRequest(), data), 'batch',
+                        decodeBatch)
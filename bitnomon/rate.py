@@ -0,0 +1,94 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Display of data rates on plot axes"""
+
+# Import our chosen Qt binding first so pyqtgraph doesn't try to guess
+from . import qtwrapper #pylint: disable=unused-import
+import pyqtgraph
+from math import ceil, log
+
+from .age import genericTickSpacing
+from .cache import LRUCache
+
+def tickPrecision(spacing):
+    "Number of decimal places needed to show multiples of a tick spacing."
+    precision = 0
+    while precision < 6 and abs(round(spacing, precision) - spacing) > \
+            spacing*1e-6:
+        precision += 1
+    return precision
+
+def rateTickSpacing(minVal, maxVal, size, multiplier, binary):
+    """Return [(major, 0), (minor, 0)] tick spacing in bytes per second for
+    an axis showing rates times multiplier (see
+    ByteCountFormatter.unitFor). In the displayed units, spacing is a power of
+    two with binary prefixes, or one, two or five times a power of ten
+    otherwise."""
+    idealPxSpacing = size/20+50
+    idealUnitsPerTick = (maxVal - minVal)*multiplier/size*idealPxSpacing
+    if idealUnitsPerTick <= 0:
+        return [(1./multiplier, 0)]
+    if binary:
+        major = 2.**ceil(log(idealUnitsPerTick, 2))
+        minor = major/2
+    else:
+        major, minor = genericTickSpacing(idealUnitsPerTick)
+    return [(major/multiplier, 0), (minor/multiplier, 0)]
+
+class ByteRateAxisItem(pyqtgraph.AxisItem):
+    #pylint: disable=too-many-ancestors, too-many-public-methods
+
+    """Axis for rates in bytes per second, shown in the units chosen through a
+    ByteCountFormatter. The unit prefix follows the visible range, and the
+    axis label is only laid out again when it changes. Call updateUnits after
+    changing the formatter's settings."""
+
+    # Until set up in __init__, in case the base class sets the range
+    formatter = None
+    multiplier = 1.
+    unit = None
+
+    def __init__(self, formatter, *args, **kwargs):
+        super(ByteRateAxisItem, self).__init__(*args, **kwargs)
+        super(ByteRateAxisItem, self).enableAutoSIPrefix(False)
+        self.formatter = formatter
+        # Labels by (value, precision, multiplier), so each unit mode has
+        # its own
+        self.labelCache = LRUCache(512)
+
+    def setRange(self, mn, mx):
+        super(ByteRateAxisItem, self).setRange(mn, mx)
+        self.updateUnits()
+
+    def updateUnits(self):
+        "Pick the unit for the current range and settings."
+        if self.formatter is None:
+            return
+        multiplier, unit = self.formatter.unitFor(
+            max(abs(self.range[0]), abs(self.range[1])))
+        if multiplier != self.multiplier:
+            self.multiplier = multiplier
+            self.picture = None
+            self.update()
+        if unit != self.unit:
+            self.unit = unit
+            self.setLabel(units=unit + '/s')
+
+    def tickSpacing(self, minVal, maxVal, size):
+        return rateTickSpacing(minVal, maxVal, size, self.multiplier,
+                               not self.formatter.prefix_si)
+
+    def tickStrings(self, values, scale, spacing):
+        multiplier = self.multiplier
+        precision = tickPrecision(spacing*multiplier)
+        labels = []
+        for v in values:
+            key = (v, precision, multiplier)
+            label = self.labelCache.get(key)
+            if label is None:
+                label = self.labelCache[key] = '%.*f' % (precision,
+                                                         v*multiplier)
+            labels.append(label)
+        return labels
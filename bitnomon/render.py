@@ -0,0 +1,57 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Coalescing of display updates.
+
+New data marks parts of the display dirty rather than redrawing them right
+away. Dirty parts are redrawn together at most once per frame, and only while
+the window is exposed; a hidden window accumulates dirty marks until it's
+shown again, then redraws once from the latest data."""
+
+from .qtwrapper import QtCore
+
+class RenderScheduler(QtCore.QObject):
+
+    """Calls registered render functions for dirty parts of the display.
+
+    isExposed -- function returning whether the display is shown, that is not
+        hidden or minimized
+    frameInterval -- minimum time between redraws in milliseconds
+    """
+
+    def __init__(self, isExposed, frameInterval=33, parent=None):
+        super(RenderScheduler, self).__init__(parent)
+        self.isExposed = isExposed
+        self.renderers = []
+        self.dirty = set()
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(frameInterval)
+        self.timer.timeout.connect(self._flush)
+
+    def add(self, name, render):
+        """Register a render function for a named part of the display.
+        Functions are called in the order registered."""
+        self.renderers.append((name, render))
+
+    def markDirty(self, name):
+        "Mark a part of the display as needing to be redrawn."
+        self.dirty.add(name)
+        self.schedule()
+
+    def schedule(self):
+        """Redraw dirty parts at the next frame, if any. Call this when the
+        display may have become exposed."""
+        if self.dirty and not self.timer.isActive():
+            self.timer.start()
+
+    @QtCore.Slot()
+    def _flush(self):
+        if not self.isExposed():
+            return
+        dirty = self.dirty
+        self.dirty = set()
+        for name, render in self.renderers:
+            if name in dirty:
+                render()
@@ -4,22 +4,39 @@
 
 import os
 import sys
-import time
 import decimal
 
 import rrdtool
 
+from . import clock, timing
+
 if sys.version_info[0] > 2:
     #pylint: disable=redefined-builtin,invalid-name
     xrange = range
 
 class RRDModel(object):
 
-    "Round-robin database model."
-
-    # Needs refactoring into a generic RRDModel base class and a specific
-    # implementation for traffic data.
-
+    """Round-robin database model.
+
+    The database layout is given by class attributes, which subclasses
+    override for other kinds of data; the defaults describe the traffic
+    database, with inbound and outbound byte counters.
+
+    Attributes:
+        filename       name of the RRD file within the data directory
+        dataSources    sequence of (name, type) of data sources, where type is
+                       an RRDtool type such as DERIVE or GAUGE
+        heartbeat      seconds without an update before values are unknown
+        step           base resolution in seconds
+        consolidation  sequence of (steps per row, row count) of archives
+    """
+
+    filename = 'traffic.rrd'
+    dataSources = (
+        ('inbound', 'DERIVE'),
+        ('outbound', 'DERIVE'),
+    )
+    heartbeat = 60
     step = 60
     consolidation = (
         (1, 360),    # every minute for 6 hours
@@ -29,42 +46,38 @@ class RRDModel(object):
     )
 
     def __init__(self, data_dir):
-        self.rrd_file = os.path.join(data_dir, 'traffic.rrd')
+        self.rrd_file = os.path.join(data_dir, self.filename)
         if not os.path.exists(self.rrd_file):
             self.create()
 
     def create(self):
         "Create a new RRD file."
-        data_source_type = 'DERIVE'
         # would prefer start = 0, but the black magic that is rrd_parsetime.c
         # doesn't accept a second count before 1980
         start = str(86400*365*20)
         step = str(self.step)
-        heartbeat = step
+        heartbeat = str(self.heartbeat)
         min_val = '0'
         max_val = 'U'
-        consolidation = ['RRA:AVERAGE:0.5:%d:%d' % (res, count)
-                         for (res, count) in self.consolidation]
         args = [self.rrd_file, '--start', start, '--step', step]
-        args.append(':'.join(('DS', 'inbound', data_source_type, heartbeat,
-                              min_val, max_val)))
-        args.extend(consolidation)
-        args.append(':'.join(('DS', 'outbound', data_source_type, heartbeat,
-                              min_val, max_val)))
-        args.extend(consolidation)
+        for name, data_source_type in self.dataSources:
+            args.append(':'.join(('DS', name, data_source_type, heartbeat,
+                                  min_val, max_val)))
+        args.extend('RRA:AVERAGE:0.5:%d:%d' % (res, count)
+                    for (res, count) in self.consolidation)
         rrdtool.create(*args)
 
+    @timing.timed('rrd update')
     def update(self, t, vals):
         """Add a record to the RRD.
 
         t -- timestamp in milliseconds, or None for current time
-        vals -- iterable of sample values"""
+        vals -- iterable of sample values, or None if unknown"""
         if t is None:
-            time_str = 'N'
-        else:
-            time_str = str(decimal.Decimal(t) / 1000)
-        rrdtool.update(self.rrd_file,
-                       ':'.join([time_str] + [str(v) for v in vals]))
+            t = int(clock.now() * 1000)
+        time_str = str(decimal.Decimal(t) / 1000)
+        rrdtool.update(self.rrd_file, ':'.join(
+            [time_str] + ['U' if v is None else str(v) for v in vals]))
 
     def fetch(self, start, end=None, resolution=1):
         """Fetch data from the RRD.
@@ -75,7 +88,7 @@ class RRDModel(object):
                time
         resolution -- resolution in seconds"""
         if end is None:
-            end = int(time.time())
+            end = int(clock.now())
         if start < 0:
             start += end
         end -= end % resolution
@@ -89,6 +102,7 @@ class RRDModel(object):
         times = range(ts_start, ts_end, ts_res)
         return zip(times, values)
 
+    @timing.timed('rrd fetch')
     def fetch_all(self):
         step = self.step
         latest = rrdtool.last(self.rrd_file)
@@ -105,6 +119,38 @@ class RRDModel(object):
             result.extend(self.fetch(start, end, step*res))
         return result
 
+class MemPoolRRD(RRDModel):
+
+    """Long-term memory pool statistics: transaction count, total size, and
+    fee rate percentiles (see mempool.feeSummary)."""
+
+    filename = 'mempool.rrd'
+    dataSources = (
+        ('count', 'GAUGE'),
+        ('bytes', 'GAUGE'),
+        ('fee10', 'GAUGE'),
+        ('fee50', 'GAUGE'),
+        ('fee90', 'GAUGE'),
+    )
+    # Unlike counters, gauges can be averaged over a missed sample or two
+    heartbeat = 180
+
+class NodeRRD(RRDModel):
+
+    """Long-term resource usage of the node process (see nodeprobe.py): CPU
+    time in milliseconds, RSS, storage bytes read and written, and thread and
+    file descriptor counts."""
+
+    filename = 'node.rrd'
+    dataSources = (
+        ('cpu', 'DERIVE'),
+        ('rss', 'GAUGE'),
+        ('read', 'DERIVE'),
+        ('write', 'DERIVE'),
+        ('threads', 'GAUGE'),
+        ('fds', 'GAUGE'),
+    )
+
 class RRA(object):
 
     """Simple in-memory round-robin archive.
@@ -0,0 +1,86 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Spatial indexing for hit-testing plot points"""
+
+import numpy
+
+class GridIndex(object):
+
+    """Uniform grid over 2D points, for finding the nearest point to a
+    position in time proportional to the points near it rather than the total.
+
+    Points are identified by integer IDs (e.g. rows of a column store) and can
+    be inserted and removed incrementally. The cell size should be about the
+    search radius; see fitsScale.
+
+    Attributes:
+        cellWidth, cellHeight    cell size in data units
+        cells                    dict of (column, row) to set of IDs
+    """
+
+    def __init__(self, cellWidth, cellHeight):
+        self.cellWidth = float(cellWidth)
+        self.cellHeight = float(cellHeight)
+        self.cells = {}
+        self.cellOf = {}
+
+    def __len__(self):
+        return len(self.cellOf)
+
+    def fitsScale(self, cellWidth, cellHeight, tolerance=2.):
+        """Whether the cell size is within a factor of tolerance of the given
+        one in both dimensions, i.e. good enough to not need rebuilding."""
+        ratios = (self.cellWidth/cellWidth, self.cellHeight/cellHeight)
+        return all(1./tolerance <= r <= tolerance for r in ratios)
+
+    def _cellCoords(self, x, y):
+        return (numpy.floor(numpy.asarray(x) / self.cellWidth).astype(int),
+                numpy.floor(numpy.asarray(y) / self.cellHeight).astype(int))
+
+    def insert(self, ids, x, y):
+        "Insert points given arrays of IDs and coordinates."
+        columns, rows = self._cellCoords(x, y)
+        for pointId, column, row in zip(ids, columns.tolist(), rows.tolist()):
+            cell = (column, row)
+            self.cells.setdefault(cell, set()).add(pointId)
+            self.cellOf[pointId] = cell
+
+    def remove(self, ids):
+        "Remove points by ID, ignoring any not in the index."
+        for pointId in ids:
+            cell = self.cellOf.pop(pointId, None)
+            if cell is not None:
+                members = self.cells[cell]
+                members.discard(pointId)
+                if not members:
+                    del self.cells[cell]
+
+    def nearest(self, x, y, radiusX, radiusY, coords):
+        """Find the nearest point within an elliptical radius of (x, y).
+
+        coords -- function taking an array of IDs and returning arrays of
+                  their (x, y) coordinates
+
+        Distance is measured in units of the radius in each dimension, so it
+        corresponds to screen distance when the radii are the same number of
+        pixels. Returns the ID of the nearest point, or None."""
+        (column0, column1), (row0, row1) = self._cellCoords(
+            (x - radiusX, x + radiusX), (y - radiusY, y + radiusY))
+        candidates = []
+        cells = self.cells
+        for column in range(column0, column1+1):
+            for row in range(row0, row1+1):
+                members = cells.get((column, row))
+                if members:
+                    candidates.extend(members)
+        if not candidates:
+            return None
+        candidates = numpy.array(candidates)
+        px, py = coords(candidates)
+        distance = ((px - x)/radiusX)**2 + ((py - y)/radiusY)**2
+        best = numpy.argmin(distance)
+        if distance[best] > 1:
+            return None
+        return int(candidates[best])
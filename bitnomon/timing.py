@@ -0,0 +1,169 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Timing of named program phases, for finding where the time goes.
+
+Code on hot paths wraps its work in a phase:
+
+    with timing.phases.phase('rrd update'):
+        ...
+
+or decorates a function with timing.timed('name'). While the module-level
+PhaseTimers (timing.phases) is disabled, which is the default, a phase is a
+shared do-nothing context manager, so the cost is one attribute check and
+call."""
+
+import functools
+import json
+import time
+
+import numpy
+
+class NullPhase(object):
+
+    "Context manager that does nothing, for when timing is disabled"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+NULL_PHASE = NullPhase()
+
+class Phase(object):
+
+    "Context manager recording the duration of one run of a phase"
+
+    def __init__(self, history):
+        self.history = history
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *_):
+        self.history.add(time.time() - self.start)
+        return False
+
+class PhaseHistory(object):
+
+    """Rolling record of the durations of a phase: the latest ones in a ring
+    buffer for percentiles and histograms, and running totals for all.
+
+    Attributes:
+        durations    array of the latest durations in seconds (in ring order;
+                     only the first min(count, len) are valid)
+        count        total number of runs
+        total        total duration in seconds
+        longest      longest duration in seconds
+    """
+
+    def __init__(self, length):
+        self.durations = numpy.zeros(length)
+        self.count = 0
+        self.total = 0.
+        self.longest = 0.
+
+    def add(self, duration):
+        self.durations[self.count % len(self.durations)] = duration
+        self.count += 1
+        self.total += duration
+        self.longest = max(self.longest, duration)
+
+    def recent(self):
+        "Array of the latest durations, in no particular order"
+        return self.durations[:min(self.count, len(self.durations))]
+
+    def stats(self):
+        """Return a dict of count, total, mean, longest, and 50th/90th/99th
+        percentiles of the recent durations (p50, p90, p99), in seconds."""
+        recent = self.recent()
+        stats = {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.,
+            'longest': self.longest,
+        }
+        for percent in (50, 90, 99):
+            stats['p%d' % percent] = (
+                float(numpy.percentile(recent, percent)) if len(recent)
+                else 0.)
+        return stats
+
+    def histogram(self, edges):
+        "Counts of recent durations between the given bin edges in seconds."
+        return numpy.histogram(self.recent(), edges)[0]
+
+# Histogram bin edges: decades from 10 microseconds to 10 seconds
+HISTOGRAM_EDGES = 10. ** numpy.arange(-5, 2)
+
+class PhaseTimers(object):
+
+    """Collection of PhaseHistory by phase name.
+
+    Attributes:
+        enabled      whether phases are timed
+        length       number of recent durations kept per phase
+        histories    dict of phase name to PhaseHistory
+    """
+
+    def __init__(self, length=1000, enabled=False):
+        self.enabled = enabled
+        self.length = length
+        self.histories = {}
+
+    def phase(self, name):
+        "Return a context manager timing a run of the named phase."
+        if not self.enabled:
+            return NULL_PHASE
+        history = self.histories.get(name)
+        if history is None:
+            history = self.histories[name] = PhaseHistory(self.length)
+        return Phase(history)
+
+    def clear(self):
+        self.histories.clear()
+
+    def stats(self):
+        """Return a list of (name, stats dict) of all phases (see
+        PhaseHistory.stats), by total time, highest first."""
+        result = [(name, history.stats())
+                  for name, history in self.histories.items()]
+        result.sort(key=lambda item: -item[1]['total'])
+        return result
+
+    def writeCSV(self, f):
+        "Write the stats of each phase to a file as CSV."
+        columns = ('count', 'total', 'mean', 'p50', 'p90', 'p99', 'longest')
+        f.write(','.join(('"phase"',) + tuple('"%s"' % c for c in columns)) +
+                '\n')
+        for name, stats in self.stats():
+            f.write(','.join(['"%s"' % name] +
+                             [repr(stats[c]) for c in columns]) + '\n')
+
+    def writeJSON(self, f):
+        """Write the stats and histograms (counts between HISTOGRAM_EDGES) of
+        each phase to a file as JSON."""
+        phases = {}
+        for name, stats in self.stats():
+            stats['histogram'] = [
+                int(n) for n in self.histories[name].histogram(HISTOGRAM_EDGES)]
+            phases[name] = stats
+        json.dump({'histogramEdges': list(HISTOGRAM_EDGES), 'phases': phases},
+                  f, indent=1, sort_keys=True)
+
+# Timers for the whole program
+phases = PhaseTimers()
+
+def timed(name):
+    "Decorator timing each call of a function as the named phase."
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phases.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
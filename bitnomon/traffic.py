@@ -0,0 +1,153 @@
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Preparation of network traffic data for display"""
+
+import numpy
+
+from .age import ageOfTime
+
+class NetTotalsResult(object):
+    #pylint: disable=too-few-public-methods
+
+    """Traffic data ready for display.
+
+    Attributes:
+        ages       plot x values
+        recv       plot y values for inbound traffic
+        sent       plot y values for outbound traffic
+        speeds     dict of label name to total bytes or average bytes per
+                   second (NaN where undefined; see speedValues)
+    """
+
+    def __init__(self, ages, recv, sent, speeds):
+        self.ages = ages
+        self.recv = recv
+        self.sent = sent
+        self.speeds = speeds
+
+def counterArray(samples):
+    "Convert an iterable of counter values or None to a float array with NaN."
+    return numpy.array([numpy.nan if v is None else v for v in samples],
+                       dtype=float)
+
+def formatSpeed(formatter, rate):
+    "Format a rate in bytes per second using a ByteCountFormatter, or '-'."
+    if numpy.isnan(rate):
+        return '-'
+    else:
+        return formatter(rate) + '/s'
+
+def intervalRates(counters, times):
+    """Rates between subsequent counter samples, divided by the actual time
+    between them (NaN where either sample is undefined)."""
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        rates = numpy.diff(counters) / numpy.diff(times)
+    rates[~numpy.isfinite(rates)] = numpy.nan
+    return rates
+
+def spanRate(counters, times, span, tolerance):
+    """Average rate over the latest span of seconds, from the newest sample
+    and the newest one at least span seconds older (less tolerance, to allow
+    for jitter in sample times). NaN if the samples don't go back that far."""
+    defined = ~(numpy.isnan(counters) | numpy.isnan(times))
+    counters = counters[defined]
+    times = times[defined]
+    if len(times) < 2:
+        return numpy.nan
+    start = numpy.searchsorted(times, times[-1] - span + tolerance,
+                               side='right') - 1
+    if start < 0:
+        return numpy.nan
+    return (counters[-1] - counters[start]) / (times[-1] - times[start])
+
+# Averaging spans for the speed labels, by label suffix
+SPEED_SPANS = (('10s', 10), ('1m', 60), ('10m', 600))
+
+def speedValues(prefix, counters, times, tolerance):
+    """Return a dict of total bytes and average bytes per second for one
+    direction of traffic (NaN where undefined), by the names of the labels
+    showing them in the main window UI, starting with the given prefix. The
+    total is left out if undefined."""
+    speeds = dict((prefix + suffix,
+                   spanRate(counters, times, span, tolerance))
+                  for suffix, span in SPEED_SPANS)
+    if not numpy.isnan(counters[-1]):
+        speeds[prefix + 'Total'] = counters[-1]
+    return speeds
+
+def plotData(rrdRows, now, times, recv, sent):
+    """Assemble the traffic plot from long-term averages and high-resolution
+    data.
+
+    rrdRows -- (time, (inbound, outbound)) rows of RRD averages, oldest first
+    now -- current time in seconds
+    times -- high-resolution sample time array in seconds (NaN where
+             undefined)
+    recv, sent -- high-resolution counter arrays (NaN where undefined)
+
+    Each high-resolution interval is plotted at the age of its later sample.
+    Returns (ages, recv, sent) arrays."""
+
+    intervalAges = ageOfTime(now, times[1:])
+
+    # Find boundary between RRD averages and full-resolution data
+    defined = numpy.flatnonzero(~numpy.isnan(recv[:-1] + times[:-1]))
+    if len(defined) > 0:
+        oldestFullResIndex = int(defined[0])
+        oldestFullResAge = intervalAges[oldestFullResIndex]
+    else:
+        oldestFullResIndex = len(intervalAges)
+        oldestFullResAge = 0
+
+    # Load the RRD averages
+    ages = []
+    recvAvg = []
+    sentAvg = []
+    removeNone = lambda v: 0 if v is None else v
+    age = None
+    values = None
+    for (t, values) in rrdRows:
+        age = ageOfTime(now, t)
+        if age > oldestFullResAge:
+            ages.append(age)
+            recvAvg.append(removeNone(values[0]))
+            sentAvg.append(removeNone(values[1]))
+        else:
+            break
+
+    # Interpolate with next average to avoid jumpy lines at the boundary
+    if len(ages) > 0:
+        prevAge = ages[-1]
+        if age != prevAge:
+            ages.append(oldestFullResAge)
+            blend = (oldestFullResAge - age) / (prevAge - age)
+            interpolate = lambda a, b: a*(1.0-blend) + b*blend
+            recvAvg.append(interpolate(removeNone(values[0]), recvAvg[-1]))
+            sentAvg.append(interpolate(removeNone(values[1]), sentAvg[-1]))
+            oldestFullResIndex += 1
+
+    # Add the full-resolution data
+    rates = lambda c: numpy.nan_to_num(
+        intervalRates(c, times)[oldestFullResIndex:])
+    return (
+        numpy.concatenate((ages, intervalAges[oldestFullResIndex:])),
+        numpy.concatenate((recvAvg, rates(recv))),
+        numpy.concatenate((sentAvg, rates(sent))),
+    )
+
+def prepareNetTotals(fetchAll, now, times, recv, sent, pollInterval):
+    """Prepare the traffic plot and speeds from snapshots of the
+    high-resolution sample times and counters (iterables of values or None,
+    oldest first) and a function returning the RRD averages. Rates are
+    computed from the actual sample times; the nominal poll interval only
+    sets the tolerance for jitter. Returns a NetTotalsResult."""
+    times = counterArray(times)
+    recv = counterArray(recv)
+    sent = counterArray(sent)
+    tolerance = pollInterval / 2.
+    speeds = speedValues('lRecv', recv, times, tolerance)
+    speeds.update(speedValues('lSent', sent, times, tolerance))
+    ages, recvPlot, sentPlot = plotData(fetchAll(), now, times, recv, sent)
+    return NetTotalsResult(ages, recvPlot, sentPlot, speeds)
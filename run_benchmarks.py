@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""CLI script for running performance benchmarks.
+
+Benchmarks live in benchmarks/bench_*.py. Each module has a function
+benchmarks() yielding (name, func) pairs, doing any setup before yielding; the
+runner times calls of func with no arguments. Results (best time per call in
+seconds) are appended to a JSON history file and compared against a baseline
+file, failing if any benchmark got slower than the tolerance allows.
+Baselines depend on the machine, so neither file is kept in the repository."""
+
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'benchmarks')
+
+def loadModules():
+    """Import the benchmark modules, in name order. Modules whose
+    dependencies are missing are reported and skipped."""
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    modules = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, 'bench_*.py'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            modules.append(importlib.import_module(name))
+        except ImportError as e:
+            sys.stdout.write('%s skipped: %s\n' % (name, e))
+    return modules
+
+def timeCall(func, minTime=0.2, repeat=5):
+    """Best time per call of func in seconds, with the number of calls per
+    repetition chosen so a repetition takes about minTime/repeat or more."""
+    timer = timeit.Timer(func)
+    number = 1
+    while number < 10**6 and timer.timeit(number) < minTime/repeat:
+        number *= 10
+    return min(timer.repeat(repeat, number)) / number
+
+def runBenchmarks(modules, prefix):
+    """Time the benchmarks with names starting with prefix. Names start with
+    the module name less "bench_", so other modules' setup is skipped."""
+    results = {}
+    for module in modules:
+        topic = module.__name__[len('bench_'):] + '.'
+        if not (topic.startswith(prefix) or prefix.startswith(topic)):
+            continue
+        for name, func in module.benchmarks():
+            if not name.startswith(prefix):
+                continue
+            seconds = timeCall(func)
+            results[name] = seconds
+            sys.stdout.write('%-40s %12.1f us\n' % (name, seconds*1e6))
+            sys.stdout.flush()
+    return results
+
+def compareBaseline(results, baseline, tolerance):
+    """Print comparison against baseline results and return the names of
+    benchmarks slower than baseline by more than the tolerance factor."""
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        ratio = results[name] / baseline[name]
+        flag = ''
+        if ratio > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        sys.stdout.write('%-40s %8.2fx%s\n' % (name, ratio, flag))
+    return regressions
+
+def loadJSON(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def saveJSON(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+def main():
+    "CLI entry point"
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-k', dest='prefix', default='',
+                        help='only run benchmarks with names starting with '
+                        'this')
+    parser.add_argument('--history',
+                        default=os.path.join(BENCH_DIR, 'history.json'),
+                        help='JSON file to append results to')
+    parser.add_argument('--baseline',
+                        default=os.path.join(BENCH_DIR, 'baseline.json'),
+                        help='JSON file of results to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='save these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown factor counted as a regression')
+    args = parser.parse_args()
+
+    results = runBenchmarks(loadModules(), args.prefix)
+
+    history = loadJSON(args.history, [])
+    history.append({
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'results': results,
+    })
+    saveJSON(args.history, history)
+
+    if args.save_baseline:
+        baseline = loadJSON(args.baseline, {})
+        baseline.update(results)
+        saveJSON(args.baseline, baseline)
+        return 0
+    baseline = loadJSON(args.baseline, None)
+    if baseline is None:
+        sys.stdout.write('No baseline; save one with --save-baseline\n')
+        return 0
+    sys.stdout.write('\nCompared to baseline:\n')
+    regressions = compareBaseline(results, baseline, args.tolerance)
+    return int(bool(regressions))
+
+if __name__ == '__main__':
+    sys.exit(main())
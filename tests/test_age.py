@@ -32,3 +32,36 @@ class StaticTest(unittest.TestCase):
             age.AgeAxisItem.tickStrings(
                 [0, 60, 1440, 1440+61, 1440*500], 1, 1),
             ['0', '1:00', '1:00:00', '1:01:01', '500:00:00'])
+
+class FormatTest(unittest.TestCase):
+
+    def test_formatAge(self):
+        self.assertEqual(age.formatAge(0.25, 2), '0.25')
+        self.assertEqual(age.formatAge(90.5, 1), '1:30.5')
+        self.assertEqual(age.formatAge(1441, 0), '1:00:01')
+        self.assertEqual(age.formatAge(-61, 0), '-1:01')
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        age.spacingCache.clear()
+        age.labelCache.clear()
+
+    def test_tickSpacing(self):
+        spacing = age.AgeAxisItem.tickSpacing(0, 100, 800)
+        self.assertEqual(spacing,
+                         age.AgeAxisItem.computeTickSpacing(0, 100, 800))
+        # Panning by an amount that changes the span by rounding error
+        self.assertIs(age.AgeAxisItem.tickSpacing(0.1, 100.1, 800), spacing)
+        self.assertEqual(len(age.spacingCache), 1)
+
+    def test_tickStrings(self):
+        age.AgeAxisItem.tickStrings([0, 60], 1, 1)
+        self.assertEqual(len(age.labelCache), 2)
+        self.assertEqual(age.AgeAxisItem.tickStrings([60, 120], 1, 1),
+                         ['1:00', '2:00'])
+        self.assertEqual(len(age.labelCache), 3)
+        # Same value at a different precision is formatted separately
+        self.assertEqual(age.AgeAxisItem.tickStrings([60], 1, 0.1),
+                         [age.formatAge(60, 1)])
+        self.assertEqual(len(age.labelCache), 4)
@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from bitnomon import blocks
+
+def header(height, fork=0):
+    return {'height': height, 'hash': '%062x%02x' % (height, fork),
+            'time': 1400000000 + height * 600}
+
+class BlockIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'blocks.dat')
+        self.index = blocks.BlockIndex(self.path, length=10)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.dir)
+
+    def reopen(self):
+        self.index.close()
+        self.index = blocks.BlockIndex(self.path, length=10)
+
+    def test_add(self):
+        self.index.add([header(h) for h in range(100, 103)])
+        self.assertEqual(self.index.tipHeight, 102)
+        self.assertEqual(self.index.tipHash(), header(102)['hash'])
+        self.assertIn(header(101)['hash'], self.index)
+        # Only blocks newly seen as the tip get a first seen time
+        self.index.add([header(103), header(104)], seen=5.)
+        seen = self.index.recent(2)['seen']
+        self.assertTrue(numpy.isnan(seen[0]))
+        self.assertEqual(seen[1], 5.)
+
+    def test_persistence(self):
+        self.index.add([header(h) for h in range(100, 103)])
+        self.index.add([header(103)], seen=7.)
+        self.reopen()
+        self.assertEqual(self.index.tipHeight, 103)
+        self.assertEqual(self.index.hashAt(100), header(100)['hash'])
+        self.assertEqual(self.index.recent(1)['seen'][0], 7.)
+
+    def test_partial_record(self):
+        self.index.add([header(100), header(101)])
+        self.index.close()
+        with open(self.path, 'ab') as f:
+            f.write(b'\0' * 5)
+        self.reopen()
+        self.assertEqual(len(self.index), 2)
+        self.index.add([header(102)])
+        self.reopen()
+        self.assertEqual(self.index.tipHeight, 102)
+
+    def test_reorg(self):
+        self.index.add([header(h) for h in range(100, 104)])
+        missing, deeper = self.index.checkHashes(
+            [(101, header(101)['hash']), (102, header(102, 1)['hash']),
+             (103, header(103, 1)['hash'])])
+        self.assertEqual(missing, [header(102, 1)['hash'],
+                                   header(103, 1)['hash']])
+        self.assertFalse(deeper)
+        self.assertEqual(self.index.tipHeight, 101)
+        self.index.add([header(102, 1), header(103, 1), header(104, 1)])
+        self.reopen()
+        self.assertEqual(self.index.tipHash(), header(104, 1)['hash'])
+        self.assertEqual(list(self.index.orphans()['height']), [102, 103])
+        # Switching back to known blocks needs no headers
+        missing, _ = self.index.checkHashes(
+            [(102, header(102)['hash']), (103, header(103)['hash'])])
+        self.assertEqual(missing, [])
+        self.index.truncate(103)
+        self.assertEqual(self.index.tipHash(), header(103)['hash'])
+        self.assertEqual(list(self.index.orphans()['height']),
+                         [102, 103, 104])
+
+    def test_deeper_fork(self):
+        self.index.add([header(h) for h in range(100, 104)])
+        _, deeper = self.index.checkHashes(
+            [(102, header(102, 1)['hash']), (103, header(103, 1)['hash'])])
+        self.assertTrue(deeper)
+
+    def test_syncHeights(self):
+        self.assertEqual(self.index.syncHeights(105, 3, 2), [103, 104, 105])
+        self.index.add([header(h) for h in range(103, 106)])
+        # Recheck the top of the index, and fill in the new heights
+        self.assertEqual(self.index.syncHeights(107, 10, 2),
+                         [98, 99, 100, 101, 102, 104, 105, 106, 107])
+        self.assertEqual(self.index.syncHeights(105, 3, 2), [104, 105])
+
+    def test_compact(self):
+        self.index.add([header(h) for h in range(100, 120)])
+        self.assertEqual(len(self.index), 20)
+        self.index.add([header(120)])
+        self.assertEqual(len(self.index), 10)
+        self.reopen()
+        self.assertEqual(sorted(self.index.byHeight), list(range(111, 121)))
+
+    def test_read_only(self):
+        missing = os.path.join(self.dir, 'missing.dat')
+        self.assertEqual(len(blocks.BlockIndex(missing, readOnly=True)), 0)
+        self.assertFalse(os.path.exists(missing))
+        self.index.add([header(100)])
+        viewer = blocks.BlockIndex(self.path, readOnly=True)
+        self.assertEqual(viewer.tipHeight, 100)
+        self.assertFalse(viewer.isStale())
+        self.index.add([header(101)], seen=3.)
+        self.assertTrue(viewer.isStale())
+        viewer = blocks.BlockIndex(self.path, readOnly=True)
+        self.assertEqual(viewer.tipHash(), header(101)['hash'])
+        self.assertFalse(viewer.isStale())
+        self.assertFalse(self.index.isStale())
+
+    def test_memory_only(self):
+        index = blocks.BlockIndex()
+        index.add([header(100), header(101)], seen=3.)
+        self.assertEqual(index.tipHeight, 101)
+        self.assertIsNone(index.file)
+
+class StatsTest(unittest.TestCase):
+
+    def test_arrivalTimes(self):
+        index = blocks.BlockIndex()
+        index.add([header(100)])
+        index.add([header(101)], seen=1400060700.)
+        self.assertEqual(list(blocks.arrivalTimes(index.recent(2))),
+                         [1400060000, 1400060700])
+
+    def test_intervalStats(self):
+        index = blocks.BlockIndex()
+        self.assertIsNone(blocks.intervalStats(index.recent(5)))
+        index.add([{'height': h, 'hash': '%064x' % h, 'time': t}
+                   for h, t in ((1, 0), (2, 100), (3, 400), (4, 500))])
+        self.assertEqual(blocks.intervalStats(index.recent(5)),
+                         (500 / 3., 100, 300))
@@ -0,0 +1,29 @@
+import unittest
+from bitnomon.cache import LRUCache
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)
+        cache['c'] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_replace(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a'] = 4
+        cache['c'] = 3
+        self.assertEqual(cache.get('a'), 4)
+        self.assertNotIn('b', cache)
+
+    def test_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
@@ -0,0 +1,37 @@
+import time
+import unittest
+from bitnomon import clock
+
+class VirtualClockTest(unittest.TestCase):
+
+    def test_speed(self):
+        real = [100.]
+        virtual = clock.VirtualClock(1000., 60., lambda: real[0])
+        self.assertEqual(virtual(), 1000.)
+        real[0] += 2
+        self.assertEqual(virtual(), 1120.)
+
+    def test_start(self):
+        virtual = clock.VirtualClock(realTime=lambda: 5.)
+        self.assertEqual(virtual(), 5.)
+
+class SteppedClockTest(unittest.TestCase):
+
+    def test_advance(self):
+        stepped = clock.SteppedClock(1000.)
+        self.assertEqual(stepped(), 1000.)
+        stepped.advance(10)
+        stepped.advance(10)
+        self.assertEqual(stepped(), 1020.)
+        self.assertEqual(stepped.start, 1000.)
+
+class InstallTest(unittest.TestCase):
+
+    def tearDown(self):
+        clock.install(time.time)
+
+    def test_install(self):
+        clock.install(lambda: 42.)
+        self.assertEqual(clock.now(), 42.)
+        clock.install(time.time)
+        self.assertGreater(clock.now(), 42.)
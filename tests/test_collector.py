@@ -0,0 +1,55 @@
+import unittest
+from bitnomon import collector
+from bitnomon.collector import FrameDecoder, encodeFrame
+
+class FrameDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = FrameDecoder()
+
+    def test_round_trip(self):
+        frame = encodeFrame('getnettotals', u'{"result": "\u00e9"}')
+        self.assertEqual(self.decoder.feed(frame),
+                         [('getnettotals', u'{"result": "\u00e9"}')])
+
+    def test_split_frame(self):
+        frame = encodeFrame('getpeerinfo', '[1, 2, 3]')
+        # Split within the header, at its end, and within the body
+        pieces = [frame[:2], frame[2:4], frame[4:9], frame[9:]]
+        self.assertEqual(self.decoder.feed(pieces[0]), [])
+        self.assertEqual(self.decoder.feed(pieces[1]), [])
+        self.assertEqual(self.decoder.feed(pieces[2]), [])
+        self.assertEqual(self.decoder.feed(pieces[3]),
+                         [('getpeerinfo', '[1, 2, 3]')])
+
+    def test_byte_at_a_time(self):
+        data = encodeFrame('a', '1') + encodeFrame('b', '22')
+        frames = []
+        for i in range(len(data)):
+            frames.extend(self.decoder.feed(data[i:i+1]))
+        self.assertEqual(frames, [('a', '1'), ('b', '22')])
+
+    def test_several_frames(self):
+        # Several frames in one chunk, ending partway through another
+        frame = encodeFrame('c', '3')
+        data = encodeFrame('a', '1') + encodeFrame('b', '2') + frame[:3]
+        self.assertEqual(self.decoder.feed(data), [('a', '1'), ('b', '2')])
+        self.assertEqual(self.decoder.feed(frame[3:]), [('c', '3')])
+
+    def test_empty_frames(self):
+        # An empty method and text still make a frame; a frame with no body
+        # at all carries nothing and is skipped
+        data = (encodeFrame('', '') + collector.frameHeader.pack(0) +
+                encodeFrame('a', ''))
+        self.assertEqual(self.decoder.feed(data), [('', ''), ('a', '')])
+
+    def test_large_frame(self):
+        text = 'x' * (8*1024*1024 + 7)
+        data = encodeFrame('getrawmempool', text)
+        frames = []
+        for i in range(0, len(data), 65536):
+            frames.extend(self.decoder.feed(data[i:i+65536]))
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0][0], 'getrawmempool')
+        self.assertEqual(frames[0][1], text)
+        self.assertEqual(self.decoder.feed(b''), [])
@@ -41,3 +41,28 @@ class ByteCountFormatterTest(unittest.TestCase):
         self.assertEqual(f(0), "0 B")
         self.assertEqual(f(-1), "-1 B")
         self.assertEqual(f(-1024), "-1.00 KiB")
+
+class UnitForTest(unittest.TestCase):
+
+    def test_modes(self):
+        f = formatting.ByteCountFormatter()
+        self.assertEqual(f.unitFor(999), (1., 'B'))
+        self.assertEqual(f.unitFor(-2500), (1e-3, 'kB'))
+        f.unit_bits = True
+        self.assertEqual(f.unitFor(100), (8., 'b'))
+        self.assertEqual(f.unitFor(200), (8e-3, 'kb'))
+        f.unit_bits = False
+        f.prefix_si = False
+        self.assertEqual(f.unitFor(1000), (1., 'B'))
+        self.assertEqual(f.unitFor(3*1024**2), (1./1024**2, 'MiB'))
+
+    def test_consistent(self):
+        f = formatting.ByteCountFormatter()
+        for bits in (False, True):
+            for si in (False, True):
+                f.unit_bits = bits
+                f.prefix_si = si
+                for count in (1500, 123456, 9.87e9):
+                    multiplier, unit = f.unitFor(count)
+                    self.assertEqual(f(count),
+                                     u'%.2f %s' % (count * multiplier, unit))
@@ -0,0 +1,36 @@
+import unittest
+from bitnomon.labels import LabelModel
+
+class LabelModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = LabelModel()
+        self.model.define(['rate'], lambda v: '%d/s' % v)
+        self.shown = []
+
+    def flush(self):
+        self.shown = []
+        self.model.flush(lambda name, text: self.shown.append((name, text)))
+        return sorted(self.shown)
+
+    def test_changes_only(self):
+        self.model.set('count', 5)
+        self.model.set('rate', 10)
+        self.assertEqual(self.flush(), [('count', '5'), ('rate', '10/s')])
+        self.model.update({'count': 5, 'rate': 11})
+        self.assertEqual(self.flush(), [('rate', '11/s')])
+        self.assertEqual(self.flush(), [])
+
+    def test_latest_value(self):
+        # Several values before a flush are shown once
+        self.model.set('count', 1)
+        self.model.set('count', 2)
+        self.assertEqual(self.flush(), [('count', '2')])
+
+    def test_reformat(self):
+        self.model.set('rate', 10)
+        self.flush()
+        self.model.define(['rate'], lambda v: '%d B/s' % v)
+        self.assertEqual(self.flush(), [])
+        self.model.reformat()
+        self.assertEqual(self.flush(), [('rate', '10 B/s')])
@@ -0,0 +1,335 @@
+import unittest
+from decimal import Decimal
+import numpy
+from bitnomon import mempool
+
+def tx(fee, size, time, priority=0):
+    return {
+        'fee': Decimal(fee),
+        'size': size,
+        'time': time,
+        'currentpriority': priority,
+    }
+
+class PrepareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = {
+            'a': tx('0.0001', 250, 0),
+            'b': tx('0.0002', 1500, 60, mempool.MIN_FREE_PRIORITY),
+        }
+        self.viewRange = ((0, 10), (0, 1))
+        self.limits = mempool.DetailLimits(10, 10, 10)
+
+    def prepare(self, viewRange=None, viewSize=(4, 4), blockTimes=()):
+        return mempool.prepareMemPool(
+            mempool.MemPoolStore(), self.pool, 120, 1, blockTimes,
+            viewRange or self.viewRange, viewSize, self.limits)
+
+    def test_prepare(self):
+        result = self.prepare(blockTimes=[None, 60])
+        self.assertEqual(result.count, 2)
+        self.assertEqual(len(result.store), 2)
+        view = result.view
+        self.assertIsNone(view.image)
+        self.assertIsNone(view.sizes)
+        self.assertEqual(sorted(map(tuple, view.positions)),
+                         [(1, 0.0001), (2, 0.0001)])
+        self.assertEqual(sorted(view.highlight), [False, True])
+        self.assertEqual(result.blockAges, [1])
+
+    def test_limit(self):
+        self.limits.points = 1
+        result = self.prepare()
+        self.assertEqual(len(result.view.positions), 1)
+        self.assertEqual(len(result.store), 2)
+        self.assertIsNone(result.view.coverRange)
+
+    def test_visible(self):
+        result = self.prepare(((0, 1.5), (0, 1)))
+        self.assertEqual(tuple(result.view.positions[0]), (1, 0.0001))
+        self.assertEqual(len(result.view.positions), 1)
+
+    def test_margin(self):
+        result = self.prepare(((0, 1.9), (0, 1)))
+        self.assertEqual(len(result.view.positions), 2)
+        self.assertTrue(result.view.covers(((0, 2), (0, 1))))
+        self.assertFalse(result.view.covers(((0, 3), (0, 1))))
+
+    def test_aggregate(self):
+        self.pool['c'] = tx('0.0001', 250, -1)
+        self.limits.aggregate = 2
+        result = self.prepare(viewSize=(100, 10))
+        view = result.view
+        # 10 columns of 1 minute each; a and c are merged
+        self.assertEqual(len(view.positions), 2)
+        self.assertEqual(sorted(view.sizes), [6, 8])
+        self.assertEqual(sorted(view.highlight), [False, True])
+        merged = view.positions[numpy.argmax(view.sizes)]
+        self.assertAlmostEqual(merged[0], (2 + 121/60.)/2)
+        self.assertIsNone(view.coverRange)
+
+    def test_density(self):
+        self.limits.density = 1
+        result = self.prepare(viewSize=(20, 8))
+        view = result.view
+        self.assertEqual(len(view.positions), 0)
+        self.assertEqual(view.image.shape, (5, 2))
+        self.assertEqual(view.image.sum(), 2)
+        self.assertEqual(view.image[0, 0], 1)
+        self.assertEqual(view.image[1, 0], 1)
+        self.assertEqual(view.rect, (0, 0, 10, 1))
+
+    def test_hidden(self):
+        result = mempool.prepareMemPool(
+            mempool.MemPoolStore(), self.pool, 120, 1, (), None, None,
+            self.limits)
+        self.assertIsNone(result.view)
+        self.assertEqual(len(result.store), 2)
+        self.assertEqual(result.summary.count, 2)
+        review = mempool.reviewMemPool(result, self.viewRange, (4, 4),
+                                       self.limits)
+        self.assertEqual(len(review.view.positions), 2)
+
+    def test_review(self):
+        result = self.prepare()
+        result = mempool.reviewMemPool(result, ((1.5, 3), (0, 1)), (4, 4),
+                                       self.limits)
+        self.assertEqual(result.count, 2)
+        self.assertEqual(tuple(result.view.positions[0]), (2, 0.0001))
+
+class StoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = mempool.MemPoolStore(capacity=2)
+        self.pool = {
+            'a': tx('0.0001', 250, 0),
+            'b': tx('0.0002', 1500, 60),
+        }
+        self.store.sync(self.pool, 60, 1)
+
+    def position(self, txid):
+        i = list(self.store.live).index(self.store.index[txid])
+        return tuple(self.store.positions[i])
+
+    def test_sync(self):
+        self.assertEqual(len(self.store), 2)
+        self.assertIn('a', self.store)
+        self.assertEqual(self.position('a'), (1, 0.0001))
+        self.assertEqual(sorted(self.store.txids(self.store.live)),
+                         ['a', 'b'])
+
+    def test_incremental(self):
+        del self.pool['a']
+        self.pool['c'] = tx('0.001', 100, 120)
+        # Existing transactions aren't re-read
+        self.pool['b'] = None
+        self.store.sync(self.pool, 180, 1)
+        self.assertEqual(sorted(self.store.txids(self.store.live)),
+                         ['b', 'c'])
+        self.assertEqual(self.position('b'), (2, 0.0001))
+        self.assertEqual(self.position('c'), (1, 0.001))
+
+    def test_free_list(self):
+        del self.pool['a']
+        self.store.sync(self.pool, 60, 1)
+        self.pool['c'] = tx('0.001', 100, 120)
+        self.store.sync(self.pool, 120, 1)
+        # Row of the removed transaction is reused without growing
+        self.assertEqual(self.store.capacity, 2)
+        self.assertEqual(sorted(self.store.live), [0, 1])
+        self.pool['d'] = tx('0.001', 100, 120)
+        self.store.sync(self.pool, 120, 1)
+        self.assertEqual(self.store.capacity, 4)
+        self.assertEqual(len(self.store), 3)
+
+    def test_priority_refresh(self):
+        self.pool['a'] = tx('0.0001', 250, 0, mempool.MIN_FREE_PRIORITY)
+        self.store.sync(self.pool, 60, 1)
+        self.assertFalse(self.store.highlight.any())
+        self.store.sync(self.pool, 60, 2)
+        highlighted = self.store.txids(self.store.live[self.store.highlight])
+        self.assertEqual(highlighted, ['a'])
+
+    def test_time_index(self):
+        self.pool['c'] = tx('0.0001', 100, 30)
+        del self.pool['a']
+        self.store.sync(self.pool, 120, 1)
+        self.pool['d'] = tx('0.001', 100, 10)
+        self.store.sync(self.pool, 120, 1)
+        self.assertEqual(self.store.txids(self.store.byTime), ['d', 'c', 'b'])
+        self.assertEqual(tuple(self.store.sortedTimes), (10, 30, 60))
+        rows = self.store.rowsInRange(((1.1, 1.9), (0, 1)))
+        self.assertEqual(self.store.txids(rows), ['d', 'c'])
+        rows = self.store.rowsInRange(((1.1, 1.9), (0.0005, 1)))
+        self.assertEqual(self.store.txids(rows), ['d'])
+
+    def test_bad_eviction(self):
+        with self.assertRaises(ValueError):
+            mempool.MemPoolStore(eviction='random')
+
+class HitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = mempool.MemPoolStore()
+        self.pool = {
+            'a': tx('0.0001', 250, 0),
+            'b': tx('0.0002', 1500, 60, mempool.MIN_FREE_PRIORITY),
+        }
+        self.store.sync(self.pool, 120, 1)
+
+    def test_hit(self):
+        details = mempool.hitTest(self.store, (1.9, 0.00011), (0.5, 0.0001))
+        self.assertEqual(details['txid'], 'a')
+        self.assertEqual(details['age'], 2)
+        self.assertEqual(details['size'], 250)
+        self.assertFalse(details['highlight'])
+        self.assertIsNone(
+            mempool.hitTest(self.store, (1.5, 0.0001), (0.2, 0.0001)))
+
+    def test_incremental(self):
+        self.assertIsNotNone(self.store.nearest((2, 0.0001), (0.5, 0.0001)))
+        grid = self.store.grid
+        del self.pool['a']
+        self.pool['c'] = tx('0.0001', 250, 10)
+        self.store.sync(self.pool, 120, 1)
+        # Index updated in place, not rebuilt
+        self.assertIs(self.store.grid, grid)
+        row = self.store.nearest((2, 0.0001), (0.5, 0.0001))
+        self.assertEqual(self.store.txids([row]), ['c'])
+        # Zooming far enough rebuilds it
+        self.store.nearest((2, 0.0001), (5, 0.0001))
+        self.assertIsNot(self.store.grid, grid)
+
+    def test_details(self):
+        details = mempool.hitTest(self.store, (1, 0.0001), (0.5, 0.0001))
+        entry = {'depends': ['x'], 'descendantcount': 1}
+        raw = {'vin': [{}], 'vout': [{'value': Decimal('0.5')}] * 2,
+               'version': 1, 'locktime': 0}
+        rows = dict(mempool.txDetailRows(details, entry, raw))
+        self.assertEqual(rows['ID'], 'b')
+        self.assertTrue(rows['Priority'].endswith('(high)'))
+        self.assertEqual(rows['Unconfirmed inputs from'], '1')
+        self.assertEqual(rows['Descendants'], '0')
+        self.assertNotIn('Ancestors', rows)
+        self.assertEqual(rows['Outputs'], '2')
+        self.assertEqual(rows['Output total'], '1.00000000 BTC')
+        self.assertNotIn('Inputs', dict(mempool.txDetailRows(details)))
+
+class EvictionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = {
+            'a': tx('0.0003', 250, 0),
+            'b': tx('0.0001', 250, 60),
+            'c': tx('0.0002', 250, 120),
+        }
+
+    def store(self, eviction):
+        budget = 2*mempool.MemPoolStore.rowBytes()
+        store = mempool.MemPoolStore(budget, eviction)
+        store.sync(self.pool, 120)
+        return store
+
+    def test_oldest(self):
+        store = self.store(mempool.MemPoolStore.EVICT_OLDEST)
+        self.assertEqual(sorted(store.txids(store.live)), ['b', 'c'])
+        # Evicted transactions aren't added back
+        store.sync(self.pool, 180)
+        self.assertEqual(sorted(store.txids(store.live)), ['b', 'c'])
+
+    def test_lowest_fee(self):
+        store = self.store(mempool.MemPoolStore.EVICT_LOWEST_FEE)
+        self.assertEqual(sorted(store.txids(store.live)), ['a', 'c'])
+
+    def test_evicted_leaves_pool(self):
+        store = self.store(mempool.MemPoolStore.EVICT_OLDEST)
+        del self.pool['a']
+        store.sync(self.pool, 180)
+        self.assertEqual(store.evicted, set())
+
+class SampleTest(unittest.TestCase):
+
+    def setUp(self):
+        rand = numpy.random.RandomState(0)
+        self.count = 10000
+        self.positions = numpy.column_stack((
+            rand.exponential(60, self.count),
+            10**rand.uniform(-5, -3, self.count)))
+        self.highlight = numpy.zeros(self.count, dtype=bool)
+        self.highlight[:10] = True
+        self.keys = rand.randint(0, 2**32, self.count).astype(float)
+
+    def sample(self, limit):
+        return mempool.sampleRows(self.positions, self.highlight, self.keys,
+                                  limit)
+
+    def test_small(self):
+        self.assertEqual(len(self.sample(self.count)), self.count)
+
+    def test_bounded(self):
+        rows = self.sample(1000)
+        self.assertLessEqual(len(rows), 1000)
+        self.assertGreater(len(rows), 900)
+        self.assertEqual(len(numpy.unique(rows)), len(rows))
+
+    def test_includes_special(self):
+        rows = set(self.sample(1000))
+        self.assertTrue(set(range(10)) <= rows)
+        self.assertIn(numpy.argmax(self.positions[:, 0]), rows)
+        self.assertIn(numpy.argmax(self.positions[:, 1]), rows)
+
+    def test_representative(self):
+        rows = self.sample(1000)
+        median = numpy.median(self.positions[:, 1])
+        sampleMedian = numpy.median(self.positions[rows, 1])
+        self.assertAlmostEqual(numpy.log10(sampleMedian),
+                               numpy.log10(median), delta=0.1)
+
+    def test_stable(self):
+        rows = self.sample(1000)
+        # Dropping a few transactions hardly changes the choice of the others
+        keep = numpy.arange(100, self.count)
+        self.positions = self.positions[keep]
+        self.highlight = self.highlight[keep]
+        self.keys = self.keys[keep]
+        newRows = keep[self.sample(1000)]
+        common = len(numpy.intersect1d(rows, newRows))
+        self.assertGreater(common, 0.9*len(rows))
+
+class SummaryTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        values = numpy.arange(10, 0, -1, dtype=float)
+        self.assertEqual(mempool.percentiles(values, (10, 50, 90, 100)),
+                         [1, 5, 9, 10])
+        self.assertEqual(mempool.percentiles(values, (0,)), [1])
+        self.assertEqual(mempool.percentiles(numpy.zeros(0), (10, 50)),
+                         [None, None])
+
+    def test_summary(self):
+        store = mempool.MemPoolStore()
+        pool = dict((str(i), tx(str(i/1000.), 100*i, 0)) for i in range(1, 5))
+        result = mempool.prepareMemPool(
+            store, pool, 0, 1, (), ((0, 1), (0, 1)), (4, 4),
+            mempool.DetailLimits(10, 10, 10))
+        summary = result.summary
+        self.assertEqual(summary.values(), (4, 1000, 0.001, 0.002, 0.004))
+        review = mempool.reviewMemPool(result, ((0, 1), (0, 1)), (4, 4),
+                                       mempool.DetailLimits(10, 10, 10))
+        self.assertIsNone(review.summary)
+
+class ColumnTest(unittest.TestCase):
+
+    def test_columns(self):
+        fee, size, time, priority = mempool.memPoolColumns(
+            [tx('0.5', 100, 10, 7), tx('0.25', 2001, 20)], 5)
+        self.assertEqual(tuple(fee), (0.5, 0.25))
+        self.assertEqual(tuple(size), (100, 2001))
+        self.assertEqual(tuple(time), (10, 20))
+        self.assertEqual(tuple(priority), (7, 0))
+
+    def test_feePerKB(self):
+        fee, size, _, _ = mempool.memPoolColumns(
+            [tx('0.5', 100, 10), tx('0.75', 2001, 20)], 5)
+        self.assertEqual(tuple(mempool.feePerKB(fee, size)), (0.5, 0.25))
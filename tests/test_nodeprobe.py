@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from bitnomon import formatting, nodeprobe
+
+STAT = (b'1234 (bitcoin d) S 1 1234 1234 0 -1 4194560 100 0 0 0 '
+        b'250 50 0 0 20 0 12 0 100 500000000 2048 18446744073709551615 '
+        b'1 1 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0')
+IO = (b'rchar: 10\nwchar: 20\nsyscr: 1\nsyscw: 2\nread_bytes: 4096\n'
+      b'write_bytes: 8192\ncancelled_write_bytes: 0\n')
+
+class ParseTest(unittest.TestCase):
+
+    def test_stat(self):
+        cpu, rss, threads = nodeprobe.parseStat(STAT, 0.01, 4096)
+        self.assertAlmostEqual(cpu, 3.)
+        self.assertEqual(rss, 2048*4096)
+        self.assertEqual(threads, 12)
+
+    def test_io(self):
+        self.assertEqual(nodeprobe.parseIO(IO), (4096, 8192))
+
+    def test_pidFilePath(self):
+        self.assertEqual(nodeprobe.pidFilePath('/data', {}),
+                         os.path.join('/data', 'bitcoind.pid'))
+        self.assertEqual(
+            nodeprobe.pidFilePath('/data', {'testnet': '1', 'pid': 'b.pid'}),
+            os.path.join('/data', 'testnet3', 'b.pid'))
+        self.assertEqual(
+            nodeprobe.pidFilePath(None, {'datadir': '/d', 'pid': '/run/b'}),
+            '/run/b')
+
+class NodeProbeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.procDir = os.path.join(self.dir, 'proc')
+        os.makedirs(os.path.join(self.procDir, '1234', 'fd'))
+        for name in ('0', '1', '2'):
+            open(os.path.join(self.procDir, '1234', 'fd', name), 'w').close()
+        self.writeProc('stat', STAT)
+        self.writeProc('io', IO)
+        self.pidFile = os.path.join(self.dir, 'bitcoind.pid')
+        with open(self.pidFile, 'w') as f:
+            f.write('1234\n')
+        self.probe = nodeprobe.NodeProbe(self.pidFile, self.procDir)
+
+    def tearDown(self):
+        self.probe.close()
+        shutil.rmtree(self.dir)
+
+    def writeProc(self, name, data):
+        with open(os.path.join(self.procDir, '1234', name), 'wb') as f:
+            f.write(data)
+
+    def test_sample(self):
+        sample = self.probe.sample()
+        self.assertEqual(self.probe.pid, 1234)
+        self.assertEqual(sample.threads, 12)
+        self.assertEqual(sample.readBytes, 4096)
+        self.assertEqual(sample.writeBytes, 8192)
+        self.assertEqual(sample.fds, 3)
+        self.assertEqual(len(sample.values()), 6)
+
+    def test_persistent(self):
+        self.probe.sample()
+        statFile = self.probe.statFile
+        self.probe.sample()
+        self.assertIs(self.probe.statFile, statFile)
+
+    def test_missing(self):
+        os.remove(self.pidFile)
+        self.assertIsNone(self.probe.sample())
+        self.assertIsNone(self.probe.pid)
+
+    def test_bad_stat(self):
+        self.writeProc('stat', b'garbage')
+        self.assertIsNone(self.probe.sample())
+        self.assertIsNone(self.probe.statFile)
+
+class PrepareNodeTest(unittest.TestCase):
+
+    def test_prepare(self):
+        sample = nodeprobe.NodeSample(2., 1024, 10, 0, 0, 5)
+        times = [None, 0., 30., 60.]
+        cpu = [None, 0, 15000, 30000]
+        read = [None, 0, 600, 1200]
+        result = nodeprobe.prepareNode(
+            lambda: [], 60., sample, times, cpu, read, [None]*4, 2.,
+            formatting.ByteCountFormatter())
+        self.assertEqual(result.labels['cpu'], '50.0%')
+        self.assertEqual(result.labels['threads'], '10')
+        self.assertEqual(result.labels['fds'], '5')
+        self.assertEqual(result.labels['write'], '-')
+        numpy.testing.assert_allclose(result.cpu, [50, 50])
+
+    def test_no_sample(self):
+        result = nodeprobe.prepareNode(
+            lambda: [], 60., None, [None]*3, [None]*3, [None]*3, [None]*3,
+            2., formatting.ByteCountFormatter())
+        self.assertEqual(set(result.labels.values()), set(['-']))
@@ -0,0 +1,83 @@
+import unittest
+import numpy
+from bitnomon.peers import PeerHistory
+
+def peer(peerId, recv, sent, **kwargs):
+    info = {'id': peerId, 'addr': 'peer%d' % peerId, 'bytesrecv': recv,
+            'bytessent': sent, 'pingtime': 0.1, 'synced_blocks': 100}
+    info.update(kwargs)
+    return info
+
+class PeerHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = PeerHistory(4, capacity=2)
+        self.history.update([peer(1, 0, 0), peer(2, 0, 0)], 0)
+        self.history.update([peer(1, 100, 10), peer(2, 20, 20)], 10)
+
+    def test_rates(self):
+        recv, sent = self.history.rates(60)
+        row = self.history.index[1]
+        self.assertEqual((recv[row], sent[row]), (10, 1))
+        row = self.history.index[2]
+        self.assertEqual((recv[row], sent[row]), (2, 2))
+
+    def test_span(self):
+        self.history.update([peer(1, 200, 10), peer(2, 20, 20)], 20)
+        self.history.update([peer(1, 400, 10), peer(2, 20, 20)], 30)
+        self.history.update([peer(1, 500, 10), peer(2, 20, 20)], 40)
+        recv, _ = self.history.rates(20)
+        self.assertEqual(recv[self.history.index[1]], 15)
+        # Wrapped around: only the last 4 samples are kept
+        recv, _ = self.history.rates(100)
+        self.assertEqual(recv[self.history.index[1]], 400/30.)
+
+    def test_disconnect(self):
+        row = self.history.index[1]
+        self.history.update([peer(2, 40, 20), peer(3, 5, 5)], 20)
+        self.assertNotIn(1, self.history.index)
+        # The disconnected peer's row is reused
+        self.assertEqual(self.history.index[3], row)
+        self.assertEqual(self.history.capacity, 2)
+        recv, _ = self.history.rates(60)
+        # Only one sample of the new peer, not mixed with the old one's
+        self.assertTrue(numpy.isnan(recv[row]))
+        self.history.update([peer(2, 40, 20), peer(3, 15, 5)], 30)
+        recv, _ = self.history.rates(60)
+        self.assertEqual(recv[row], 1)
+
+    def test_duplicate_id(self):
+        # Values stay with their own peer's row; the last of a repeated ID
+        # is used
+        self.history.update([peer(2, 40, 20), peer(1, 150, 10),
+                             peer(1, 200, 10)], 20)
+        recv, _ = self.history.rates(60)
+        self.assertEqual(recv[self.history.index[1]], 10)
+        self.assertEqual(recv[self.history.index[2]], 2)
+
+    def test_grow(self):
+        self.history.update([peer(i, 0, 0) for i in range(5)], 20)
+        self.assertEqual(len(self.history), 5)
+        self.assertEqual(self.history.capacity, 5)
+        self.assertEqual(sorted(self.history.index.values()), list(range(5)))
+
+    def test_missing_key(self):
+        info = peer(1, 100, 10)
+        del info['synced_blocks']
+        self.history.update([info], 20)
+        latest = self.history.latest
+        self.assertTrue(numpy.isnan(
+            self.history.synced[self.history.index[1], latest]))
+
+    def test_table(self):
+        table = self.history.table(60)
+        self.assertEqual([p['addr'] for p in table], ['peer1', 'peer2'])
+        self.assertEqual(table[0]['recvrate'], 10)
+        self.history.update([peer(4, 0, 0)], 20)
+        table = self.history.table(60)
+        self.assertEqual(len(table), 1)
+        self.assertIsNone(table[0]['sendrate'])
+
+    def test_bad_length(self):
+        with self.assertRaises(ValueError):
+            PeerHistory(1)
@@ -0,0 +1,52 @@
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from bitnomon import profiling
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+class ProfilingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_collapseStack(self):
+        stack = profiling.collapseStack(sys._getframe(), 'main')
+        names = stack.split(';')
+        self.assertEqual(names[0], 'main')
+        self.assertTrue(names[-1].startswith('test_collapseStack (test_'))
+
+    def test_capture(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=busy, args=(stop,), name='busy')
+        thread.start()
+        capture = profiling.ProfileCapture(self.directory, interval=0.001)
+        capture.start()
+        self.assertTrue(capture.running)
+        # Ignored while running
+        capture.start()
+        for _ in range(1000):
+            sum(range(1000))
+        stop.wait(0.05)
+        stop.set()
+        thread.join()
+        base = capture.stop()
+        self.assertFalse(capture.running)
+        self.assertIsNone(capture.stop())
+
+        stats = pstats.Stats(base + '.pstats')
+        self.assertTrue(any('sum' in func[2] for func in stats.stats))
+        with open(base + '.collapsed') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any(line.startswith('busy;') for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
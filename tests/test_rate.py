@@ -0,0 +1,31 @@
+import unittest
+from bitnomon import rate
+
+class TickTest(unittest.TestCase):
+
+    def test_tickPrecision(self):
+        self.assertEqual(rate.tickPrecision(100), 0)
+        self.assertEqual(rate.tickPrecision(1), 0)
+        self.assertEqual(rate.tickPrecision(0.2), 1)
+        self.assertEqual(rate.tickPrecision(0.05), 2)
+        self.assertEqual(rate.tickPrecision(0.25), 2)
+        self.assertEqual(rate.tickPrecision(0.125), 3)
+
+    def test_decimal(self):
+        # 0 to 100 kB/s over 400 px: ideal tick is 17.5 kB/s
+        spacing = rate.rateTickSpacing(0, 100e3, 400, 1e-3, False)
+        self.assertEqual(spacing, [(20e3, 0), (10e3, 0)])
+
+    def test_binary(self):
+        # Ideal tick is 17.5 KiB/s, so 32 KiB/s
+        spacing = rate.rateTickSpacing(0, 100*1024, 400, 1./1024, True)
+        self.assertEqual(spacing, [(32*1024, 0), (16*1024, 0)])
+
+    def test_bits(self):
+        # 0 to 100 kB/s is 800 kb/s; ideal tick is 140 kb/s
+        spacing = rate.rateTickSpacing(0, 100e3, 400, 8e-3, False)
+        self.assertEqual(spacing, [(200e3/8, 0), (100e3/8, 0)])
+
+    def test_empty(self):
+        self.assertEqual(rate.rateTickSpacing(5, 5, 400, 1., False),
+                         [(1., 0)])
@@ -54,6 +54,46 @@ class RRDModelTest(BaseRRDModelTest):
             ]
         )
 
+    def test_update_now(self):
+        with mock.patch('bitnomon.rrdmodel.clock.now') as mock_now:
+            mock_now.return_value = 2.5
+            self.model.update(None, (1, 2))
+        self.mock_rrdtool.update.assert_called_once_with(
+            self.model.rrd_file, '2.5:1:2')
+
+    def test_update_unknown(self):
+        self.model.update(1500, (None, 2))
+        self.mock_rrdtool.update.assert_called_once_with(
+            self.model.rrd_file, '1.5:U:2')
+
+class MemPoolRRDTest(unittest.TestCase):
+
+    def test_create(self):
+        with mock.patch('bitnomon.rrdmodel.rrdtool') as mock_rrdtool:
+            with mock.patch('bitnomon.rrdmodel.os.path.exists') as mock_exists:
+                mock_exists.return_value = False
+                model = rrdmodel.MemPoolRRD('test_data_dir')
+        self.assertTrue(model.rrd_file.endswith('mempool.rrd'))
+        args = mock_rrdtool.create.call_args[0]
+        sources = [arg for arg in args if arg.startswith('DS:')]
+        self.assertEqual(sources[0], 'DS:count:GAUGE:180:0:U')
+        self.assertEqual(len(sources), 5)
+        archives = [arg for arg in args if arg.startswith('RRA:')]
+        self.assertEqual(len(archives), len(model.consolidation))
+
+class NodeRRDTest(unittest.TestCase):
+
+    def test_create(self):
+        with mock.patch('bitnomon.rrdmodel.rrdtool') as mock_rrdtool:
+            with mock.patch('bitnomon.rrdmodel.os.path.exists') as mock_exists:
+                mock_exists.return_value = False
+                model = rrdmodel.NodeRRD('test_data_dir')
+        self.assertTrue(model.rrd_file.endswith('node.rrd'))
+        args = mock_rrdtool.create.call_args[0]
+        sources = [arg for arg in args if arg.startswith('DS:')]
+        self.assertEqual(sources[0], 'DS:cpu:DERIVE:60:0:U')
+        self.assertEqual(len(sources), 6)
+
 year = 60*60*24*365
 
 class FetchAllTest(BaseRRDModelTest):
@@ -0,0 +1,40 @@
+import unittest
+import numpy
+from bitnomon.spatial import GridIndex
+
+class GridIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.x = numpy.array([0., 1., 5., 5.2, -3.])
+        self.y = numpy.array([0., 10., 50., 52., -30.])
+        self.grid = GridIndex(1, 10)
+        self.grid.insert(range(len(self.x)), self.x, self.y)
+
+    def nearest(self, x, y, radiusX=1, radiusY=10):
+        return self.grid.nearest(
+            x, y, radiusX, radiusY, lambda ids: (self.x[ids], self.y[ids]))
+
+    def test_nearest(self):
+        self.assertEqual(self.nearest(0.1, 1), 0)
+        self.assertEqual(self.nearest(0.9, 9), 1)
+        self.assertEqual(self.nearest(5.15, 51.5), 3)
+        self.assertEqual(self.nearest(-2.9, -29), 4)
+
+    def test_radius(self):
+        self.assertIsNone(self.nearest(3, 30))
+        # Scaled distance: within radius on each axis but not both at once
+        self.assertIsNone(self.nearest(-2.2, -22))
+        self.assertEqual(self.nearest(3, 30, 3, 30), 1)
+
+    def test_remove(self):
+        self.grid.remove([3, 42])
+        self.assertEqual(len(self.grid), 4)
+        self.assertEqual(self.nearest(5.15, 51.5), 2)
+        self.grid.remove([2])
+        self.assertIsNone(self.nearest(5.15, 51.5))
+        self.assertNotIn((5, 5), self.grid.cells)
+
+    def test_fitsScale(self):
+        self.assertTrue(self.grid.fitsScale(1.5, 6))
+        self.assertFalse(self.grid.fitsScale(0.4, 10))
+        self.assertFalse(self.grid.fitsScale(1, 25))
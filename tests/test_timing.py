@@ -0,0 +1,79 @@
+import json
+import sys
+import unittest
+
+if sys.version_info < (3,):
+    from StringIO import StringIO
+else:
+    from io import StringIO
+
+from bitnomon import timing
+
+class PhaseTimersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.timers = timing.PhaseTimers(length=4, enabled=True)
+
+    def record(self, name, durations):
+        history = self.timers.histories.setdefault(
+            name, timing.PhaseHistory(self.timers.length))
+        for duration in durations:
+            history.add(duration)
+
+    def test_disabled(self):
+        self.timers.enabled = False
+        with self.timers.phase('a'):
+            pass
+        self.assertIs(self.timers.phase('a'), timing.NULL_PHASE)
+        self.assertEqual(self.timers.histories, {})
+
+    def test_phase(self):
+        with self.timers.phase('a'):
+            pass
+        with self.timers.phase('a'):
+            pass
+        self.assertEqual(self.timers.histories['a'].count, 2)
+
+    def test_stats(self):
+        self.record('a', [1, 2, 3, 4, 5, 6])
+        self.record('b', [100])
+        (name, stats), (_, statsA) = self.timers.stats()
+        self.assertEqual(name, 'b')
+        self.assertEqual(statsA['count'], 6)
+        self.assertEqual(statsA['total'], 21)
+        self.assertEqual(statsA['mean'], 3.5)
+        self.assertEqual(statsA['longest'], 6)
+        # Percentiles are of the latest 4 only
+        self.assertEqual(statsA['p50'], 4.5)
+
+    def test_histogram(self):
+        self.record('a', [0.00002, 0.003, 0.004])
+        counts = self.timers.histories['a'].histogram(timing.HISTOGRAM_EDGES)
+        self.assertEqual(list(counts), [1, 0, 2, 0, 0, 0])
+
+    def test_export(self):
+        self.record('a', [0.5])
+        csv = StringIO()
+        self.timers.writeCSV(csv)
+        lines = csv.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('"a",1,0.5,'))
+        out = StringIO()
+        self.timers.writeJSON(out)
+        data = json.loads(out.getvalue())
+        self.assertEqual(data['phases']['a']['count'], 1)
+        self.assertEqual(sum(data['phases']['a']['histogram']), 1)
+
+    def test_timed(self):
+        timing.phases.enabled = True
+        try:
+            @timing.timed('test timed')
+            def f(x):
+                "doc"
+                return x + 1
+            self.assertEqual(f(1), 2)
+            self.assertEqual(f.__doc__, 'doc')
+            self.assertEqual(timing.phases.histories['test timed'].count, 1)
+        finally:
+            timing.phases.enabled = False
+            timing.phases.clear()
@@ -0,0 +1,65 @@
+import unittest
+import numpy
+from bitnomon import traffic, formatting
+
+class LabelTest(unittest.TestCase):
+
+    def test_counterArray(self):
+        a = traffic.counterArray([None, 1, 2])
+        self.assertTrue(numpy.isnan(a[0]))
+        self.assertEqual(tuple(a[1:]), (1, 2))
+
+    def test_speedValues(self):
+        counters = traffic.counterArray([None]*295 + list(range(0, 6000, 1000)))
+        times = traffic.counterArray([None]*295 + list(range(0, 12, 2)))
+        speeds = traffic.speedValues('lRecv', counters, times, 1)
+        self.assertEqual(speeds['lRecvTotal'], 5000)
+        self.assertEqual(speeds['lRecv10s'], 500)
+        self.assertTrue(numpy.isnan(speeds['lRecv1m']))
+        self.assertTrue(numpy.isnan(speeds['lRecv10m']))
+
+    def test_formatSpeed(self):
+        f = formatting.ByteCountFormatter()
+        self.assertEqual(traffic.formatSpeed(f, 500), '500 B/s')
+        self.assertEqual(traffic.formatSpeed(f, numpy.nan), '-')
+
+    def test_spanRate(self):
+        # A missed sample doesn't throw off the average
+        counters = numpy.array([0., 1000, 3000, 4000, 5000])
+        times = numpy.array([0., 2, 6, 8, 10.1])
+        self.assertEqual(traffic.spanRate(counters, times, 10, 1), 5000/10.1)
+        self.assertEqual(traffic.spanRate(counters, times, 4, 1),
+                         2000/4.1)
+        self.assertTrue(numpy.isnan(traffic.spanRate(counters, times, 12, 1)))
+
+    def test_intervalRates(self):
+        rates = traffic.intervalRates(numpy.array([numpy.nan, 0, 10, 20]),
+                                      numpy.array([numpy.nan, 0, 2, 6]))
+        self.assertTrue(numpy.isnan(rates[0]))
+        self.assertEqual(tuple(rates[1:]), (5, 2.5))
+
+class PlotDataTest(unittest.TestCase):
+
+    def test_full_res_only(self):
+        counters = traffic.counterArray([0, 120, 360, 720, 1200])
+        times = numpy.array([-600., -480, -360, -240, -120])
+        ages, recv, sent = traffic.plotData([], 0, times, counters, counters)
+        self.assertEqual(tuple(ages), (8, 6, 4, 2))
+        self.assertEqual(tuple(recv), (1, 2, 3, 4))
+        self.assertEqual(tuple(sent), (1, 2, 3, 4))
+
+    def test_uneven(self):
+        counters = traffic.counterArray([0, 120, 600])
+        times = numpy.array([-360., -240, 0])
+        ages, recv, _ = traffic.plotData([], 0, times, counters, counters)
+        self.assertEqual(tuple(ages), (4, 0))
+        self.assertEqual(tuple(recv), (1, 2))
+
+    def test_interpolate_boundary(self):
+        counters = traffic.counterArray([None, None, 0, 240, 480])
+        times = traffic.counterArray([None, None, 240, 360, 480])
+        # Rows at ages 10, 6, 2 minutes; the full-resolution data starts at 4
+        rows = [(0, (10, 10)), (240, (20, 20)), (480, (30, 30))]
+        ages, recv, _ = traffic.plotData(rows, 600, times, counters, counters)
+        self.assertEqual(tuple(ages), (10, 6, 4, 2))
+        self.assertEqual(tuple(recv), (10, 20, 25, 2))
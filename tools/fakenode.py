@@ -0,0 +1,342 @@
+#!/usr/bin/python3
+
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Fake Bitcoin Core JSON-RPC server for testing Bitnomon without a node.
+
+Implements the methods Bitnomon calls, with synthetic state that changes over
+time: traffic counters grow, the memory pool keeps a steady size with
+transactions arriving and leaving, and blocks are found at random intervals,
+each taking the highest fee rate transactions out of the pool. Earlier blocks
+have headers at regular intervals back from the start time. Run it and
+point Bitnomon at it with a bitcoin.conf containing rpcport (the credentials
+aren't checked):
+
+    tools/fakenode.py --port 18444 &
+    bitnomon -datadir=/path/to/dir/with/that/conf
+
+For load and robustness testing, the pool can be scaled up (it is fine to
+500000 transactions or so), and replies can be delayed or made to fail at
+random. JSON-RPC batch requests (arrays of requests) are supported, and
+connections are kept alive as with Bitcoin Core.
+"""
+
+import argparse
+import hashlib
+import heapq
+import http.server
+import json
+import random
+import socketserver
+import threading
+import time
+
+class FakeNode(object):
+
+    """Synthetic node state, advanced according to the clock when queried.
+
+    mempoolSize -- number of transactions to keep in the pool
+    churn -- fraction of the pool replaced per second
+    blockInterval -- mean seconds between blocks, or 0 for none
+    blockTxs -- maximum number of transactions taken by a block
+    """
+
+    def __init__(self, mempoolSize=1000, churn=0.01, blockInterval=600,
+                 blockTxs=2000, clock=time.time, seed=0):
+        self.clock = clock
+        self.started = self.updated = clock()
+        self.random = random.Random(seed)
+        self.mempoolSize = mempoolSize
+        self.churn = churn
+        self.blockInterval = blockInterval
+        self.blockTxs = blockTxs
+        self.blocks = 350000
+        self.firstBlock = self.blocks
+        # Header times of blocks found since starting, by height
+        self.blockTimes = {}
+        self.nextBlock = self.blockTime(self.started)
+        self.recv = 0
+        self.sent = 0
+        self.txCount = 0
+        self.mempool = {}
+        # Transaction IDs in a list too, for picking random ones to remove
+        # without going through the whole pool
+        self.txids = []
+        self.txidIndex = {}
+        self.addTransactions(mempoolSize)
+
+    def blockTime(self, after):
+        "Random time of the next block after the given time."
+        if not self.blockInterval:
+            return float('inf')
+        return after + self.random.expovariate(1. / self.blockInterval)
+
+    def newTxid(self):
+        self.txCount += 1
+        return hashlib.sha256(str(self.txCount).encode()).hexdigest()
+
+    def addTransactions(self, count):
+        now = self.clock()
+        for _ in range(count):
+            size = self.random.randint(190, 2000)
+            txid = self.newTxid()
+            self.mempool[txid] = {
+                'size': size,
+                'fee': round(self.random.choice((0, 1, 1, 2, 5, 10)) *
+                             0.00001 * (size // 1000 + 1), 8),
+                'time': int(now - self.random.uniform(0, 3600)),
+                'height': self.blocks,
+                'startingpriority': self.random.uniform(0, 1e8),
+                'currentpriority': self.random.uniform(0, 1e8),
+                'depends': [],
+            }
+            self.txidIndex[txid] = len(self.txids)
+            self.txids.append(txid)
+
+    def removeTransaction(self, txid):
+        del self.mempool[txid]
+        # Move the last ID into the removed one's place
+        i = self.txidIndex.pop(txid)
+        last = self.txids.pop()
+        if last != txid:
+            self.txids[i] = last
+            self.txidIndex[last] = i
+
+    def mineBlock(self):
+        "Find a block, taking the highest fee rate transactions."
+        self.blocks += 1
+        self.blockTimes[self.blocks] = int(self.nextBlock)
+        feeRate = lambda txid: (self.mempool[txid]['fee'] /
+                                self.mempool[txid]['size'])
+        for txid in heapq.nlargest(self.blockTxs, self.txids, key=feeRate):
+            self.removeTransaction(txid)
+
+    def advance(self):
+        "Bring the state up to the current time."
+        now = self.clock()
+        elapsed = now - self.updated
+        if elapsed <= 0:
+            return
+        self.updated = now
+        self.recv += int(elapsed * self.random.uniform(5e3, 5e4))
+        self.sent += int(elapsed * self.random.uniform(5e3, 5e4))
+        while self.nextBlock <= now:
+            self.mineBlock()
+            self.nextBlock = self.blockTime(self.nextBlock)
+        replace = min(len(self.mempool),
+                      int(round(elapsed * self.churn * self.mempoolSize)))
+        for _ in range(replace):
+            self.removeTransaction(
+                self.txids[self.random.randrange(len(self.txids))])
+        self.addTransactions(self.mempoolSize - len(self.mempool))
+
+    # RPC methods
+
+    def getnetworkinfo(self):
+        return {'version': 110000, 'subversion': '/FakeNode:0.11.0/',
+                'connections': 8}
+
+    def getmininginfo(self):
+        return {'blocks': self.blocks, 'difficulty': 49402014931.2,
+                'pooledtx': len(self.mempool)}
+
+    @staticmethod
+    def blockHash(height):
+        "Hash of the block at a height, ending with the height in hex."
+        digest = hashlib.sha256(('block%d' % height).encode()).hexdigest()
+        return '0' * 16 + digest[:40] + '%08x' % height
+
+    def getbestblockhash(self):
+        return self.blockHash(self.blocks)
+
+    def getblockhash(self, height):
+        if not 0 <= height <= self.blocks:
+            raise RPCError(-8, 'Block height out of range')
+        return self.blockHash(height)
+
+    def getblockheader(self, blockHash):
+        try:
+            height = int(blockHash[-8:], 16)
+        except ValueError:
+            height = None
+        if height is None or height > self.blocks or \
+                blockHash != self.blockHash(height):
+            raise RPCError(-5, 'Block not found')
+        interval = self.blockInterval or 600
+        header = {
+            'hash': blockHash,
+            'confirmations': self.blocks - height + 1,
+            'height': height,
+            'version': 3,
+            'time': self.blockTimes.get(height, int(
+                self.started - (self.firstBlock - height) * interval)),
+            'difficulty': 49402014931.2,
+        }
+        if height > 0:
+            header['previousblockhash'] = self.blockHash(height - 1)
+        if height < self.blocks:
+            header['nextblockhash'] = self.blockHash(height + 1)
+        return header
+
+    def getnettotals(self):
+        return {'totalbytesrecv': self.recv, 'totalbytessent': self.sent,
+                'timemillis': int(self.clock() * 1000)}
+
+    def getrawmempool(self, verbose=False):
+        if verbose:
+            # A copy, as the pool may change while the reply is encoded
+            return dict(self.mempool)
+        return list(self.mempool)
+
+    def getpeerinfo(self):
+        return [{'id': i, 'addr': '10.0.0.%d:8333' % i, 'inbound': i % 2 == 0,
+                 'bytesrecv': self.recv // 8, 'bytessent': self.sent // 8,
+                 'pingtime': 0.05, 'synced_blocks': self.blocks,
+                 'subver': '/Satoshi:0.11.0/'}
+                for i in range(8)]
+
+    def getmempoolentry(self, txid):
+        try:
+            return self.mempool[txid]
+        except KeyError:
+            raise RPCError(-5, 'Transaction not in mempool')
+
+    def getrawtransaction(self, txid, verbose=0):
+        self.getmempoolentry(txid)
+        return {'txid': txid, 'version': 1, 'locktime': 0,
+                'vin': [{}], 'vout': [{'value': 0.1, 'n': 0}]}
+
+    def stop(self):
+        return 'Bitcoin server stopping'
+
+    methods = ('getnetworkinfo', 'getmininginfo', 'getbestblockhash',
+               'getblockhash', 'getblockheader', 'getnettotals',
+               'getrawmempool', 'getpeerinfo', 'getmempoolentry',
+               'getrawtransaction', 'stop')
+
+    def call(self, method, params):
+        "Run an RPC method, raising RPCError on failure."
+        if method not in self.methods:
+            raise RPCError(-32601, 'Method not found')
+        self.advance()
+        try:
+            return getattr(self, method)(*params)
+        except TypeError:
+            raise RPCError(-1, 'Wrong number of parameters')
+
+class RPCError(Exception):
+
+    def __init__(self, code, message):
+        super(RPCError, self).__init__(code, message)
+        self.code = code
+        self.message = message
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+
+    """JSON-RPC over HTTP, keeping connections alive as Bitcoin Core does.
+
+    Each reply goes out in one write with Nagle's algorithm disabled, as
+    otherwise a small reply on a kept-alive connection waits for the client's
+    delayed ACK (about 40 ms per request)."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length).decode('utf8'))
+        status, response = self.server.handle_rpc(request)
+        body = json.dumps(response).encode('utf8')
+        head = ('%s %d %s\r\n'
+                'Date: %s\r\n'
+                'Content-Type: application/json\r\n'
+                'Content-Length: %d\r\n\r\n') % (
+                    self.protocol_version, status,
+                    self.responses[status][0], self.date_time_string(),
+                    len(body))
+        self.wfile.write(head.encode('latin-1') + body)
+
+    def log_message(self, *args):
+        pass
+
+class FakeNodeServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+
+    """HTTP server for a FakeNode, with each connection in its own thread.
+
+    latency -- seconds to delay each reply
+    jitter -- maximum seconds of random delay added to the latency
+    errorRate -- fraction of calls failing with an internal error
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, node, latency=0., jitter=0., errorRate=0.):
+        http.server.HTTPServer.__init__(self, address, RequestHandler)
+        self.node = node
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.random = random.Random()
+        self.lock = threading.Lock()
+
+    def call(self, request):
+        """Run one request object, returning (HTTP status, response object)
+        as Bitcoin Core would for a single request."""
+        try:
+            with self.lock:
+                if self.random.random() < self.errorRate:
+                    raise RPCError(-32603, 'Injected error')
+                result = self.node.call(request['method'],
+                                        request.get('params', []))
+        except RPCError as e:
+            # Bitcoin Core returns errors with an HTTP error status
+            status = 404 if e.code == -32601 else 500
+            return status, {'result': None, 'id': request.get('id'),
+                            'error': {'code': e.code, 'message': e.message}}
+        return 200, {'result': result, 'error': None, 'id': request.get('id')}
+
+    def handle_rpc(self, request):
+        """Return (HTTP status, response object) for a request object, or a
+        list of request objects for a batch."""
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if isinstance(request, list):
+            # Errors in a batch are only reported in the responses
+            return 200, [self.call(r)[1] for r in request]
+        return self.call(request)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=18444)
+    parser.add_argument('--mempool', type=int, default=1000,
+                        help='number of transactions in the pool')
+    parser.add_argument('--churn', type=float, default=0.01,
+                        help='fraction of the pool replaced per second')
+    parser.add_argument('--block-interval', type=float, default=600,
+                        help='mean seconds between blocks (0 for none)')
+    parser.add_argument('--block-txs', type=int, default=2000,
+                        help='maximum transactions per block')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='seconds to delay each reply')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='maximum random seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of calls to fail')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed for the node state')
+    args = parser.parse_args()
+    node = FakeNode(args.mempool, args.churn, args.block_interval,
+                    args.block_txs, seed=args.seed)
+    server = FakeNodeServer(('localhost', args.port), node, args.latency,
+                            args.jitter, args.error_rate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Memory leak regression check.
+
+Runs the Bitnomon main window against a fake node (tools/fakenode.py) with a
+very short poll interval for many poll cycles. After a warmup, it takes
+tracemalloc snapshots and RSS readings at intervals, reporting the allocation
+sites that grew the most. Exits with status 1 if memory retained per cycle
+exceeds the threshold, either as traced by tracemalloc or as growth in RSS,
+which also covers native allocations (Qt, pyqtgraph's C side, numpy and
+RRDtool) that tracemalloc can't see.
+
+Cycles are limited by the round trips to the fake node rather than the poll
+interval, at 10 or more per second, so the default 2000 cycles take a few
+minutes; progress is printed every 10 seconds. The window is shown, as plots
+and labels are only drawn while it is exposed, so Qt 4 needs a display; on a
+headless system, run under xvfb-run. Run from the top of the source tree:
+
+    xvfb-run tools/leakcheck.py [--cycles 2000]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitnomon.qtwrapper import QtCore, QtGui
+from bitnomon import main as bitnomon_main
+from bitnomon import perfprobe
+
+class LeakCheckWindow(bitnomon_main.MainWindow):
+
+    "Main window counting completed poll cycles"
+
+    def __init__(self, onCycle):
+        self.cycles = 0
+        self.onCycle = onCycle
+        super(LeakCheckWindow, self).__init__()
+
+    def nextChainedRequest(self):
+        super(LeakCheckWindow, self).nextChainedRequest()
+        if not self.busy:
+            self.cycles += 1
+            self.onCycle(self.cycles)
+
+class LeakCheck(object):
+
+    def __init__(self, args):
+        self.args = args
+        self.baseline = None
+        self.baselineCycle = None
+        self.baselineRSS = None
+        self.readings = []
+        self.failed = False
+        self.window = None
+        self.probe = None
+        self.started = None
+        self.lastProgress = None
+
+    def rss(self):
+        self.probe.run()
+        return self.probe.rss
+
+    def progress(self, cycle):
+        "Print the cycle rate and estimated time left, every so often."
+        now = time.time()
+        if self.started is None:
+            self.started = self.lastProgress = now
+            return
+        if now - self.lastProgress < self.args.progress:
+            return
+        self.lastProgress = now
+        rate = (cycle - 1) / (now - self.started)
+        print('cycle %d/%d: %.1f cycles/s, %d s left' % (
+            cycle, self.args.cycles, rate, (self.args.cycles - cycle) / rate),
+              flush=True)
+
+    def onCycle(self, cycle):
+        args = self.args
+        self.progress(cycle)
+        if cycle == args.warmup:
+            tracemalloc.start(args.frames)
+            self.baseline = tracemalloc.take_snapshot()
+            self.baselineCycle = cycle
+            self.baselineRSS = self.rss()
+        elif cycle > args.warmup and (
+                (cycle - args.warmup) % args.interval == 0 or
+                cycle >= args.cycles):
+            self.report(cycle)
+        if cycle >= args.cycles:
+            QtGui.qApp.quit()
+
+    def report(self, cycle):
+        snapshot = tracemalloc.take_snapshot()
+        cycles = cycle - self.baselineCycle
+        stats = snapshot.compare_to(self.baseline, 'lineno')
+        growth = sum(stat.size_diff for stat in stats)
+        rss = self.rss()
+        perCycle = growth / float(cycles)
+        rssPerCycle = (rss - self.baselineRSS) / float(cycles)
+        self.readings.append((cycle, growth, rss))
+        print('cycle %d: traced %+d bytes (%.1f/cycle), RSS %+d KiB' % (
+            cycle, growth, perCycle, (rss - self.baselineRSS) // 1024),
+              flush=True)
+        if cycle >= self.args.cycles:
+            print('Top growing allocation sites:')
+            for stat in stats[:self.args.top]:
+                print('  %s' % stat)
+            if perCycle > self.args.threshold:
+                print('FAIL: %.1f bytes retained per cycle exceeds %d' %
+                      (perCycle, self.args.threshold))
+                self.failed = True
+            if rssPerCycle > self.args.rss_threshold:
+                print('FAIL: RSS grew %.1f bytes per cycle, more than %d' %
+                      (rssPerCycle, self.args.rss_threshold))
+                self.failed = True
+            if not self.failed:
+                print('OK')
+
+    def run(self):
+        args = self.args
+        workDir = tempfile.mkdtemp(prefix='bitnomon-leakcheck-')
+        node = subprocess.Popen([
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'fakenode.py'),
+            '--port', str(args.port), '--mempool', str(args.mempool)])
+        try:
+            with open(os.path.join(workDir, 'bitcoin.conf'), 'w') as f:
+                f.write('rpcport=%d\nrpcuser=leakcheck\nrpcpassword=x\n' %
+                        args.port)
+            # Give the fake node a moment to listen
+            time.sleep(1)
+            return self.runWindow(workDir)
+        finally:
+            node.terminate()
+            node.wait()
+            shutil.rmtree(workDir)
+
+    def runWindow(self, workDir):
+        args = self.args
+        app = QtGui.QApplication([sys.argv[0]])
+        # Keep settings apart from the user's
+        app.setApplicationName('BitnomonLeakCheck')
+        app.setOrganizationName('BitnomonLeakCheck')
+        QtCore.QSettings.setPath(QtCore.QSettings.NativeFormat,
+                                 QtCore.QSettings.UserScope, workDir)
+        bitnomon_main.qApp = app
+        bitnomon_main.BITCOIN_DATA_DIR = workDir
+        bitnomon_main.DATA_DIR = workDir
+        bitnomon_main.SHARE = False
+        bitnomon_main.MIN_POLL_INTERVAL = 0
+        bitnomon_main.POLL_INTERVAL = args.poll
+        self.window = LeakCheckWindow(self.onCycle)
+        self.probe = perfprobe.PerfProbe(self.window)
+        self.window.show()
+        app.exec_()
+        self.window.close()
+        if self.window.cycles < args.cycles:
+            print('FAIL: only %d cycles completed' % self.window.cycles)
+            return 1
+        return 1 if self.failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cycles', type=int, default=2000,
+                        help='total poll cycles to run')
+    parser.add_argument('--warmup', type=int, default=200,
+                        help='cycles to run before the baseline snapshot')
+    parser.add_argument('--interval', type=int,
+                        help='cycles between snapshots (default: a fifth '
+                        'of those after the warmup)')
+    parser.add_argument('--progress', type=float, default=10,
+                        help='seconds between progress reports')
+    parser.add_argument('--threshold', type=int, default=256,
+                        help='maximum bytes retained per cycle')
+    parser.add_argument('--rss-threshold', type=int, default=4096,
+                        help='maximum RSS growth in bytes per cycle')
+    parser.add_argument('--poll', type=float, default=0.01,
+                        help='poll interval in seconds')
+    parser.add_argument('--mempool', type=int, default=2000,
+                        help='fake node memory pool size')
+    parser.add_argument('--port', type=int, default=18445)
+    parser.add_argument('--frames', type=int, default=10,
+                        help='stack frames to record per allocation')
+    parser.add_argument('--top', type=int, default=15,
+                        help='growing allocation sites to report')
+    args = parser.parse_args()
+    if args.warmup < 1 or args.cycles <= args.warmup:
+        parser.error('need 0 < warmup < cycles')
+    if args.interval is None:
+        args.interval = max(1, (args.cycles - args.warmup) // 5)
+    return LeakCheck(args).run()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+
+# Copyright 2015 Jacob Welsh
+#
+# This file is part of Bitnomon; see the README for license information.
+
+"""Accelerated-time soak test.
+
+Runs the Bitnomon main window against a fake node (tools/fakenode.py, run in
+a thread of this process) with both on a virtual clock, so that weeks of
+operation pass in minutes. Every poll goes through the whole data path: RPC,
+in-memory RRAs, the RRD file and the traffic and memory pool plots. At
+intervals of virtual time it reports poll throughput, missed samples, poll
+cycle latency (in real time) and RSS. At the end it checks the long-term
+traffic data read back from the RRD for gaps and misordered rows, such as at
+the junctions between resolutions.
+
+By default the clock advances by one poll interval as each poll cycle
+completes, so the soak runs as fast as the data path allows and every
+interval gets its sample. With --speed, the clock instead runs at that
+multiple of real time, with polls on a timer, to check that the program keeps
+up at a given rate: the poll interval divided by the speed must leave time
+for a whole cycle of RPCs (tens of milliseconds), or samples are missed.
+
+Exits with status 1 if the check fails or too many samples were missed. Qt 4
+needs a display; on a headless system, run under xvfb-run. Run from the top
+of the source tree:
+
+    xvfb-run tools/soak.py [--days 14] [--speed 100 --poll 10]
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitnomon.qtwrapper import QtCore, QtGui
+from bitnomon import clock
+from bitnomon import main as bitnomon_main
+from bitnomon import perfprobe
+
+import fakenode
+
+DAY = 86400
+
+class SoakWindow(bitnomon_main.MainWindow):
+
+    "Main window recording the real-time latency of each poll cycle"
+
+    def __init__(self, onCycle):
+        self.cycles = 0
+        self.onCycle = onCycle
+        self.cycleStart = None
+        super(SoakWindow, self).__init__()
+
+    def startChain(self):
+        self.cycleStart = time.time()
+        super(SoakWindow, self).startChain()
+
+    def nextChainedRequest(self):
+        super(SoakWindow, self).nextChainedRequest()
+        if not self.busy:
+            self.cycles += 1
+            self.onCycle(time.time() - self.cycleStart)
+
+class Soak(object):
+
+    def __init__(self, args):
+        self.args = args
+        if args.speed is None:
+            self.clock = clock.SteppedClock()
+        else:
+            self.clock = clock.VirtualClock(speed=args.speed)
+        self.end = self.clock.start + args.days * DAY
+        self.nextReport = self.clock.start + args.report * 3600
+        self.latencies = []
+        self.reports = []
+        self.lastReport = (time.time(), self.clock.start, 0)
+        self.window = None
+        self.probe = None
+        self.writer = None
+
+    def onCycle(self, latency):
+        self.latencies.append(latency)
+        now = self.clock()
+        if now >= self.nextReport or now >= self.end:
+            self.report(now)
+            self.nextReport += self.args.report * 3600
+        if now >= self.end:
+            QtGui.qApp.quit()
+        elif self.args.speed is None:
+            self.clock.advance(self.args.poll)
+            QtCore.QTimer.singleShot(0, self.window.update)
+
+    def report(self, now):
+        self.probe.run()
+        realNow = time.time()
+        lastTime, lastVirtual, lastCycles = self.lastReport
+        cycles = self.window.cycles
+        latencies = numpy.array(self.latencies)
+        row = {
+            'day': (now - self.clock.start) / DAY,
+            'cycles': cycles,
+            'cycles/s': (cycles - lastCycles) / (realNow - lastTime),
+            'speed': (now - lastVirtual) / (realNow - lastTime),
+            'missed': self.window.missedSamples,
+            'latency p50 ms': numpy.percentile(latencies, 50) * 1000,
+            'latency p99 ms': numpy.percentile(latencies, 99) * 1000,
+            'latency max ms': latencies.max() * 1000,
+            'RSS MiB': self.probe.rss / 2.**20,
+        }
+        self.reports.append(row)
+        self.latencies = []
+        self.lastReport = (realNow, now, cycles)
+        print('day %(day).2f: %(cycles)d cycles (%(cycles/s).1f/s, '
+              '%(speed).0fx real time), '
+              '%(missed)d missed, latency p50 %(latency p50 ms).1f '
+              'p99 %(latency p99 ms).1f max %(latency max ms).1f ms, '
+              'RSS %(RSS MiB).1f MiB' % row, flush=True)
+        if self.writer is not None:
+            self.writer.writerow(row)
+
+    def checkRRD(self):
+        """Check the traffic RRD's long-term data over the soak period for
+        unknown values and times out of order. Returns a list of problems."""
+        rows = self.window.trafRRD.fetch_all()
+        times = numpy.array([t for t, _ in rows], dtype=float)
+        problems = []
+        misordered = int(numpy.count_nonzero(numpy.diff(times) <= 0))
+        if misordered:
+            problems.append('%d rows out of order' % misordered)
+        # Only rows whose whole interval lies within the soak can be expected
+        # to be known (the newest is still being filled)
+        resolutions = numpy.diff(times)
+        start = self.clock.start
+        end = self.clock() - self.window.trafRRD.heartbeat
+        unknown = [t for (t, values), res in zip(rows[1:], resolutions)
+                   if t - res >= start and t + res <= end and None in values]
+        if unknown:
+            problems.append('%d unknown rows within the soak, first at day '
+                            '%.2f' % (len(unknown), (unknown[0] - start) / DAY))
+        print('RRD: %d rows, %d resolutions' % (
+            len(rows), len(set(resolutions))))
+        return problems
+
+    def run(self):
+        args = self.args
+        workDir = tempfile.mkdtemp(prefix='bitnomon-soak-')
+        node = fakenode.FakeNode(args.mempool, clock=self.clock)
+        server = fakenode.FakeNodeServer(('localhost', args.port), node)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        csvFile = None
+        try:
+            with open(os.path.join(workDir, 'bitcoin.conf'), 'w') as f:
+                f.write('rpcport=%d\nrpcuser=soak\nrpcpassword=x\n' %
+                        args.port)
+            if args.csv:
+                csvFile = open(args.csv, 'w')
+                self.writer = csv.DictWriter(csvFile, [
+                    'day', 'cycles', 'cycles/s', 'speed', 'missed', 'latency p50 ms',
+                    'latency p99 ms', 'latency max ms', 'RSS MiB'])
+                self.writer.writeheader()
+            return self.runWindow(workDir)
+        finally:
+            if csvFile is not None:
+                csvFile.close()
+            server.shutdown()
+            shutil.rmtree(workDir)
+
+    def runWindow(self, workDir):
+        args = self.args
+        app = QtGui.QApplication([sys.argv[0]])
+        # Keep settings apart from the user's
+        app.setApplicationName('BitnomonSoak')
+        app.setOrganizationName('BitnomonSoak')
+        QtCore.QSettings.setPath(QtCore.QSettings.NativeFormat,
+                                 QtCore.QSettings.UserScope, workDir)
+        bitnomon_main.qApp = app
+        bitnomon_main.BITCOIN_DATA_DIR = workDir
+        bitnomon_main.DATA_DIR = workDir
+        bitnomon_main.SHARE = False
+        bitnomon_main.MIN_POLL_INTERVAL = 0
+        bitnomon_main.POLL_INTERVAL = args.poll
+        clock.install(self.clock)
+        try:
+            self.window = SoakWindow(self.onCycle)
+            if args.speed is None:
+                # Each cycle starts the next (see onCycle)
+                self.window.timer.timeout.disconnect(self.window.update)
+            else:
+                # The poll interval is in virtual time; the timer runs in
+                # real time
+                self.window.timer.setInterval(
+                    max(1, int(args.poll * 1000 / args.speed)))
+            self.probe = perfprobe.PerfProbe(self.window)
+            self.window.show()
+            app.exec_()
+            self.window.close()
+        finally:
+            clock.install(time.time)
+
+        failed = False
+        if self.clock() < self.end:
+            print('FAIL: stopped at day %.2f' %
+                  ((self.clock() - self.clock.start) / DAY))
+            failed = True
+        expected = args.days * DAY / args.poll
+        missed = self.window.missedSamples
+        print('%d cycles, %d missed samples (%.2f%%)' % (
+            self.window.cycles, missed, 100. * missed / expected))
+        if missed > args.max_missed * expected:
+            print('FAIL: more than %.2f%% of samples missed' %
+                  (100. * args.max_missed))
+            failed = True
+        for problem in self.checkRRD():
+            print('FAIL: ' + problem)
+            failed = True
+        if not failed:
+            print('OK')
+        return int(failed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--days', type=float, default=14,
+                        help='virtual days to run')
+    parser.add_argument('--speed', type=float,
+                        help='virtual seconds per real second (default: '
+                        'advance by a poll interval per completed cycle)')
+    parser.add_argument('--poll', type=float, default=30,
+                        help='poll interval in virtual seconds (at most '
+                        '%g)' % bitnomon_main.MAX_POLL_INTERVAL)
+    parser.add_argument('--report', type=float, default=24,
+                        help='virtual hours between reports')
+    parser.add_argument('--max-missed', type=float, default=0.01,
+                        help='maximum fraction of samples missed')
+    parser.add_argument('--mempool', type=int, default=1000,
+                        help='fake node memory pool size')
+    parser.add_argument('--port', type=int, default=18446)
+    parser.add_argument('--csv', help='also write reports to this CSV file')
+    args = parser.parse_args()
+    return Soak(args).run()
+
+if __name__ == '__main__':
+    sys.exit(main())